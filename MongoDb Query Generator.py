@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
+import tkinter.font as tkfont
 from datetime import datetime
 import webbrowser
 import requests
@@ -7,7 +8,20 @@ import subprocess
 import os
 import sys
 import threading
+import multiprocessing
 import json
+import queue
+import gc
+from schema_import import (SchemaImportJob, MultiFileImportJob, SampleStore, estimate_memory, list_import_files,
+                           SAMPLE_SIZE, SAMPLE_SIZES)
+from schema_bson import BSONError
+from schema_cache import SchemaCache
+from schema_watch import FileWatcher
+from search_index import SubstringIndex, FieldSearchIndex, Bitset
+from query_ast import QueryTree, GroupNode, GROUP_DESCRIPTIONS, parse_value, to_shell
+from query_optimizer import optimize_query
+from query_eval import QueryPreviewJob
+from column_store import ColumnarSampleStore, numpy_available
 
 # Version Information
 APP_VERSION = "0.7"
@@ -15,6 +29,15 @@ APP_CHANNEL = "Beta"
 APP_NAME = "MongoDB Query Generator"
 GITHUB_REPO = "Rushikesh-techy/MongoDb-Query-Generator"
 
+# File dialog filters for schema import
+IMPORT_FILE_TYPES = [("MongoDB exports", "*.json *.ndjson *.jsonl *.bson *.csv *.gz *.bz2 *.zst"),
+                     ("JSON files", "*.json *.ndjson *.jsonl"), ("BSON files", "*.bson"),
+                     ("CSV files", "*.csv"), ("Compressed files", "*.gz *.bz2 *.zst"),
+                     ("All files", "*.*")]
+
+# Milliseconds the conditions must stay unchanged before the match preview is refreshed
+PREVIEW_DELAY_MS = 300
+
 class ToolTip:
     """Create a tooltip for a given widget"""
     def __init__(self, widget, text):
@@ -75,6 +98,179 @@ class ToolTip:
             self.tooltip.destroy()
             self.tooltip = None
 
+class VirtualListbox(tk.Frame):
+    """Listbox view of a large Python list that only materializes the visible rows.
+    
+    The items stay in a Python sequence; the Tk listbox holds one screenful and is
+    refilled as the view scrolls, so showing or filtering 100k entries costs the
+    same as showing 30. The selection is an index into items.
+    """
+    def __init__(self, parent, font=("Arial", 9), **kwargs):
+        super().__init__(parent, **kwargs)
+        self.items = []
+        self.offset = 0  # Index of the first visible item
+        self.selected = None  # Index of the selected item
+        
+        self.scrollbar = tk.Scrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(self, font=font, activestyle='none', exportselection=False)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.line_height = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+        
+        self.listbox.bind('<Configure>', lambda e: self.render())
+        self.listbox.bind('<<ListboxSelect>>', self.on_select)
+        self.listbox.bind('<MouseWheel>', self.on_mousewheel)
+        self.listbox.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.listbox.bind('<Button-5>', lambda e: self.scroll(3))
+        self.listbox.bind('<Up>', lambda e: self.move_selection(-1))
+        self.listbox.bind('<Down>', lambda e: self.move_selection(1))
+        self.listbox.bind('<Prior>', lambda e: self.move_selection(-self.visible_rows()))
+        self.listbox.bind('<Next>', lambda e: self.move_selection(self.visible_rows()))
+        self.listbox.bind('<Home>', lambda e: self.move_selection(-len(self.items)))
+        self.listbox.bind('<End>', lambda e: self.move_selection(len(self.items)))
+    
+    def set_items(self, items):
+        """Show a new list (kept by reference) scrolled to the top, selecting the first item"""
+        self.items = items
+        self.offset = 0
+        self.selected = 0 if items else None
+        self.render()
+    
+    def get_selected(self):
+        """Return the selected item, or None"""
+        if self.selected is None or self.selected >= len(self.items):
+            return None
+        return self.items[self.selected]
+    
+    def format_item(self, item):
+        """Text shown for an item"""
+        return item
+    
+    def visible_rows(self):
+        """Number of rows that fit in the listbox"""
+        return max(1, self.listbox.winfo_height() // self.line_height)
+    
+    def render(self):
+        """Refill the listbox with the rows in view and update the scrollbar"""
+        rows = self.visible_rows()
+        total = len(self.items)
+        self.offset = max(0, min(self.offset, total - rows))
+        # One extra row fills a partly visible last line
+        window = self.items[self.offset:self.offset + rows + 1]
+        self.listbox.delete(0, tk.END)
+        if window:
+            self.listbox.insert(tk.END, *map(self.format_item, window))
+        if self.selected is not None and self.offset <= self.selected < self.offset + len(window):
+            self.listbox.selection_set(self.selected - self.offset)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def scroll(self, rows):
+        """Scroll the view by a number of rows"""
+        self.offset += rows
+        self.render()
+        return "break"
+    
+    def on_scrollbar(self, action, amount, unit=None):
+        """Scrollbar callback: 'moveto' a fraction or 'scroll' by units or pages"""
+        if action == 'moveto':
+            self.offset = int(float(amount) * len(self.items))
+            self.render()
+        elif unit == 'pages':
+            self.scroll(int(amount) * self.visible_rows())
+        else:
+            self.scroll(int(amount))
+    
+    def on_mousewheel(self, event):
+        """Scroll on Windows and macOS wheel events"""
+        return self.scroll(-3 if event.delta > 0 else 3)
+    
+    def on_select(self, event):
+        """Record a click selection as an index into items"""
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.offset + selection[0]
+    
+    def move_selection(self, step):
+        """Move the selection with the keyboard, scrolling it into view"""
+        if not self.items:
+            return "break"
+        current = self.offset if self.selected is None else self.selected
+        self.selected = max(0, min(current + step, len(self.items) - 1))
+        rows = self.visible_rows()
+        if self.selected < self.offset:
+            self.offset = self.selected
+        elif self.selected >= self.offset + rows:
+            self.offset = self.selected - rows + 1
+        self.render()
+        return "break"
+
+class VirtualChecklist(VirtualListbox):
+    """Virtual list of checkable values with the checked state kept in a bitset.
+    
+    The view's items are positions into values, so filtering the view never
+    touches the selection; clicking a row or pressing Space toggles it.
+    """
+    def __init__(self, parent, values, labels=None, on_change=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.values = values
+        self.labels = labels or values
+        self.checked = Bitset(len(values))
+        self.on_change = on_change
+        self.listbox.bind('<Button-1>', self.on_click)
+        self.listbox.bind('<space>', lambda e: self.toggle(self.selected))
+        self.set_items(range(len(values)))
+    
+    def format_item(self, position):
+        """Checkbox mark followed by the value's label"""
+        return ("☑ " if position in self.checked else "☐ ") + self.labels[position]
+    
+    def on_click(self, event):
+        """Select and toggle the clicked row"""
+        row = self.listbox.nearest(event.y)
+        if 0 <= row < self.listbox.size():
+            self.listbox.focus_set()
+            self.selected = self.offset + row
+            self.toggle(self.selected)
+        return "break"
+    
+    def toggle(self, index):
+        """Flip the checked state of the item at a view index"""
+        if index is None or index >= len(self.items):
+            return "break"
+        position = self.items[index]
+        if position in self.checked:
+            self.checked.discard(position)
+        else:
+            self.checked.add(position)
+        self.changed()
+        return "break"
+    
+    def check_items(self, state):
+        """Check or uncheck every item currently in the view"""
+        if len(self.items) == len(self.values):
+            if state:
+                self.checked.fill()
+            else:
+                self.checked.clear()
+        elif state:
+            self.checked.update(self.items)
+        else:
+            self.checked.difference_update(self.items)
+        self.changed()
+    
+    def checked_values(self):
+        """Return the checked values in list order"""
+        return [self.values[position] for position in self.checked]
+    
+    def changed(self):
+        """Redraw the visible rows and notify the owner"""
+        self.render()
+        if self.on_change:
+            self.on_change()
+
 class MongoDBQueryGenerator:
     def __init__(self, root):
         self.root = root
@@ -96,10 +292,30 @@ class MongoDBQueryGenerator:
         
         # Initialize variables
         self.schema_fields = []
-        self.field_values = {}  # Store unique values per field from JSON
-        self.query_conditions = []  # Each condition includes its group operator
+        self.field_search_index = FieldSearchIndex([])  # Ranked, typo-tolerant search over schema_fields
+        self.field_values = {}  # Store most frequent values per field from JSON
+        self.field_stats = {}  # Value frequency and distinct-count sketches per field
+        self.imported_document_count = 0  # Documents scanned by the last import
+        self.query_tree = QueryTree()  # Builder conditions; compiled incrementally as they change
+        self.optimize_filter = tk.BooleanVar(value=False)  # Rewrite the built filter into a simpler equivalent
+        self.optimizer_notes = []  # Rewrites applied to the last built filter
         self.generated_query = None
-        self.imported_data = None  # Store imported JSON data
+        self.imported_data = None  # Optional columnar SampleStore of sampled documents
+        self.keep_sample_documents = tk.BooleanVar(value=False)  # Retain the sample after import
+        self.columnar_sample = tk.BooleanVar(value=False)  # Also keep it as NumPy columns for fast previews
+        self.sample_size = tk.IntVar(value=SAMPLE_SIZE)  # Documents sampled per import
+        self.import_job = None  # Running background schema import
+        self.import_dialog = None  # Progress window of the running import
+        self.file_summaries = {}  # Per-file breakdown of the last multi-file import
+        self.imported_filenames = []  # Files the current schema was imported from
+        self.watch_imported_files = tk.BooleanVar(value=False)  # Refresh the schema when they change
+        self.file_watcher = None
+        self.file_watcher_after = None  # Pending poll_file_watcher call, so only one poll loop runs
+        self.refresh_job = None  # Background re-import started by the file watcher
+        self.preview_job = None  # Running match count of the built filter over the sample
+        self.preview_after = None  # Pending refresh of the match preview
+        self.preview_result = None  # Last finished match preview
+        self.schema_cache = SchemaCache()  # On-disk cache of previous imports
         self.document_field_rows = []  # Store update document builder rows
         
         # MongoDB Operators
@@ -162,7 +378,7 @@ class MongoDBQueryGenerator:
         self.import_btn = tk.Button(op_frame, text="📁 Import JSON Schema", command=self.import_json_schema,
                                bg="#9C27B0", fg="white", font=("Arial", 9, "bold"), padx=5)
         self.import_btn.pack(side=tk.RIGHT, padx=(10, 0))
-        ToolTip(self.import_btn, "Import JSON file to extract schema fields and values")
+        ToolTip(self.import_btn, "Import a JSON, NDJSON, BSON or CSV export to extract schema fields and values")
         
         # Clear Manual Query Button (for Manual mode)
         self.clear_manual_btn = tk.Button(op_frame, text="🗑 Clear", command=self.clear_manual_query,
@@ -186,6 +402,10 @@ class MongoDBQueryGenerator:
         self.field_combo = ttk.Combobox(controls_frame, width=80)
         self.field_combo.pack(side=tk.LEFT, padx=2, fill=tk.X, expand=True)
         
+        # Range statistics and estimated selectivity of the current value
+        self.value_hint_label = tk.Label(controls_frame, text="", font=("Arial", 9), fg="#1565C0")
+        self.value_hint_label.pack(side=tk.RIGHT, padx=5)
+        
         # Create tooltip for field combo to show full path
         self.field_tooltip = None
         def show_field_tooltip(event):
@@ -245,22 +465,10 @@ class MongoDBQueryGenerator:
         self.select_values_btn.pack(side=tk.LEFT, padx=2)
         ToolTip(self.select_values_btn, "Pick values from imported data for the selected field")
         
-        # Group number for explicit grouping
-        tk.Label(controls_frame1_5, text="Group #:", font=("Arial", 9)).pack(side=tk.LEFT, padx=(15, 2))
-        self.group_number_combo = ttk.Combobox(controls_frame1_5, width=5, values=["1", "2", "3", "4"], state="readonly")
-        self.group_number_combo.pack(side=tk.LEFT, padx=2)
-        self.group_number_combo.current(0)  # Default to group 1
-        
-        # Group operator for this condition
-        tk.Label(controls_frame1_5, text="with:", font=("Arial", 9)).pack(side=tk.LEFT, padx=(5, 2))
-        self.condition_group_combo = ttk.Combobox(controls_frame1_5, width=8, values=["None", "$and", "$or", "$nor"], state="readonly")
-        self.condition_group_combo.pack(side=tk.LEFT, padx=2)
-        self.condition_group_combo.current(0)  # Default to None
-        
         add_condition_btn = tk.Button(controls_frame1_5, text="+ Add", command=self.add_condition,
                  bg="#4CAF50", fg="white", font=("Arial", 8, "bold"), width=7)
         add_condition_btn.pack(side=tk.LEFT, padx=5)
-        ToolTip(add_condition_btn, "Add this condition to the query")
+        ToolTip(add_condition_btn, "Add this condition to the selected group (or the group of the selected condition)")
         clear_conditions_btn = tk.Button(controls_frame1_5, text="🗑 Clear Conditions", command=self.clear_conditions,
                  bg="#f44336", fg="white", font=("Arial", 8, "bold"), width=16)
         clear_conditions_btn.pack(side=tk.LEFT, padx=2)
@@ -273,67 +481,75 @@ class MongoDBQueryGenerator:
         # Bind field and operator changes to update value suggestions
         self.field_combo.bind('<<ComboboxSelected>>', self.update_value_suggestions)
         self.operator_combo.bind('<<ComboboxSelected>>', self.update_value_suggestions)
+        self.value_combo.bind('<<ComboboxSelected>>', self.update_value_hint)
+        self.value_combo.bind('<KeyRelease>', self.update_value_hint, add='+')
         
         # Query builder controls - Row 3 (Info text)
         controls_frame2 = tk.Frame(self.builder_frame)
         controls_frame2.pack(fill=tk.X, padx=5, pady=(0, 5))
         
-        tk.Label(controls_frame2, text="ⓘ Use 'None' for ungrouped conditions. Same Group # with same operator will be grouped together. Different groups appear at top level.", 
-                font=("Calibri", 9, "bold"), fg="#666", wraplength=900, justify=tk.LEFT).pack(side=tk.LEFT, padx=2)
-        
-        tk.Label(controls_frame2, text="ⓘ Logical operators wrap all conditions in an array", 
-                font=("Calibri", 9, "bold"), fg="#666").pack(side=tk.LEFT, padx=5)
+        # Logical groups of any depth
+        tk.Label(controls_frame2, text="Group:", font=("Arial", 9)).pack(side=tk.LEFT, padx=2)
+        self.group_operator_combo = ttk.Combobox(controls_frame2, width=8, values=list(GROUP_DESCRIPTIONS), state="readonly")
+        self.group_operator_combo.pack(side=tk.LEFT, padx=2)
+        self.group_operator_combo.current(1)  # Default to $or
+        add_group_btn = tk.Button(controls_frame2, text="+ Group", command=self.add_condition_group,
+                 bg="#4CAF50", fg="white", font=("Arial", 8, "bold"), width=8)
+        add_group_btn.pack(side=tk.LEFT, padx=2)
+        ToolTip(add_group_btn, "Add a nested group inside the selected group")
+        set_operator_btn = tk.Button(controls_frame2, text="⇄ Set Operator", command=self.set_group_operator,
+                 font=("Arial", 8, "bold"), width=12)
+        set_operator_btn.pack(side=tk.LEFT, padx=2)
+        ToolTip(set_operator_btn, "Change the selected group's operator")
+        remove_node_btn = tk.Button(controls_frame2, text="✖ Remove", command=self.remove_selected_condition,
+                 bg="#f44336", fg="white", font=("Arial", 8, "bold"), width=9)
+        remove_node_btn.pack(side=tk.LEFT, padx=2)
+        ToolTip(remove_node_btn, "Remove the selected condition or group (Delete)")
+        
+        optimize_check = tk.Checkbutton(controls_frame2, text="Optimize filter", variable=self.optimize_filter,
+                 command=self.build_query_from_conditions, font=("Arial", 9))
+        optimize_check.pack(side=tk.LEFT, padx=(10, 2))
+        ToolTip(optimize_check, "Merge ranges, turn $or of equalities into $in, drop duplicates and flatten groups")
+        
+        tk.Label(controls_frame2, text="ⓘ Select a group below to add conditions and groups into it, e.g. (A or B) and (C or (D and E))", 
+                font=("Calibri", 9, "bold"), fg="#666").pack(side=tk.LEFT, padx=10)
         
         # Conditions list
         conditions_label = tk.Label(self.builder_frame, text="Active Conditions:", font=("Arial", 9, "bold"))
         conditions_label.pack(anchor=tk.W, padx=5, pady=(10, 2))
         
-        # Scrollable frame for conditions
-        conditions_canvas_frame = tk.Frame(self.builder_frame)
-        conditions_canvas_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        self.conditions_canvas = tk.Canvas(conditions_canvas_frame, height=100)
-        conditions_vscrollbar = tk.Scrollbar(conditions_canvas_frame, orient="vertical", command=self.conditions_canvas.yview)
-        conditions_hscrollbar = tk.Scrollbar(conditions_canvas_frame, orient="horizontal", command=self.conditions_canvas.xview)
-        self.conditions_frame = tk.Frame(self.conditions_canvas)
-        
-        self.conditions_canvas.configure(yscrollcommand=conditions_vscrollbar.set, xscrollcommand=conditions_hscrollbar.set)
+        # Match preview over the kept sample, refreshed in the background as conditions change
+        preview_frame = tk.Frame(self.builder_frame)
+        preview_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=(0, 5))
+        self.preview_matches_btn = tk.Button(preview_frame, text="👁 Sample Matches", command=self.show_sample_matches,
+                                             font=("Arial", 9), state=tk.DISABLED)
+        self.preview_matches_btn.pack(side=tk.RIGHT, padx=2)
+        ToolTip(self.preview_matches_btn, "Show the first sampled documents matching the filter")
+        self.preview_label = tk.Label(preview_frame, text="", font=("Arial", 9, "bold"), fg="#555", anchor=tk.W)
+        self.preview_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # Tree of groups and conditions, updated item by item as they change
+        conditions_tree_frame = tk.Frame(self.builder_frame)
+        conditions_tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.conditions_tree = ttk.Treeview(conditions_tree_frame, show='tree', height=5, selectmode='browse')
+        conditions_vscrollbar = tk.Scrollbar(conditions_tree_frame, orient="vertical", command=self.conditions_tree.yview)
+        conditions_hscrollbar = tk.Scrollbar(conditions_tree_frame, orient="horizontal", command=self.conditions_tree.xview)
+        self.conditions_tree.configure(yscrollcommand=conditions_vscrollbar.set, xscrollcommand=conditions_hscrollbar.set)
         
         conditions_vscrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         conditions_hscrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-        self.conditions_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        self.conditions_canvas_window = self.conditions_canvas.create_window((0, 0), window=self.conditions_frame, anchor="nw")
-        self.conditions_frame.bind("<Configure>", lambda e: self.conditions_canvas.configure(scrollregion=self.conditions_canvas.bbox("all")))
-        
-        # Enable mouse wheel scrolling for conditions canvas
-        def on_conditions_mousewheel(event):
-            # Only scroll if content is larger than canvas
-            bbox = self.conditions_canvas.bbox("all")
-            if bbox:
-                content_height = bbox[3] - bbox[1]
-                canvas_height = self.conditions_canvas.winfo_height()
-                if content_height > canvas_height:
-                    self.conditions_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        
-        def on_conditions_horizontal_mousewheel(event):
-            # Only scroll if content is wider than canvas
-            bbox = self.conditions_canvas.bbox("all")
-            if bbox:
-                content_width = bbox[2] - bbox[0]
-                canvas_width = self.conditions_canvas.winfo_width()
-                if content_width > canvas_width:
-                    self.conditions_canvas.xview_scroll(int(-1*(event.delta/120)), "units")
-        
-        # Store scroll functions for reuse
-        self.on_conditions_mousewheel = on_conditions_mousewheel
-        self.on_conditions_horizontal_mousewheel = on_conditions_horizontal_mousewheel
-        
-        # Bind scrolling to canvas and frame
-        self.conditions_canvas.bind("<MouseWheel>", on_conditions_mousewheel)
-        self.conditions_canvas.bind("<Shift-MouseWheel>", on_conditions_horizontal_mousewheel)
-        self.conditions_frame.bind("<MouseWheel>", on_conditions_mousewheel)
-        self.conditions_frame.bind("<Shift-MouseWheel>", on_conditions_horizontal_mousewheel)
+        self.conditions_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Colour groups by operator
+        self.conditions_tree.tag_configure('$and', background="#C8E6C9")  # Light green for AND
+        self.conditions_tree.tag_configure('$or', background="#FFF9C4")  # Light yellow for OR
+        self.conditions_tree.tag_configure('$nor', background="#FFCDD2")  # Light red for NOR
+        self.conditions_tree.tag_configure('condition', font=("Consolas", 9))
+        self.conditions_tree.bind('<Delete>', lambda e: self.remove_selected_condition())
+        self.condition_items = {}  # Query tree node -> Treeview item id
+        self.condition_nodes = {}  # Treeview item id -> query tree node
+        self.update_conditions_display()
         
         # Manual Query Section (initially hidden)
         self.manual_label = tk.Label(root, text="Manual Query:", font=("Arial", 10, "bold"))
@@ -540,6 +756,10 @@ class MongoDBQueryGenerator:
                                 font=("Arial", 9), anchor=tk.W, padx=10)
         version_label.pack(side=tk.LEFT)
         
+        # Memory held by the imported schema
+        self.memory_label = tk.Label(status_bar, text="", font=("Arial", 9), fg="#7f8c8d", padx=10)
+        self.memory_label.pack(side=tk.LEFT)
+        
         copyright_label = tk.Label(status_bar, text="© 2025 Rushikesh Patil", 
                                   font=("Arial", 9), anchor=tk.E, padx=10)
         copyright_label.pack(side=tk.RIGHT)
@@ -549,16 +769,15 @@ class MongoDBQueryGenerator:
         
         # Make all comboboxes searchable
         self.make_combobox_searchable(self.operation, on_change_callback=self.toggle_document_section)
-        self.make_combobox_searchable(self.field_combo)
+        self.make_combobox_searchable(self.field_combo, index_class=FieldSearchIndex)
         self.make_combobox_searchable(self.operator_combo)
         self.make_combobox_searchable(self.value_combo)
-        self.make_combobox_searchable(self.group_number_combo)
-        self.make_combobox_searchable(self.condition_group_combo)
+        self.make_combobox_searchable(self.group_operator_combo)
         
         # Check for updates on startup (after UI is ready)
         self.root.after(1000, self.startup_update_check)
     
-    def make_combobox_searchable(self, combobox, on_change_callback=None):
+    def make_combobox_searchable(self, combobox, on_change_callback=None, index_class=SubstringIndex):
         """Make a combobox searchable by filtering values as user types"""
         # Store reference to get original values dynamically
         def get_original_values():
@@ -567,10 +786,20 @@ class MongoDBQueryGenerator:
                 return combobox._original_values
             return list(combobox['values']) if combobox['values'] else []
         
+        def get_search_index():
+            # The index is rebuilt only when a new list is assigned to _original_values
+            original_values = get_original_values()
+            index = getattr(combobox, '_search_index', None)
+            if index is None or index.values is not original_values:
+                index = combobox._search_index = index_class(original_values)
+                combobox._filtered_values = None
+            return index
+        
         # Store the initial values
         combobox._original_values = list(combobox['values']) if combobox['values'] else []
         combobox._is_filtering = False
         combobox._typing_timer = None
+        combobox._filtered_values = None  # Values currently shown while filtering
         
         def show_dropdown():
             """Show dropdown without stealing focus using multiple methods"""
@@ -604,11 +833,6 @@ class MongoDBQueryGenerator:
                     combobox._typing_timer = None
                 return
             
-            # Reset to original values when user starts typing (to filter from full list)
-            if not combobox._is_filtering:
-                original_values = get_original_values()
-                combobox['values'] = original_values
-            
             # Get current text in combobox
             typed_text = combobox.get()
             
@@ -619,16 +843,20 @@ class MongoDBQueryGenerator:
                 # If empty, restore all values
                 combobox['values'] = original_values
                 combobox._is_filtering = False
+                combobox._filtered_values = None
                 # Don't auto-open dropdown when clearing - let user manually open it
                 # Cancel any pending timer
                 if combobox._typing_timer:
                     combobox.after_cancel(combobox._typing_timer)
                     combobox._typing_timer = None
             else:
-                # Filter values based on typed text (case-insensitive)
+                # Filter values based on typed text (case-insensitive) from the search index, best match first
                 typed_lower = typed_text.lower()
-                filtered_values = [item for item in original_values if typed_lower in str(item).lower()]
-                combobox['values'] = filtered_values
+                filtered_values = get_search_index().filter(typed_text)
+                # Re-assigning makes Tk rebuild the list, so skip it when nothing changed
+                if not combobox._is_filtering or filtered_values != combobox._filtered_values:
+                    combobox['values'] = filtered_values
+                    combobox._filtered_values = filtered_values
                 combobox._is_filtering = True
                 
                 # If only one match and it's exact, select it
@@ -674,6 +902,7 @@ class MongoDBQueryGenerator:
                 original_values = get_original_values()
                 combobox['values'] = original_values
                 combobox._is_filtering = False
+                combobox._filtered_values = None
             except:
                 pass
         
@@ -1118,24 +1347,16 @@ class MongoDBQueryGenerator:
         search_entry = tk.Entry(search_frame, textvariable=search_var, font=("Arial", 9))
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         
-        # Field list
-        list_frame = tk.Frame(dialog)
-        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-        
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        field_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, font=("Arial", 9))
-        field_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=field_listbox.yview)
+        # Field list - only the visible rows are materialized in the listbox
+        field_list = VirtualListbox(dialog)
+        field_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
         # Populate with fields
         def update_field_list(*args):
-            field_listbox.delete(0, tk.END)
-            search_text = search_var.get().lower()
-            for field in sorted(self.schema_fields):
-                if search_text in field.lower():
-                    field_listbox.insert(tk.END, field)
+            search_text = search_var.get()
+            # Ranked, typo-tolerant matches from the index built at import
+            fields = self.field_search_index.filter(search_text) if search_text else self.schema_fields
+            field_list.set_items(fields)
         
         search_var.trace('w', update_field_list)
         update_field_list()
@@ -1145,9 +1366,8 @@ class MongoDBQueryGenerator:
         btn_frame.pack(fill=tk.X, padx=10, pady=10)
         
         def insert_selected():
-            selection = field_listbox.curselection()
-            if selection:
-                field = field_listbox.get(selection[0])
+            field = field_list.get_selected()
+            if field is not None:
                 entry_widget.delete(0, tk.END)
                 entry_widget.insert(0, field)
                 dialog.destroy()
@@ -1162,7 +1382,13 @@ class MongoDBQueryGenerator:
         ToolTip(cancel_btn, "Close without selecting")
         
         # Double-click to insert
-        field_listbox.bind('<Double-Button-1>', lambda e: insert_selected())
+        field_list.listbox.bind('<Double-Button-1>', lambda e: insert_selected())
+        field_list.listbox.bind('<Return>', lambda e: insert_selected())
+        def focus_list(event):
+            field_list.listbox.focus_set()
+            return field_list.move_selection(0)
+        search_entry.bind('<Down>', focus_list)
+        search_entry.bind('<Return>', lambda e: insert_selected())
     
     def open_large_value_editor(self, entry_widget):
         """Open a large text editor window for entering complex values"""
@@ -1327,108 +1553,370 @@ class MongoDBQueryGenerator:
         self.query_text.insert(tk.END, '{}')
         
     def import_json_schema(self):
-        """Import JSON file from MongoDB Compass export to extract schema"""
+        """Import a Compass, mongoexport or mongodump export file to extract schema"""
+        if self.import_in_progress():
+            return
+        
         try:
             filename = filedialog.askopenfilename(
-                title="Select JSON file exported from MongoDB Compass",
-                filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+                title="Select a MongoDB Compass / mongoexport JSON or CSV file or a mongodump BSON file",
+                filetypes=IMPORT_FILE_TYPES
             )
             
             if not filename:
                 return
             
-            # Use utf-8-sig to handle BOM (Byte Order Mark) from MongoDB Compass exports
-            with open(filename, 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
+            self.start_import_job(self.create_import_job([filename]))
             
-            # Store the imported data
-            self.imported_data = data
-            
-            # Extract fields and their values from JSON
-            fields = set()
-            field_values = {}  # Store unique values per field
+        except Exception as e:
+            self.finish_import_job()
+            messagebox.showerror("Import Error", 
+                f"Failed to import file:\n{str(e)}")
+    
+    def import_multiple_files(self):
+        """Import several export files and merge them into one schema"""
+        if self.import_in_progress():
+            return
+        
+        try:
+            filenames = filedialog.askopenfilenames(
+                title="Select MongoDB export files to merge into one schema",
+                filetypes=IMPORT_FILE_TYPES
+            )
             
-            # MongoDB extended JSON type indicators
-            mongo_types = {'$numberLong', '$numberInt', '$numberDouble', '$numberDecimal',
-                          '$date', '$oid', '$binary', '$regex', '$timestamp', '$minKey', '$maxKey'}
+            if not filenames:
+                return
             
-            def unwrap_mongo_type(value):
-                """Unwrap MongoDB extended JSON types to get actual value"""
-                if isinstance(value, dict) and len(value) == 1:
-                    key = list(value.keys())[0]
-                    if key in mongo_types:
-                        return value[key]
-                return value
+            self.start_import_job(self.create_import_job(list(filenames)))
             
-            def extract_fields(obj, prefix=""):
-                """Recursively extract all field names and values from JSON object"""
-                if isinstance(obj, dict):
-                    # Skip if this is a MongoDB type wrapper (single key from mongo_types)
-                    if len(obj) == 1 and list(obj.keys())[0] in mongo_types:
-                        return
-                    
-                    for key, value in obj.items():
-                        # Skip MongoDB type keys
-                        if key in mongo_types:
-                            continue
-                            
-                        field_path = f"{prefix}.{key}" if prefix else key
-                        fields.add(field_path)
-                        
-                        # Store field values (unwrap MongoDB types)
-                        unwrapped_value = unwrap_mongo_type(value)
-                        
-                        if not isinstance(unwrapped_value, (dict, list)):
-                            # Store primitive values
-                            if field_path not in field_values:
-                                field_values[field_path] = set()
-                            
-                            # Limit stored values to prevent memory issues
-                            if len(field_values[field_path]) < 1000:
-                                field_values[field_path].add(str(unwrapped_value))
-                        
-                        if isinstance(value, (dict, list)):
-                            extract_fields(value, field_path)
-                            
-                elif isinstance(obj, list) and len(obj) > 0:
-                    # For arrays, extract fields from first element
-                    extract_fields(obj[0], prefix)
+        except Exception as e:
+            self.finish_import_job()
+            messagebox.showerror("Import Error", 
+                f"Failed to import files:\n{str(e)}")
+    
+    def import_directory(self):
+        """Import every export file in a directory and merge them into one schema"""
+        if self.import_in_progress():
+            return
+        
+        try:
+            directory = filedialog.askdirectory(title="Select a directory of MongoDB export files")
             
-            # Handle both single document and array of documents
-            if isinstance(data, list) and len(data) > 0:
-                # MongoDB Compass exports as array - process documents to get all possible fields
-                for doc in data[:1000]:  # Process first 1000 documents for comprehensive schema
-                    extract_fields(doc)
-            else:
-                extract_fields(data)
+            if not directory:
+                return
             
-            self.schema_fields = sorted(list(fields))
-            self.field_values = {k: sorted(list(v)) for k, v in field_values.items()}
-            self.field_combo['values'] = self.schema_fields
+            filenames = list_import_files(directory)
+            if not filenames:
+                messagebox.showwarning("No Export Files", 
+                    f"No JSON, NDJSON, BSON or CSV files were found in:\n{directory}")
+                return
             
-            # Update the original values for search functionality
-            self.field_combo._original_values = self.schema_fields
+            self.start_import_job(self.create_import_job(filenames))
             
-            # Auto-adjust combobox width to fit longest field name
-            if self.schema_fields:
-                max_len = max(len(field) for field in self.schema_fields)
-                # Set width to accommodate longest field, with reasonable limits
-                new_width = min(max(max_len, 30), 80)
-                self.field_combo.config(width=new_width)
-                self.field_combo.current(0)
-                messagebox.showinfo("Schema Imported", 
-                    f"Successfully imported {len(self.schema_fields)} fields from JSON!\n\n"
-                    f"Sample fields: {', '.join(self.schema_fields[:5])}{'...' if len(self.schema_fields) > 5 else ''}")
-            else:
-                messagebox.showwarning("No Fields Found", 
-                    "No fields were found in the JSON file.")
-                
-        except json.JSONDecodeError as e:
-            messagebox.showerror("Invalid JSON", 
-                f"The selected file is not a valid JSON file.\n\nError: {str(e)}")
         except Exception as e:
+            self.finish_import_job()
             messagebox.showerror("Import Error", 
-                f"Failed to import JSON file:\n{str(e)}")
+                f"Failed to import directory:\n{str(e)}")
+    
+    def create_import_job(self, filenames):
+        """Return the import job for one file or a merged import of several files"""
+        if len(filenames) == 1:
+            return SchemaImportJob(filenames[0], cache=self.schema_cache, sample_size=self.sample_size.get())
+        return MultiFileImportJob(filenames, cache=self.schema_cache, sample_size=self.sample_size.get())
+    
+    def import_in_progress(self):
+        """Return True (and bring its progress window to the front) if an import is running"""
+        if self.import_job is None:
+            return False
+        if self.import_dialog is not None:
+            self.import_dialog.lift()
+        return True
+    
+    def start_import_job(self, job):
+        """Start a background import and show its progress window"""
+        # Parse in a worker thread so the window stays responsive on large files
+        self.import_job = job
+        self.show_import_progress_dialog(job)
+        self.import_btn.config(state=tk.DISABLED)
+        job.start()
+        self.root.after(100, self.poll_import_job)
+    
+    def show_import_progress_dialog(self, job):
+        """Show a progress window for a running schema import"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Importing Schema")
+        dialog.geometry("500x230")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        self.import_dialog = dialog
+        
+        if isinstance(job, MultiFileImportJob):
+            title = f"Importing {len(job.filenames)} files"
+        else:
+            title = f"Importing {os.path.basename(job.filename)}"
+        tk.Label(dialog, text=title, 
+                font=("Arial", 10, "bold")).pack(padx=10, pady=(15, 5), anchor="w")
+        
+        # Progress bar follows the number of bytes read from the file
+        self.import_progress_bar = ttk.Progressbar(dialog, length=470, mode='determinate',
+                                                   maximum=max(job.total_bytes, 1))
+        self.import_progress_bar.pack(padx=10, pady=5)
+        
+        # Bytes read, throughput and fields found
+        self.import_bytes_label = tk.Label(dialog, text="Starting...", font=("Arial", 9), anchor="w")
+        self.import_bytes_label.pack(fill=tk.X, padx=10)
+        self.import_rate_label = tk.Label(dialog, text="", font=("Arial", 9), anchor="w")
+        self.import_rate_label.pack(fill=tk.X, padx=10)
+        self.import_fields_label = tk.Label(dialog, text="", font=("Arial", 9), anchor="w")
+        self.import_fields_label.pack(fill=tk.X, padx=10)
+        
+        cancel_btn = tk.Button(dialog, text="Cancel", command=self.cancel_import_job,
+                 bg="#f44336", fg="white", font=("Arial", 9, "bold"), width=10)
+        cancel_btn.pack(side=tk.RIGHT, padx=10, pady=10)
+        ToolTip(cancel_btn, "Stop the import and keep the current schema")
+        
+        # Closing the window cancels the import
+        dialog.protocol("WM_DELETE_WINDOW", self.cancel_import_job)
+    
+    def cancel_import_job(self):
+        """Cancel the running schema import"""
+        if self.import_job is not None:
+            self.import_job.cancel()
+            self.import_bytes_label.config(text="Cancelling...")
+    
+    def poll_import_job(self):
+        """Process messages from the import worker (runs on the Tk main thread)"""
+        job = self.import_job
+        if job is None:
+            return
+        
+        while True:
+            try:
+                kind, payload = job.messages.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == 'progress':
+                self.update_import_progress(payload)
+            elif kind == 'done':
+                self.finish_import_job()
+                self.apply_imported_schema(payload, job.filenames, from_cache=job.from_cache,
+                                           file_summaries=job.file_summaries,
+                                           resumed_bytes=job.resumed_offset,
+                                           field_index=job.field_index)
+                self.imported_filenames = job.filenames
+                self.update_file_watcher()
+                return
+            elif kind == 'cancelled':
+                # Keep the schema that was loaded before this import
+                self.finish_import_job()
+                return
+            elif kind == 'error':
+                self.finish_import_job()
+                if isinstance(payload, json.JSONDecodeError):
+                    messagebox.showerror("Invalid JSON", 
+                        f"The selected file is not a valid JSON file.\n\nError: {str(payload)}")
+                elif isinstance(payload, BSONError):
+                    messagebox.showerror("Invalid BSON", 
+                        f"The selected file is not a valid mongodump BSON file.\n\nError: {str(payload)}")
+                else:
+                    messagebox.showerror("Import Error", 
+                        f"Failed to import {self.describe_import_source(job.filenames)}:\n{str(payload)}")
+                return
+        
+        self.root.after(100, self.poll_import_job)
+    
+    def update_import_progress(self, progress):
+        """Refresh the import progress window"""
+        if self.import_dialog is None:
+            return
+        self.import_progress_bar['value'] = progress['bytes_read']
+        read_text = f"Read {self.format_size(progress['bytes_read'])} of {self.format_size(progress['total_bytes'])}"
+        if progress['resumed_offset']:
+            read_text += f" (first {self.format_size(progress['resumed_offset'])} reused from the last import)"
+        rate_text = f"{progress['bytes_per_sec'] / (1024 * 1024):,.1f} MB/s"
+        if progress['compression']:
+            # The progress bar follows the compressed file; also show how much data it expanded to
+            read_text += f" ({self.format_size(progress['uncompressed_bytes'])} uncompressed)"
+            rate_text = (f"{rate_text} compressed, "
+                         f"{progress['uncompressed_bytes_per_sec'] / (1024 * 1024):,.1f} MB/s uncompressed")
+        self.import_bytes_label.config(text=read_text)
+        self.import_rate_label.config(
+            text=f"{progress['documents']:,} documents ({progress['docs_per_sec']:,.0f} docs/s, {rate_text})")
+        self.import_fields_label.config(text=f"Fields found: {progress['fields']:,}")
+    
+    def finish_import_job(self):
+        """Close the progress window and re-enable importing"""
+        self.import_job = None
+        if self.import_dialog is not None:
+            self.import_dialog.destroy()
+            self.import_dialog = None
+        self.import_btn.config(state=tk.NORMAL)
+    
+    def format_size(self, num_bytes):
+        """Format a byte count for display"""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if num_bytes < 1024 or unit == 'GB':
+                return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+            num_bytes /= 1024
+    
+    def describe_import_source(self, filenames):
+        """Name the imported file, or count the files of a multi-file import, for messages"""
+        if len(filenames) == 1:
+            return os.path.basename(filenames[0])
+        return f"{len(filenames)} files"
+    
+    def apply_imported_schema(self, extractor, filenames, from_cache=False, file_summaries=None, resumed_bytes=0,
+                              field_index=None):
+        """Replace the current schema with the result of a finished import"""
+        sample_count = self.install_schema(extractor, file_summaries, field_index)
+        source = self.describe_import_source(filenames)
+        
+        if self.schema_fields:
+            self.field_combo.current(0)
+            breakdown_hint = ""
+            if self.file_summaries:
+                breakdown_hint = "\n\nImport → Schema by File shows which fields appear in each file."
+            messagebox.showinfo("Schema Imported", 
+                f"Successfully imported {len(self.schema_fields)} fields from {source}!\n"
+                f"Scanned {extractor.document_count:,} documents"
+                f"{f' in {len(self.file_summaries)} files' if self.file_summaries else ''}, "
+                f"values sampled from {sample_count:,}."
+                f"{' (Loaded from cache)' if from_cache else ''}"
+                f"{f' (Only data appended after the first {self.format_size(resumed_bytes)} was parsed)' if resumed_bytes else ''}\n\n"
+                f"Sample fields: {', '.join(self.schema_fields[:5])}{'...' if len(self.schema_fields) > 5 else ''}"
+                f"{breakdown_hint}")
+        else:
+            messagebox.showwarning("No Fields Found", 
+                f"No fields were found in {source}.")
+    
+    def install_schema(self, extractor, file_summaries=None, field_index=None):
+        """Swap the fields, value suggestions and statistics of an import into the UI.
+        
+        field_index is the FieldSearchIndex the import job built over the sorted
+        fields; it is built here if missing. Returns the number of sampled documents.
+        """
+        # Only a compact columnar copy of the sample is kept, and only when asked for
+        sample = extractor.reservoir.documents
+        sample_count = len(sample)
+        if self.keep_sample_documents.get() and self.columnar_sample.get() and numpy_available():
+            self.imported_data = ColumnarSampleStore(sample)
+        elif self.keep_sample_documents.get():
+            self.imported_data = SampleStore(sample)
+        else:
+            self.imported_data = None
+        
+        if field_index is None:
+            field_index = FieldSearchIndex(extractor.sorted_fields())
+        self.field_search_index = field_index
+        self.schema_fields = field_index.values
+        self.field_values = extractor.suggested_values()
+        self.field_stats = extractor.field_stats
+        for stats in self.field_stats.values():
+            stats.compact()
+        self.imported_document_count = extractor.document_count
+        self.file_summaries = file_summaries or {}
+        
+        # Drop the parsed documents and give the memory back before continuing
+        extractor.reservoir.documents = []
+        del sample
+        gc.collect()
+        self.update_memory_label()
+        self.schedule_match_preview()
+        self.field_combo['values'] = self.schema_fields
+        
+        # Update the original values for search functionality, sharing the index built at import
+        self.field_combo._original_values = self.schema_fields
+        self.field_combo._search_index = self.field_search_index
+        
+        # Auto-adjust combobox width to fit longest field name
+        if self.schema_fields:
+            max_len = max(len(field) for field in self.schema_fields)
+            # Set width to accommodate longest field, with reasonable limits
+            new_width = min(max(max_len, 30), 80)
+            self.field_combo.config(width=new_width)
+        return sample_count
+    
+    def update_file_watcher(self):
+        """Start or stop watching the imported files, following the Import menu option"""
+        if self.file_watcher_after is not None:
+            self.root.after_cancel(self.file_watcher_after)
+            self.file_watcher_after = None
+        if self.file_watcher is not None:
+            self.file_watcher.stop()
+            self.file_watcher = None
+        if not self.watch_imported_files.get() or not self.imported_filenames:
+            return
+        self.file_watcher = FileWatcher(self.imported_filenames)
+        self.file_watcher.start()
+        self.file_watcher_after = self.root.after(500, self.poll_file_watcher)
+    
+    def poll_file_watcher(self):
+        """Start a background refresh when a watched file changed (runs on the Tk main thread)"""
+        self.file_watcher_after = None
+        watcher = self.file_watcher
+        if watcher is None or watcher.stop_event.is_set():
+            return
+        # A manual import takes precedence; the change is picked up again after it
+        if watcher.changed() and self.refresh_job is None and self.import_job is None:
+            # The cache makes appended NDJSON/BSON files and unchanged files of a set cheap to redo
+            self.refresh_job = self.create_import_job(self.imported_filenames)
+            self.refresh_job.start()
+            self.memory_label.config(text="Source file changed - refreshing schema...")
+            self.root.after(100, self.poll_refresh_job)
+        self.file_watcher_after = self.root.after(500, self.poll_file_watcher)
+    
+    def poll_refresh_job(self):
+        """Process messages from a watcher-triggered refresh (runs on the Tk main thread)"""
+        job = self.refresh_job
+        if job is None:
+            return
+        
+        while True:
+            try:
+                kind, payload = job.messages.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == 'progress':
+                continue
+            self.refresh_job = None
+            if kind == 'done' and self.import_job is None and job.filenames == self.imported_filenames:
+                self.refresh_imported_schema(payload, job)
+            elif kind == 'error':
+                # The file may be mid-rewrite; the next settled change triggers another refresh
+                self.update_memory_label()
+                self.memory_label.config(text=f"{self.memory_label.cget('text')}  Schema refresh failed: {payload}")
+            else:
+                self.update_memory_label()
+            return
+        
+        self.root.after(100, self.poll_refresh_job)
+    
+    def refresh_imported_schema(self, extractor, job):
+        """Swap in a refreshed schema, keeping the field, operator and value being edited"""
+        field = self.field_combo.get()
+        value = self.value_combo.get()
+        self.install_schema(extractor, job.file_summaries, job.field_index)
+        self.field_combo.set(field)
+        if field:
+            self.update_value_suggestions()
+            self.value_combo.set(value)
+        self.memory_label.config(
+            text=f"{self.memory_label.cget('text')}  Refreshed at {datetime.now().strftime('%H:%M:%S')}")
+    
+    def update_memory_label(self):
+        """Show the memory held by the imported schema in the status bar"""
+        if not self.field_stats and self.imported_data is None:
+            self.memory_label.config(text="")
+            return
+        
+        text = f"Schema: {self.format_size(estimate_memory(self.field_stats) + estimate_memory(self.field_values))}"
+        if self.imported_data is not None:
+            layout = "columnar, " if isinstance(self.imported_data, ColumnarSampleStore) else ""
+            text += (f" (+ sample {self.format_size(self.imported_data.memory_usage())}, "
+                     f"{layout}{self.imported_data.row_count:,} docs)")
+        self.memory_label.config(text=text)
     
     def update_value_suggestions(self, event=None):
         """Update value suggestions based on selected field and operator"""
@@ -1474,6 +1962,18 @@ class MongoDBQueryGenerator:
                 self.value_combo.config(state='normal')
                 self.value_combo.set('[value1, value2, ...]')
         
+        elif operator in ['$gt', '$gte', '$lt', '$lte'] and field in self.field_stats and self.field_stats[field].range_suggestions():
+            # Suggest min/p10/median/p90/max from the quantile sketch for range bounds
+            stats = self.field_stats[field]
+            values = [value for _, value in stats.range_suggestions()]
+            if stats.numeric_kind == 'date':
+                # Date bounds must be typed, a string never compares with a date
+                values = [f'ISODate("{value}")' for value in values]
+            self.value_combo['values'] = values
+            self.value_combo._original_values = values
+            self.value_combo.config(state='normal')
+            self.value_combo.set(values[len(values) // 2])
+        
         else:
             # For other operators, show actual values from field if available
             if field in self.field_values and self.field_values[field]:
@@ -1487,9 +1987,42 @@ class MongoDBQueryGenerator:
                 self.value_combo['values'] = []
                 self.value_combo._original_values = []
                 self.value_combo.config(state='normal')
+        
+        self.update_value_hint()
+    
+    def update_value_hint(self, event=None):
+        """Show range statistics and the estimated share of documents a range bound selects"""
+        field = self.field_combo.get()
+        operator = self.operator_combo.get()
+        stats = self.field_stats.get(field)
+        
+        if operator not in ['$gt', '$gte', '$lt', '$lte'] or not stats or not stats.range_suggestions():
+            self.value_hint_label.config(text="")
+            return
+        
+        summary = " · ".join(f"{label} {value}" for label, value in stats.range_suggestions())
+        value = self.value_combo.get().strip()
+        bound = value
+        if value and stats.numeric_kind == 'date':
+            # Only an ISODate() bound reaches the server as a date
+            parsed = parse_value(value, operator)
+            if not isinstance(parsed, dict) or '$date' not in parsed:
+                self.value_hint_label.config(text=f"{summary}  |  use ISODate(\"...\"), a plain string matches no dates")
+                return
+            bound = parsed['$date']
+        fraction = stats.range_fraction(operator, bound) if value else None
+        
+        if fraction is None:
+            self.value_hint_label.config(text=summary)
+            return
+        
+        # Scale by how many documents actually carry a typed value for this field
+        if self.imported_document_count:
+            fraction *= min(1.0, stats.quantiles.count / self.imported_document_count)
+        self.value_hint_label.config(text=f"{summary}  |  {operator} {value} ≈ {fraction:.1%} of documents")
     
     def open_value_selector(self):
-        """Open a dialog to select multiple values with checkboxes"""
+        """Open a dialog to select multiple values from a searchable checklist"""
         field = self.field_combo.get()
         operator = self.operator_combo.get()
         
@@ -1518,71 +2051,68 @@ class MongoDBQueryGenerator:
         tk.Label(header_frame, text=f"Select values for: {field}", 
                 font=("Arial", 10, "bold")).pack(side=tk.LEFT)
         
-        # Select All / Deselect All buttons
-        btn_frame = tk.Frame(header_frame)
+        # Estimated cardinality from the import statistics
+        stats = self.field_stats.get(field)
+        value_counts = dict(stats.value_counts()) if stats else {}
+        if stats:
+            distinct = stats.distinct_estimate()
+            if distinct > len(available_values):
+                summary = f"~{distinct:,} distinct values, showing the {len(available_values):,} most frequent"
+            else:
+                summary = f"{distinct:,} distinct values, most frequent first"
+            tk.Label(header_frame, text=summary, font=("Arial", 9), fg="#666").pack(side=tk.LEFT, padx=10)
+        
+        # Search box; the buttons act on the values matching it
+        search_frame = tk.Frame(dialog)
+        search_frame.pack(fill=tk.X, padx=10)
+        tk.Label(search_frame, text="Search:", font=("Arial", 9)).pack(side=tk.LEFT)
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=search_var, font=("Arial", 9))
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
+        btn_frame = tk.Frame(search_frame)
         btn_frame.pack(side=tk.RIGHT)
         
-        def select_all():
-            for var in check_vars:
-                var.set(True)
-        
-        def deselect_all():
-            for var in check_vars:
-                var.set(False)
-        
-        select_all_btn = tk.Button(btn_frame, text="Select All", command=select_all, 
-                 font=("Arial", 8))
-        select_all_btn.pack(side=tk.LEFT, padx=2)
-        ToolTip(select_all_btn, "Select all values")
-        deselect_all_btn = tk.Button(btn_frame, text="Deselect All", command=deselect_all,
-                 font=("Arial", 8))
-        deselect_all_btn.pack(side=tk.LEFT, padx=2)
-        ToolTip(deselect_all_btn, "Deselect all values")
-        
-        # Scrollable frame for checkboxes
-        canvas = tk.Canvas(dialog)
-        scrollbar = tk.Scrollbar(dialog, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas)
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Enable mouse wheel scrolling
-        def on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        select_btn = tk.Button(btn_frame, text="Select Matching",
+                 command=lambda: checklist.check_items(True), font=("Arial", 8))
+        select_btn.pack(side=tk.LEFT, padx=2)
+        ToolTip(select_btn, "Select every value matching the search (all values when the search is empty)")
+        deselect_btn = tk.Button(btn_frame, text="Deselect Matching",
+                 command=lambda: checklist.check_items(False), font=("Arial", 8))
+        deselect_btn.pack(side=tk.LEFT, padx=2)
+        ToolTip(deselect_btn, "Deselect every value matching the search (all values when the search is empty)")
         
-        canvas.bind_all("<MouseWheel>", on_mousewheel)
+        status_label = tk.Label(dialog, font=("Arial", 8), fg="#666", anchor="w")
+        status_label.pack(fill=tk.X, padx=10, pady=(5, 0))
         
-        # Unbind when dialog closes
-        def on_close():
-            canvas.unbind_all("<MouseWheel>")
-            dialog.destroy()
+        def update_status():
+            status_label.config(text=f"{len(checklist.items):,} of {len(available_values):,} values shown"
+                                     f"  |  {len(checklist.checked):,} selected")
         
-        dialog.protocol("WM_DELETE_WINDOW", on_close)
+        # Only the visible rows are drawn; the checked values live in a bitset
+        labels = [f"{value}  ({value_counts[value]:,})" if value in value_counts else value
+                  for value in available_values]
+        checklist = VirtualChecklist(dialog, available_values, labels, on_change=update_status)
+        checklist.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        value_index = SubstringIndex(available_values)
         
-        # Create checkboxes for each value
-        check_vars = []
-        for value in available_values:
-            var = tk.BooleanVar()
-            check_vars.append(var)
-            cb = tk.Checkbutton(scrollable_frame, text=value, variable=var, 
-                               font=("Arial", 9), anchor="w")
-            cb.pack(fill=tk.X, padx=10, pady=2)
+        def update_value_list(*args):
+            search_text = search_var.get()
+            checklist.set_items(value_index.search(search_text) if search_text else range(len(available_values)))
+            update_status()
         
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        search_var.trace('w', update_value_list)
+        update_status()
+        search_entry.focus_set()
+        
+        on_close = dialog.destroy
         
         # Footer with OK/Cancel buttons
         footer_frame = tk.Frame(dialog)
         footer_frame.pack(fill=tk.X, padx=10, pady=10)
         
         def apply_selection():
-            selected = [available_values[i] for i, var in enumerate(check_vars) if var.get()]
+            selected = checklist.checked_values()
             
             if not selected:
                 messagebox.showwarning("No Selection", "Please select at least one value.")
@@ -1617,8 +2147,6 @@ class MongoDBQueryGenerator:
         field = self.field_combo.get()
         operator = self.operator_combo.get()
         value = self.value_combo.get().strip()
-        group_num = self.group_number_combo.get()
-        group_op = self.condition_group_combo.get()
         
         if not field:
             messagebox.showwarning("Missing Field", "Please select a field.")
@@ -1632,30 +2160,13 @@ class MongoDBQueryGenerator:
             messagebox.showwarning("Missing Value", "Please enter a value.")
             return
         
-        # Create condition object with group number and operator
-        condition = {
-            'field': field,
-            'operator': operator,
-            'value': value,
-            'group_num': group_num,
-            'group_op': group_op
-        }
-        
-        # Check if condition with same field and operator already exists
-        existing_index = None
-        for i, cond in enumerate(self.query_conditions):
-            if cond['field'] == field and cond['operator'] == operator:
-                existing_index = i
-                break
-        
-        if existing_index is not None:
-            # Update existing condition
-            self.query_conditions[existing_index] = condition
+        # In an $and group this updates the condition with the same field and operator, if any
+        node, created = self.query_tree.add_condition(self.selected_group(), field, operator, value)
+        if created:
+            self.insert_condition_item(node)
         else:
-            # Add new condition
-            self.query_conditions.append(condition)
-        
-        self.update_conditions_display()
+            self.conditions_tree.item(self.condition_items[node], text=node.label())
+        self.conditions_tree.see(self.condition_items[node])
         
         # Clear value combo
         self.value_combo.set('')
@@ -1663,34 +2174,83 @@ class MongoDBQueryGenerator:
         # Update manual query text
         self.build_query_from_conditions()
     
-    def remove_condition(self, index):
-        """Remove a condition from the list"""
-        if 0 <= index < len(self.query_conditions):
-            del self.query_conditions[index]
-            self.update_conditions_display()
-            # Rebuild query if there are still conditions, otherwise clear it
-            if self.query_conditions:
-                self.build_query_from_conditions()
-            else:
-                self.builder_filter_query = "{}"
+    def selected_group(self):
+        """Return the group selected in the conditions tree, or the group of the selected condition"""
+        selection = self.conditions_tree.selection()
+        node = self.condition_nodes.get(selection[0]) if selection else None
+        if node is None:
+            return self.query_tree.root
+        return node if isinstance(node, GroupNode) else node.parent
+    
+    def insert_condition_item(self, node):
+        """Show a new node, and anything below it, in the conditions tree"""
+        parent_item = self.condition_items[node.parent]
+        if isinstance(node, GroupNode):
+            item = self.conditions_tree.insert(parent_item, tk.END, text=node.label(), tags=(node.operator,), open=True)
+        else:
+            item = self.conditions_tree.insert(parent_item, tk.END, text=node.label(), tags=('condition',))
+        self.condition_items[node] = item
+        self.condition_nodes[item] = node
+        if isinstance(node, GroupNode):
+            for child in node.children:
+                self.insert_condition_item(child)
+    
+    def add_condition_group(self):
+        """Add a nested group inside the selected group and select it"""
+        group = self.query_tree.add_group(self.selected_group(), self.group_operator_combo.get())
+        self.insert_condition_item(group)
+        item = self.condition_items[group]
+        self.conditions_tree.selection_set(item)
+        self.conditions_tree.see(item)
+        self.build_query_from_conditions()
+    
+    def set_group_operator(self):
+        """Change the operator of the selected group"""
+        group = self.selected_group()
+        group.set_operator(self.group_operator_combo.get())
+        self.conditions_tree.item(self.condition_items[group], text=group.label(), tags=(group.operator,))
+        self.build_query_from_conditions()
+    
+    def remove_selected_condition(self):
+        """Remove the selected condition or group"""
+        selection = self.conditions_tree.selection()
+        node = self.condition_nodes.get(selection[0]) if selection else None
+        if node is None or node is self.query_tree.root:
+            return
+        self.remove_condition(node)
+    
+    def remove_condition(self, node):
+        """Remove a condition or group from the tree"""
+        removed = [node] + (list(node.walk()) if isinstance(node, GroupNode) else [])
+        self.conditions_tree.delete(self.condition_items[node])
+        for child in removed:
+            del self.condition_nodes[self.condition_items.pop(child)]
+        self.query_tree.remove(node)
+        # Rebuild query if there are still conditions, otherwise clear it
+        if self.query_tree:
+            self.build_query_from_conditions()
+        else:
+            self.builder_filter_query = "{}"
+            self.schedule_match_preview()
     
     def clear_conditions(self):
         """Clear all query conditions"""
-        self.query_conditions = []
+        self.query_tree.clear()
         self.update_conditions_display()
         self.builder_filter_query = "{}"
+        self.schedule_match_preview()
     
     def view_generated_query(self):
         """Show the generated query in a popup window"""
-        if not self.query_conditions:
+        if not self.query_tree:
             messagebox.showinfo("No Conditions", "Please add at least one condition to generate a query.")
             return
         
         # Build the query (stores in self.builder_filter_query)
         self.build_query_from_conditions()
         
-        # Get the generated query text
-        query_text = self.builder_filter_query if hasattr(self, 'builder_filter_query') else "{}"
+        # Get the generated query text, with dates and ObjectIds as shell helpers
+        query_text = to_shell(self.builder_filter_query) if hasattr(self, 'builder_filter_query') else "{}"
         
         # Create popup window
         view_window = tk.Toplevel(self.root)
@@ -1708,11 +2268,28 @@ class MongoDBQueryGenerator:
         query_frame = tk.Frame(view_window, padx=10, pady=10)
         query_frame.pack(fill=tk.BOTH, expand=True)
         
-        query_display = scrolledtext.ScrolledText(query_frame, font=("Consolas", 10), 
-                                                  wrap=tk.WORD, bg="#f5f5f5")
-        query_display.pack(fill=tk.BOTH, expand=True)
-        query_display.insert(tk.END, query_text)
-        query_display.config(state=tk.DISABLED)
+        def add_query_display(parent, title, text):
+            """Add a read-only query text area, with a title when comparing"""
+            if title:
+                tk.Label(parent, text=title, font=("Arial", 9, "bold")).pack(anchor=tk.W)
+            display = scrolledtext.ScrolledText(parent, font=("Consolas", 10), wrap=tk.WORD, bg="#f5f5f5")
+            display.pack(fill=tk.BOTH, expand=True)
+            display.insert(tk.END, text)
+            display.config(state=tk.DISABLED)
+        
+        if self.optimize_filter.get():
+            # Before and after the optimizer, with the rewrites it applied
+            view_window.geometry("1200x650")
+            notes = "\n".join(f"• {note}" for note in self.optimizer_notes) or "• Already as simple as it gets"
+            tk.Label(query_frame, text=notes, font=("Arial", 9), fg="#555", justify=tk.LEFT).pack(anchor=tk.W, pady=(0, 5))
+            before_frame = tk.Frame(query_frame)
+            before_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
+            add_query_display(before_frame, "As built:", to_shell(self.query_tree.to_json()))
+            after_frame = tk.Frame(query_frame)
+            after_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0))
+            add_query_display(after_frame, "Optimized (used for the generated script):", query_text)
+        else:
+            add_query_display(query_frame, None, query_text)
         
         # Footer with buttons
         footer_frame = tk.Frame(view_window, pady=10)
@@ -1731,230 +2308,137 @@ class MongoDBQueryGenerator:
         messagebox.showinfo("Copied", "Query copied to clipboard!", parent=window)
     
     def update_conditions_display(self):
-        """Update the display of active conditions"""
-        # Clear existing widgets
-        for widget in self.conditions_frame.winfo_children():
-            widget.destroy()
-        
-        if not self.query_conditions:
-            tk.Label(self.conditions_frame, text="No conditions added yet", 
-                    font=("Arial", 9), fg="gray").pack(pady=10)
-            return
-        
-        # Display each condition with group number and operator indicator
-        for i, condition in enumerate(self.query_conditions):
-            # Choose color based on group operator
-            group_op = condition.get('group_op', 'None')
-            group_num = condition.get('group_num', '1')
-            
-            if group_op == 'None':
-                bg_color = "#E0E0E0"  # Gray for ungrouped
-            elif group_op == '$or':
-                bg_color = "#FFF9C4"  # Light yellow for OR
-            elif group_op == '$nor':
-                bg_color = "#FFCDD2"  # Light red for NOR
-            else:
-                bg_color = "#C8E6C9"  # Light green for AND
-            
-            cond_frame = tk.Frame(self.conditions_frame, relief=tk.RAISED, bd=1, bg=bg_color)
-            cond_frame.pack(fill=tk.X, padx=2, pady=2)
-            
-            # Remove button
-            tk.Button(cond_frame, text="✖", command=lambda idx=i: self.remove_condition(idx),
-                     bg="#f44336", fg="white", font=("Arial", 8, "bold"),
-                     width=3).pack(side=tk.LEFT, padx=3)
-            
-            # Show group number badge
-            tk.Label(cond_frame, text=f"#{group_num}", font=("Arial", 8, "bold"), 
-                    bg="#555", fg="white", width=4, relief=tk.RAISED).pack(side=tk.LEFT, padx=2)
-            
-            # Show group operator badge
-            tk.Label(cond_frame, text=group_op, font=("Arial", 8, "bold"), 
-                    bg=bg_color, fg="#333", width=6).pack(side=tk.LEFT, padx=2)
-            
-            # Show condition
-            cond_text = f"{condition['field']} {condition['operator']} {condition['value']}"
-            tk.Label(cond_frame, text=cond_text, font=("Consolas", 9), 
-                    bg=bg_color, anchor="w").pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
-            
-            # Bind scroll events to the condition frame and all its children
-            cond_frame.bind("<MouseWheel>", self.on_conditions_mousewheel)
-            cond_frame.bind("<Shift-MouseWheel>", self.on_conditions_horizontal_mousewheel)
-            for child in cond_frame.winfo_children():
-                child.bind("<MouseWheel>", self.on_conditions_mousewheel)
-                child.bind("<Shift-MouseWheel>", self.on_conditions_horizontal_mousewheel)
+        """Redraw the whole conditions tree (edits update single items instead)"""
+        self.conditions_tree.delete(*self.conditions_tree.get_children())
+        root = self.query_tree.root
+        root_item = self.conditions_tree.insert('', tk.END, text=root.label(), tags=(root.operator,), open=True)
+        self.condition_items = {root: root_item}
+        self.condition_nodes = {root_item: root}
+        for child in root.children:
+            self.insert_condition_item(child)
     
     def build_query_from_conditions(self):
-        """Build MongoDB query from conditions with explicit group numbers"""
-        if not self.query_conditions:
+        """Build MongoDB query from conditions, recompiling only the groups that changed"""
+        if not self.query_tree:
             return
         
-        # Organize conditions by group number
-        groups_dict = {}
-        ungrouped_conditions = []  # Store conditions with 'None' operator
-        
-        for condition in self.query_conditions:
-            group_num = condition.get('group_num', '1')
-            group_op = condition.get('group_op', 'None')
-            
-            # Parse and build condition object first
-            field = condition['field']
-            operator = condition['operator']
-            value = condition['value']
-            parsed_value = self.parse_value(value, operator)
-            
-            cond_obj = {}
-            if operator == '$eq':
-                cond_obj[field] = parsed_value
-            elif operator in ['$in', '$nin', '$all']:
-                if not isinstance(parsed_value, list):
-                    parsed_value = [parsed_value]
-                cond_obj[field] = {operator: parsed_value}
-            elif operator == '$exists':
-                cond_obj[field] = {operator: parsed_value.lower() == 'true'}
-            elif operator == '$regex':
-                cond_obj[field] = {operator: parsed_value}
-            else:
-                cond_obj[field] = {operator: parsed_value}
-            
-            # Add to appropriate collection
-            if group_op == 'None':
-                ungrouped_conditions.append(cond_obj)
-            else:
-                if group_num not in groups_dict:
-                    groups_dict[group_num] = {
-                        'operator': group_op,
-                        'conditions': []
-                    }
-                groups_dict[group_num]['conditions'].append(cond_obj)
-        
-        # Build query from groups
-        if len(groups_dict) == 0 and len(ungrouped_conditions) == 0:
-            query = {}
-        elif len(groups_dict) == 0 and len(ungrouped_conditions) > 0:
-            # Only ungrouped conditions - check for field conflicts
-            query = {}
-            fields_seen = {}
-            
-            for cond in ungrouped_conditions:
-                field_name = list(cond.keys())[0]
-                if field_name in fields_seen:
-                    # Field conflict - need to use $and
-                    query = {'$and': ungrouped_conditions}
-                    break
-                fields_seen[field_name] = True
-                query.update(cond)
-            else:
-                # No conflicts, simple merge worked
-                pass
-        elif len(groups_dict) == 1 and len(ungrouped_conditions) == 0:
-            # Single group, no ungrouped
-            group_num = list(groups_dict.keys())[0]
-            group = groups_dict[group_num]
-            
-            if len(group['conditions']) == 1:
-                query = group['conditions'][0]
-            else:
-                query = {group['operator']: group['conditions']}
+        # Store the generated filter query for later use (don't automatically display)
+        if self.optimize_filter.get():
+            query, self.optimizer_notes = optimize_query(self.query_tree.compile())
+            self.builder_filter_query = json.dumps(query, indent=4)
         else:
-            # Multiple groups or mix of grouped and ungrouped - combine them at top level
-            result = {}
-            
-            for group_num in sorted(groups_dict.keys()):
-                group = groups_dict[group_num]
-                group_op = group['operator']
-                
-                # Build this group
-                if len(group['conditions']) == 1:
-                    group_query = group['conditions'][0]
-                else:
-                    group_query = {group_op: group['conditions']}
-                
-                # Add to result
-                if group_op not in result:
-                    result[group_op] = []
-                
-                # If it's already wrapped in the same operator, unwrap it
-                if isinstance(group_query, dict) and group_op in group_query:
-                    result[group_op].extend(group_query[group_op])
-                else:
-                    result[group_op].append(group_query)
-            
-            # Add ungrouped conditions to result
-            if ungrouped_conditions:
-                # Check if ungrouped conditions have field conflicts
-                ungrouped_fields = {}
-                has_conflict = False
-                for cond in ungrouped_conditions:
-                    field_name = list(cond.keys())[0]
-                    if field_name in ungrouped_fields:
-                        has_conflict = True
-                        break
-                    ungrouped_fields[field_name] = True
-                
-                if has_conflict:
-                    # Wrap ungrouped conditions in $and
-                    if '$and' not in result:
-                        result['$and'] = []
-                    result['$and'].extend(ungrouped_conditions)
-                else:
-                    # No conflicts, add directly
-                    for cond in ungrouped_conditions:
-                        result.update(cond)
-            
-            # If only one operator type at top level, use it directly
-            if len(result) == 1 and list(result.keys())[0] in ['$and', '$or', '$nor']:
-                op = list(result.keys())[0]
-                query = {op: result[op]}
-            else:
-                # Multiple operators at top level or mix - keep them separate
-                query = result
-        
-        # Format query and store it (don't automatically display)
-        query_str = json.dumps(query, indent=4)
+            self.optimizer_notes = []
+            self.builder_filter_query = self.query_tree.to_json()
+        self.schedule_match_preview()
+    
+    def schedule_match_preview(self):
+        """Refresh the match preview once the conditions stop changing"""
+        if self.preview_after is not None:
+            self.root.after_cancel(self.preview_after)
+        self.preview_after = self.root.after(PREVIEW_DELAY_MS, self.start_match_preview)
+    
+    def start_match_preview(self):
+        """Count the sampled documents matching the built filter in a background thread"""
+        self.preview_after = None
+        if self.preview_job is not None:
+            # Superseded by the new conditions
+            self.preview_job.cancel()
+            self.preview_job = None
+        self.preview_result = None
+        self.preview_matches_btn.config(state=tk.DISABLED)
+        if not self.query_tree:
+            self.preview_label.config(text="")
+            return
+        if self.imported_data is None:
+            self.preview_label.config(
+                text="Match preview: turn on Import → Keep Sample Documents and import an export to count matches")
+            return
         
-        # Store the generated filter query for later use
-        self.builder_filter_query = query_str
+        self.preview_label.config(text="Match preview: counting...")
+        # The filter as generated, parsed again so the worker never shares the tree's documents
+        self.preview_job = QueryPreviewJob(json.loads(self.builder_filter_query), self.imported_data,
+                                           self.imported_document_count)
+        self.preview_job.start()
+        self.root.after(50, self.poll_match_preview, self.preview_job)
     
-    def parse_value(self, value, operator):
-        """Parse value string to appropriate Python type"""
-        value = value.strip()
+    def poll_match_preview(self, job):
+        """Show the result of a match preview job (runs on the Tk main thread)"""
+        if job is not self.preview_job:
+            return
+        try:
+            kind, payload = job.messages.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self.poll_match_preview, job)
+            return
         
-        # Handle arrays for $in, $nin, $all operators
-        if operator in ['$in', '$nin', '$all']:
-            if value.startswith('[') and value.endswith(']'):
-                try:
-                    return json.loads(value)
-                except:
-                    # Split by comma
-                    return [v.strip().strip('"\'') for v in value[1:-1].split(',')]
+        self.preview_job = None
+        if kind == 'done':
+            self.preview_result = payload
+            if payload.exact():
+                text = f"Match preview: {payload.matched:,} of {payload.evaluated:,} documents match"
             else:
-                return [v.strip().strip('"\'') for v in value.split(',')]
+                text = (f"Match preview: ≈ {payload.estimated_matches():,} of {payload.document_count:,} documents "
+                        f"match ({payload.matched:,} of {payload.evaluated:,} sampled)")
+            self.preview_label.config(text=text)
+            if payload.samples:
+                self.preview_matches_btn.config(state=tk.NORMAL)
+        elif kind == 'error':
+            self.preview_label.config(text=f"Match preview unavailable: {payload}")
+    
+    def show_sample_matches(self):
+        """Show the first sampled documents matching the built filter"""
+        result = self.preview_result
+        if result is None or not result.samples:
+            return
         
-        # Try to parse as number
-        try:
-            if '.' in value:
-                return float(value)
-            return int(value)
-        except ValueError:
-            pass
-        
-        # Check for boolean
-        if value.lower() in ['true', 'false']:
-            return value.lower() == 'true'
-        
-        # Check for null
-        if value.lower() == 'null':
-            return None
+        matches_window = tk.Toplevel(self.root)
+        matches_window.title("Sample Matches")
+        matches_window.geometry("700x550")
+        matches_window.transient(self.root)
+        
+        # Header
+        header_frame = tk.Frame(matches_window, bg="#2196F3", pady=10)
+        header_frame.pack(fill=tk.X)
+        tk.Label(header_frame, text=f"👁 First {len(result.samples)} of {result.matched:,} Matching Sampled Documents",
+                font=("Arial", 12, "bold"), bg="#2196F3", fg="white").pack()
+        
+        display = scrolledtext.ScrolledText(matches_window, font=("Consolas", 10), wrap=tk.WORD, bg="#f5f5f5")
+        display.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        display.insert(tk.END, "\n\n".join(json.dumps(doc, indent=4, ensure_ascii=False) for doc in result.samples))
+        display.config(state=tk.DISABLED)
         
-        # Return as string (remove quotes if present)
-        return value.strip('"\'')
+        tk.Button(matches_window, text="Close", command=matches_window.destroy,
+                 font=("Arial", 9), width=15).pack(pady=(0, 10))
     
     def create_menu_bar(self):
         """Create the menu bar with About menu"""
         menubar = tk.Menu(self.root)
         self.root.config(menu=menubar)
         
+        # Import Menu
+        import_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Import", menu=import_menu)
+        import_menu.add_command(label="Import JSON Schema...", command=self.import_json_schema)
+        import_menu.add_command(label="Import Multiple Files...", command=self.import_multiple_files)
+        import_menu.add_command(label="Import Directory...", command=self.import_directory)
+        import_menu.add_command(label="Schema by File...", command=self.show_schema_by_file)
+        import_menu.add_checkbutton(label="Keep Sample Documents (for preview)",
+                                    variable=self.keep_sample_documents)
+        # Needs NumPy, which is optional
+        import_menu.add_checkbutton(label="Columnar Sample (NumPy, faster previews)" if numpy_available()
+                                    else "Columnar Sample (requires NumPy)",
+                                    variable=self.columnar_sample,
+                                    state=tk.NORMAL if numpy_available() else tk.DISABLED)
+        # A larger sample makes match previews more precise, at the cost of memory
+        sample_size_menu = tk.Menu(import_menu, tearoff=0)
+        import_menu.add_cascade(label="Sample Size", menu=sample_size_menu)
+        for size in SAMPLE_SIZES:
+            sample_size_menu.add_radiobutton(label=f"{size:,} documents", variable=self.sample_size, value=size)
+        import_menu.add_checkbutton(label="Watch Imported Files for Changes",
+                                    variable=self.watch_imported_files, command=self.update_file_watcher)
+        import_menu.add_separator()
+        import_menu.add_command(label="Clear Schema Cache", command=self.clear_schema_cache)
+        
         # About Menu
         about_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="About", menu=about_menu)
@@ -1965,6 +2449,74 @@ class MongoDBQueryGenerator:
         about_menu.add_separator()
         about_menu.add_command(label="About this Version", command=self.show_about)
     
+    def show_schema_by_file(self):
+        """Show which fields of the merged schema appear in which imported file"""
+        if not self.file_summaries:
+            messagebox.showinfo("Schema by File", 
+                "Import multiple files or a directory first to see a per-file breakdown.")
+            return
+        
+        summaries = list(self.file_summaries.values())
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Schema by File")
+        dialog.geometry("900x600")
+        dialog.transient(self.root)
+        
+        notebook = ttk.Notebook(dialog)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        def add_tree(title, columns, widths):
+            """Add a tab holding a scrollable table"""
+            frame = tk.Frame(notebook)
+            notebook.add(frame, text=title)
+            scrollbar = tk.Scrollbar(frame)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            tree = ttk.Treeview(frame, columns=columns, show='headings', yscrollcommand=scrollbar.set)
+            for column, width in zip(columns, widths):
+                tree.heading(column, text=column)
+                tree.column(column, width=width, stretch=column == columns[-1])
+            tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            scrollbar.config(command=tree.yview)
+            return tree
+        
+        # One row per field: its value types and the files it is missing from
+        fields_tree = add_tree("Fields", ("Field", "Types", "Files", "Missing From"), (250, 150, 70, 400))
+        for field in self.schema_fields:
+            present = [summary for summary in summaries if field in summary.fields]
+            types = {}
+            for summary in present:
+                for type_name, count in summary.field_types.get(field, {}).items():
+                    types[type_name] = types.get(type_name, 0) + count
+            type_text = ", ".join(sorted(types, key=types.get, reverse=True)) or "object/array"
+            missing = [os.path.basename(summary.filename) for summary in summaries if field not in summary.fields]
+            fields_tree.insert('', tk.END, values=(field, type_text, f"{len(present)}/{len(summaries)}",
+                                                  ", ".join(missing) or "-"))
+        
+        # One row per file: its size and the fields only it contains
+        files_tree = add_tree("Files", ("File", "Documents", "Fields", "Only In This File"), (250, 90, 70, 460))
+        for summary in summaries:
+            others = set().union(*(other.fields for other in summaries if other is not summary))
+            unique = sorted(summary.fields - others)
+            files_tree.insert('', tk.END, values=(
+                os.path.basename(summary.filename) + (" (cached)" if summary.from_cache else ""),
+                f"{summary.document_count:,}", f"{len(summary.fields):,}", ", ".join(unique) or "-"))
+        
+        close_btn = tk.Button(dialog, text="Close", command=dialog.destroy,
+                 font=("Arial", 9, "bold"), width=10)
+        close_btn.pack(side=tk.RIGHT, padx=10, pady=(0, 10))
+    
+    def clear_schema_cache(self):
+        """Delete all cached schema imports"""
+        try:
+            entries, size = self.schema_cache.size()
+            if not messagebox.askyesno("Clear Schema Cache", 
+                    f"Delete {entries} cached import(s) ({self.format_size(size)})?"):
+                return
+            self.schema_cache.clear()
+            messagebox.showinfo("Schema Cache", "Schema cache cleared.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to clear schema cache:\n{str(e)}")
+    
     def report_bug(self):
         """Open GitHub issues page for bug reporting"""
         try:
@@ -2423,8 +2975,8 @@ Latest Version: {latest_version} ({latest_channel})"""
             
             # Get query/filter text based on mode
             if self.query_mode.get() == "builder":
-                # Use builder-generated query
-                query_str = self.builder_filter_query if hasattr(self, 'builder_filter_query') and self.builder_filter_query else "{}"
+                # Use builder-generated query, with dates and ObjectIds as shell helpers
+                query_str = to_shell(self.builder_filter_query) if hasattr(self, 'builder_filter_query') and self.builder_filter_query else "{}"
             else:
                 # Use manual query from text area
                 query_str = self.query_text.get("1.0", tk.END).strip()
@@ -2563,9 +3115,10 @@ Latest Version: {latest_version} ({latest_channel})"""
         self.update_document_placeholder()
         self.doc_validation_label.config(text="")
         self.operation.current(0)
-        self.query_conditions = []
+        self.query_tree.clear()
         self.update_conditions_display()
         self.value_combo.set('')
+        self.update_value_hint()
         self.generated_query = None
         
         # Clear builder mode rows
@@ -2576,6 +3129,8 @@ Latest Version: {latest_version} ({latest_channel})"""
             self.add_document_field_row()  # Add one empty row
 
 if __name__ == "__main__":
+    # Required for the NDJSON import worker processes in the bundled executable
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = MongoDBQueryGenerator(root)
     root.mainloop()
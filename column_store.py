@@ -0,0 +1,304 @@
+"""
+Columnar sample store for MongoDB Query Generator
+Keeps the sampled documents as one set of NumPy arrays per scalar field path (a type
+code per row, a float array for numbers, dates and booleans, and dictionary codes for
+strings and ObjectIds), so match previews evaluate comparison, $in, $exists, $type and
+$regex conditions as boolean masks instead of walking every document. NumPy is
+optional; filters or fields the arrays cannot answer fall back to the row evaluator.
+"""
+
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from schema_import import SampleStore, value_type, MONGO_NUMBER_TYPES
+from query_eval import typed, compile_regex, is_operator_document, TYPE_CODES, NUMBER_TYPES, ORDERED_BRACKETS
+
+# NumPy is optional; without it the sample is kept as JSON columns only
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# $type codes stored per row; 0 marks a missing field
+MISSING = 0
+TYPE_NUMBERS = {name: code for code, name in TYPE_CODES.items()}
+TYPE_NUMBERS.update({'undefined': 6, 'dbPointer': 12, 'symbol': 14})
+
+# Type bracket of each stored $type code
+BRACKETS = {1: 'number', 16: 'number', 18: 'number', 19: 'number', 2: 'string', 7: 'objectId',
+            8: 'bool', 9: 'date', 10: 'null'}
+
+# Largest integer magnitude a float64 holds exactly; columns with larger ints use the row evaluator
+MAX_EXACT_INTEGER = 2 ** 53
+
+# Extended JSON wrappers stored as scalars; other wrappers keep their path on the row evaluator
+SCALAR_WRAPPERS = set(MONGO_NUMBER_TYPES) | {'$date', '$oid'}
+
+def numpy_available():
+    """Return True if the columnar store can be used"""
+    return np is not None
+
+def exact_operand(bracket, key):
+    """Return True if a filter value compares exactly with a float64 column"""
+    return bracket != 'number' or not isinstance(key, int) or abs(key) <= MAX_EXACT_INTEGER
+
+class Column:
+    """Arrays holding one scalar field path for every sampled document"""
+    def __init__(self, row_count, entries):
+        self.types = np.zeros(row_count, dtype=np.int8)
+        self.numbers = np.full(row_count, np.nan)
+        self.codes = np.full(row_count, -1, dtype=np.int32)
+        if entries:
+            rows, brackets, keys, type_codes = zip(*entries)
+            self.types[list(rows)] = type_codes
+        else:
+            rows = brackets = keys = ()
+        self.dictionaries = {}
+        for bracket in ('string', 'objectId'):
+            # Sorted dictionaries, so code order is value order for range conditions
+            selected = [(row, key) for row, kind, key in zip(rows, brackets, keys) if kind == bracket]
+            dictionary = sorted({key for _, key in selected})
+            positions = {key: code for code, key in enumerate(dictionary)}
+            if selected:
+                self.codes[[row for row, _ in selected]] = [positions[key] for _, key in selected]
+            self.dictionaries[bracket] = dictionary
+        numeric = [(row, key) for row, kind, key in zip(rows, brackets, keys) if kind in ('number', 'date', 'bool')]
+        self.exact = not any(isinstance(key, int) and abs(key) > MAX_EXACT_INTEGER for _, key in numeric)
+        if numeric:
+            self.numbers[[row for row, _ in numeric]] = [float(key) for _, key in numeric]
+    
+    def bracket_mask(self, bracket):
+        """Rows whose value is in a type bracket"""
+        codes = [code for code, name in BRACKETS.items() if name == bracket]
+        return np.isin(self.types, codes)
+    
+    def equals(self, operand):
+        """Rows where the value equals operand, or None if the operand is not exact as a float"""
+        bracket, key = typed(operand)
+        if not exact_operand(bracket, key):
+            return None
+        if bracket == 'null':
+            return (self.types == MISSING) | (self.types == TYPE_NUMBERS['null'])
+        if bracket in self.dictionaries:
+            dictionary = self.dictionaries[bracket]
+            code = bisect_left(dictionary, key)
+            if code == len(dictionary) or dictionary[code] != key:
+                return np.zeros(len(self.types), dtype=bool)
+            return self.bracket_mask(bracket) & (self.codes == code)
+        if bracket in ('number', 'date', 'bool'):
+            return self.bracket_mask(bracket) & (self.numbers == key)
+        # Arrays and documents never equal a scalar
+        return np.zeros(len(self.types), dtype=bool)
+    
+    def compare(self, operator, operand):
+        """Rows where the value is in range of a bound of the same type bracket"""
+        bracket, key = typed(operand)
+        if bracket not in ORDERED_BRACKETS or not exact_operand(bracket, key):
+            return None
+        if bracket in self.dictionaries:
+            # Compare dictionary positions: code > index of the last value <= key, and so on
+            dictionary = self.dictionaries[bracket]
+            if operator == '$gt':
+                selected = self.codes >= bisect_right(dictionary, key)
+            elif operator == '$gte':
+                selected = self.codes >= bisect_left(dictionary, key)
+            elif operator == '$lt':
+                selected = self.codes < bisect_left(dictionary, key)
+            else:
+                selected = self.codes < bisect_right(dictionary, key)
+        else:
+            with np.errstate(invalid='ignore'):
+                selected = {'$gt': np.greater, '$gte': np.greater_equal,
+                            '$lt': np.less, '$lte': np.less_equal}[operator](self.numbers, key)
+        return self.bracket_mask(bracket) & selected
+    
+    def matches_regex(self, pattern, options):
+        """Rows holding a string matched by a regular expression, testing each distinct string once"""
+        test = compile_regex(pattern, options)
+        strings = self.dictionaries['string']
+        matching = [code for code, text in enumerate(strings) if test([text])]
+        return self.bracket_mask('string') & np.isin(self.codes, matching)
+    
+    def nbytes(self):
+        """Bytes held by the arrays and dictionaries"""
+        total = self.types.nbytes + self.numbers.nbytes + self.codes.nbytes
+        for dictionary in self.dictionaries.values():
+            total += sys.getsizeof(dictionary) + sum(sys.getsizeof(key) for key in dictionary)
+        return total
+
+class ColumnarSampleStore(SampleStore):
+    """SampleStore that also holds NumPy columns of its scalar field paths.
+    
+    Paths that hold an array or an embedded document in any sampled document, or
+    lie below an array, have no column; a filter touching them, or using an
+    operator without a mask, is evaluated document by document from the JSON
+    columns as usual.
+    """
+    def __init__(self, documents):
+        super().__init__(documents)
+        entries = {}  # Path -> [(row, bracket, key, $type code)]
+        self.array_paths = set()
+        self.document_paths = set()
+        self.wrapper_cache = {}  # Wrapper (name, value) -> (bracket, key, $type code), as values repeat
+        for row, doc in enumerate(documents):
+            if isinstance(doc, dict):
+                self.collect(row, doc, '', entries)
+        self.wrapper_cache = None
+        self.field_columns = {path: Column(self.row_count, path_entries)
+                              for path, path_entries in entries.items()
+                              if path not in self.array_paths and path not in self.document_paths}
+    
+    def collect(self, row, doc, prefix, entries):
+        """Record the scalar values of one (embedded) document"""
+        for key, value in doc.items():
+            path = prefix + key
+            if isinstance(value, list):
+                self.array_paths.add(path)
+            elif isinstance(value, dict):
+                wrapper = next(iter(value)) if len(value) == 1 else None
+                if wrapper not in SCALAR_WRAPPERS:
+                    self.document_paths.add(path)
+                    if not any(name.startswith('$') for name in value):
+                        self.collect(row, value, path + '.', entries)
+                    continue
+                inner = value[wrapper]
+                cache_key = (wrapper, inner) if isinstance(inner, str) else None
+                scalar = self.wrapper_cache.get(cache_key)
+                if scalar is None:
+                    bracket, typed_key = typed(value)
+                    scalar = (bracket, typed_key, TYPE_NUMBERS[value_type(value)])
+                    if cache_key is not None:
+                        self.wrapper_cache[cache_key] = scalar
+                if scalar[0] == 'object':
+                    # A malformed wrapper is left to the row evaluator
+                    self.document_paths.add(path)
+                else:
+                    entries.setdefault(path, []).append((row,) + scalar)
+            else:
+                bracket, typed_key = typed(value)
+                entries.setdefault(path, []).append((row, bracket, typed_key, TYPE_NUMBERS[value_type(value)]))
+    
+    def column(self, path):
+        """Return the Column of a path, an all-missing column for unseen paths, or None without an exact one"""
+        if path in self.array_paths or path in self.document_paths:
+            return None
+        parts = path.split('.')
+        if any('.'.join(parts[:end]) in self.array_paths for end in range(1, len(parts))):
+            return None
+        column = self.field_columns.get(path)
+        if column is None:
+            column = Column(self.row_count, [])
+        return column if column.exact else None
+    
+    def count_matches(self, query, limit):
+        """Return (match count, first matching rows), or None if the filter needs the row evaluator"""
+        mask = self.filter_mask(query)
+        if mask is None:
+            return None
+        rows = np.flatnonzero(mask)
+        return len(rows), rows[:limit].tolist()
+    
+    def filter_mask(self, query):
+        """Boolean mask of the rows matching a filter document, or None"""
+        if not isinstance(query, dict):
+            return None
+        mask = np.ones(self.row_count, dtype=bool)
+        for key, value in query.items():
+            if key in ('$and', '$or', '$nor'):
+                if not isinstance(value, list) or not value:
+                    return None
+                masks = [self.filter_mask(branch) for branch in value]
+                if any(branch is None for branch in masks):
+                    return None
+                if key == '$and':
+                    mask &= np.logical_and.reduce(masks)
+                elif key == '$or':
+                    mask &= np.logical_or.reduce(masks)
+                else:
+                    mask &= ~np.logical_or.reduce(masks)
+            elif key.startswith('$'):
+                return None
+            else:
+                column = self.column(key)
+                field_mask = None if column is None else self.condition_mask(column, value)
+                if field_mask is None:
+                    return None
+                mask &= field_mask
+        return mask
+    
+    def condition_mask(self, column, condition):
+        """Mask for an equality value or operator document on one column, or None"""
+        if not is_operator_document(condition):
+            return column.equals(condition)
+        mask = np.ones(self.row_count, dtype=bool)
+        for operator, operand in condition.items():
+            if operator == '$options':
+                continue
+            operator_mask = self.operator_mask(column, operator, operand, condition.get('$options', ''))
+            if operator_mask is None:
+                return None
+            mask &= operator_mask
+        return mask
+    
+    def operator_mask(self, column, operator, operand, options):
+        """Mask for one query operator on a scalar column, or None if it has no vectorized form"""
+        if operator == '$eq':
+            return column.equals(operand)
+        if operator == '$ne':
+            equal = column.equals(operand)
+            return None if equal is None else ~equal
+        if operator in ('$in', '$nin'):
+            if not isinstance(operand, list) or any(isinstance(item, re.Pattern) for item in operand):
+                return None
+            mask = np.zeros(self.row_count, dtype=bool)
+            for item in operand:
+                equal = column.equals(item)
+                if equal is None:
+                    return None
+                mask |= equal
+            return mask if operator == '$in' else ~mask
+        if operator in ('$gt', '$gte', '$lt', '$lte'):
+            return column.compare(operator, operand)
+        if operator == '$exists':
+            required = operand if isinstance(operand, bool) else str(operand).lower() not in ('false', '0')
+            exists = column.types != MISSING
+            return exists if required else ~exists
+        if operator == '$type':
+            codes = set()
+            for item in operand if isinstance(operand, list) else [operand]:
+                name = TYPE_CODES.get(item) if isinstance(item, int) else str(item)
+                if name is None:
+                    return None
+                for type_name in NUMBER_TYPES if name == 'number' else [name]:
+                    if type_name in TYPE_NUMBERS:
+                        codes.add(TYPE_NUMBERS[type_name])
+            return np.isin(column.types, list(codes))
+        if operator == '$regex':
+            return column.matches_regex(operand, options)
+        if operator == '$all':
+            if not isinstance(operand, list):
+                return None
+            # A scalar holds every listed value only if it equals each of them
+            mask = np.ones(self.row_count, dtype=bool) if operand else np.zeros(self.row_count, dtype=bool)
+            for item in operand:
+                equal = column.equals(item)
+                if equal is None:
+                    return None
+                mask &= equal
+            return mask
+        if operator in ('$size', '$elemMatch'):
+            # Only arrays can match, and these columns hold none
+            return np.zeros(self.row_count, dtype=bool)
+        if operator == '$not':
+            if isinstance(operand, str):
+                inner = column.matches_regex(operand, '')
+            elif is_operator_document(operand):
+                inner = self.condition_mask(column, operand)
+            else:
+                return None
+            return None if inner is None else ~inner
+        return None
+    
+    def memory_usage(self):
+        """Approximate bytes held by the JSON columns and the arrays"""
+        return super().memory_usage() + sum(column.nbytes() for column in self.field_columns.values())
@@ -0,0 +1,334 @@
+"""
+Query AST for MongoDB Query Generator
+Holds the builder's conditions as a tree of $and/$or/$nor groups of any depth. Every
+node caches its compiled filter fragment and its JSON text, and an edit only marks the
+path from the changed node to the root dirty, so adding or removing one condition
+recompiles the affected groups instead of re-parsing and re-serializing everything.
+"""
+
+import json
+import re
+
+# Indentation of the generated filter JSON (matches json.dumps(indent=4))
+INDENT = '    '
+
+# Operators whose value is a list
+ARRAY_OPERATORS = ('$in', '$nin', '$all')
+
+# Logical operators a group can use, with the wording shown in the builder
+GROUP_DESCRIPTIONS = {'$and': 'all of', '$or': 'any of', '$nor': 'none of'}
+
+# Shell helpers typed into the value box, e.g. ISODate("2024-01-01") or ObjectId("...")
+SHELL_TYPE_PATTERN = re.compile(r'(ISODate|ObjectId)\(\s*["\']?([^"\')]+)["\']?\s*\)')
+
+# Extended JSON wrapper for each shell helper
+SHELL_WRAPPERS = {'ISODate': '$date', 'ObjectId': '$oid'}
+
+# A wrapper in the indented filter JSON, turned back into its shell helper in the script
+WRAPPER_PATTERN = re.compile(r'\{\s*"\$(date|oid)":\s*("(?:[^"\\]|\\.)*")\s*\}')
+
+def parse_shell_type(text):
+    """Return {'$date': ...} or {'$oid': ...} for an ISODate()/ObjectId() helper, otherwise text"""
+    match = SHELL_TYPE_PATTERN.fullmatch(text.strip())
+    if match is None:
+        return text
+    return {SHELL_WRAPPERS[match.group(1)]: match.group(2)}
+
+def to_shell(text):
+    """Write the $date and $oid wrappers of filter JSON as ISODate() and ObjectId() for mongosh"""
+    return WRAPPER_PATTERN.sub(
+        lambda match: ('ISODate(' if match.group(1) == 'date' else 'ObjectId(') + match.group(2) + ')', text)
+
+def parse_value(value, operator):
+    """Parse value string to appropriate Python type"""
+    value = value.strip()
+    
+    # Handle arrays for $in, $nin, $all operators
+    if operator in ARRAY_OPERATORS:
+        if value.startswith('[') and value.endswith(']'):
+            try:
+                return json.loads(value)
+            except ValueError:
+                # Split by comma
+                return [parse_shell_type(v.strip().strip('"\'')) for v in value[1:-1].split(',')]
+        else:
+            return [parse_shell_type(v.strip().strip('"\'')) for v in value.split(',')]
+    
+    # $elemMatch takes a sub-filter, e.g. {"qty": {"$gt": 5}}
+    if operator == '$elemMatch' and value.startswith('{'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    
+    # Try to parse as number
+    try:
+        if '.' in value:
+            return float(value)
+        return int(value)
+    except ValueError:
+        pass
+    
+    # Check for boolean
+    if value.lower() in ['true', 'false']:
+        return value.lower() == 'true'
+    
+    # Check for null
+    if value.lower() == 'null':
+        return None
+    
+    # Dates and ObjectIds become extended JSON, so the filter holds typed values
+    typed_value = parse_shell_type(value)
+    if typed_value is not value:
+        return typed_value
+    
+    # Return as string (remove quotes if present)
+    return value.strip('"\'')
+
+def compile_condition(field, operator, value):
+    """Return the filter fragment for one condition from its parsed value"""
+    if operator == '$eq':
+        return {field: value}
+    if operator in ARRAY_OPERATORS:
+        return {field: {operator: value if isinstance(value, list) else [value]}}
+    if operator == '$exists':
+        return {field: {operator: value if isinstance(value, bool) else str(value).lower() == 'true'}}
+    return {field: {operator: value}}
+
+def indent_lines(text, levels):
+    """Indent every line of a JSON fragment after the first by the given number of levels"""
+    return text.replace('\n', '\n' + INDENT * levels)
+
+class Node:
+    """Base of the tree nodes.
+    
+    refresh() brings the node's structure up to date and render() its output:
+    compiled is the node's filter document, item_texts holds its '"key": value'
+    lines as they appear one level inside a JSON object, and text is
+    json.dumps(compiled, indent=4). A dirty node's ancestors are always dirty.
+    """
+    def __init__(self):
+        self.parent = None
+        self.dirty = True
+        self.compiled = {}
+        self.item_texts = []
+        self.text = '{}'
+    
+    def invalidate(self):
+        """Mark this node and its ancestors for recompiling"""
+        self.dirty = True
+        node = self.parent
+        while node is not None and not node.dirty:
+            node.dirty = True
+            node = node.parent
+    
+    def refresh(self):
+        """Recompile the node if it changed since the last refresh"""
+        if self.dirty:
+            self.compile()
+            self.dirty = False
+    
+    def render(self):
+        """Build compiled, item_texts and text if they are out of date"""
+
+class ConditionNode(Node):
+    """A single field/operator/value condition as typed in the builder"""
+    def __init__(self, field, operator, value):
+        super().__init__()
+        self.field = field
+        self.operator = operator
+        self.value = value
+    
+    def set_value(self, value):
+        """Change the condition's value text"""
+        self.value = value
+        self.invalidate()
+    
+    def compile(self):
+        """Parse the value and render the fragment"""
+        self.compiled = compile_condition(self.field, self.operator, parse_value(self.value, self.operator))
+        value_text = json.dumps(self.compiled[self.field], indent=4)
+        self.item_texts = [INDENT + json.dumps(self.field) + ': ' + indent_lines(value_text, 1)]
+        self.text = '{\n' + self.item_texts[0] + '\n}'
+    
+    def label(self):
+        """Text shown for the condition in the builder"""
+        return f"{self.field} {self.operator} {self.value}"
+
+class GroupNode(Node):
+    """Conditions and subgroups joined by $and, $or or $nor.
+    
+    Children of an $and or $or group with the same operator are flattened into it.
+    An $and whose operands share no key is emitted as one merged document, and a
+    single-operand $and or $or is emitted as that operand.
+    """
+    def __init__(self, operator):
+        super().__init__()
+        self.operator = operator
+        self.children = []
+        self.operands = []  # Nodes whose documents make up this group after flattening
+        self.rendered = False
+    
+    def append(self, node, index=None):
+        """Attach a detached node as a child, at the end or before position index"""
+        node.parent = self
+        if index is None:
+            self.children.append(node)
+        else:
+            self.children.insert(index, node)
+        self.invalidate()
+    
+    def remove(self, node):
+        """Detach a child"""
+        self.children.remove(node)
+        node.parent = None
+        self.invalidate()
+    
+    def set_operator(self, operator):
+        """Change the logical operator joining the children"""
+        self.operator = operator
+        self.invalidate()
+    
+    def flattens(self, child):
+        """Return True if child's operands are spliced into this group"""
+        return isinstance(child, GroupNode) and child.operator == self.operator and self.operator != '$nor'
+    
+    def compile(self):
+        """Collect the operands, descending only into children that changed"""
+        operands = []
+        for child in self.children:
+            child.refresh()
+            if self.flattens(child):
+                operands.extend(child.operands)
+            else:
+                operands.append(child)
+        self.operands = operands
+        self.rendered = False
+    
+    def render(self):
+        """Combine the operands' cached fragments"""
+        if self.rendered:
+            return
+        self.rendered = True
+        for operand in self.operands:
+            operand.render()
+        operands = [operand for operand in self.operands if operand.compiled]
+        
+        if not operands:
+            self.compiled, self.item_texts, self.text = {}, [], '{}'
+            return
+        if len(operands) == 1 and self.operator != '$nor':
+            only = operands[0]
+            self.compiled, self.item_texts, self.text = only.compiled, only.item_texts, only.text
+            return
+        if self.operator == '$and' and not self.keys_collide(operands):
+            # Distinct keys are an implicit $and
+            self.compiled = {}
+            self.item_texts = []
+            for operand in operands:
+                self.compiled.update(operand.compiled)
+                self.item_texts.extend(operand.item_texts)
+        else:
+            self.compiled = {self.operator: [operand.compiled for operand in operands]}
+            separator = ',\n' + INDENT * 2
+            self.item_texts = [INDENT + json.dumps(self.operator) + ': [\n' + INDENT * 2 +
+                               separator.join(indent_lines(operand.text, 2) for operand in operands) +
+                               '\n' + INDENT + ']']
+        self.text = '{\n' + ',\n'.join(self.item_texts) + '\n}'
+    
+    @staticmethod
+    def keys_collide(operands):
+        """Return True if two operand documents share a key"""
+        keys = set()
+        for operand in operands:
+            for key in operand.compiled:
+                if key in keys:
+                    return True
+                keys.add(key)
+        return False
+    
+    def label(self):
+        """Text shown for the group in the builder"""
+        return f"{self.operator}  ({GROUP_DESCRIPTIONS[self.operator]})"
+    
+    def walk(self):
+        """Yield every node below this group, parents before children"""
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            yield node
+            if isinstance(node, GroupNode):
+                stack.extend(reversed(node.children))
+
+class QueryTree:
+    """The builder's filter: a root $and group holding conditions and nested groups.
+    
+    Adding a condition whose field and operator are already used in the same $and
+    group updates that condition, as a second value would contradict the first; in
+    $or and $nor groups each distinct value is a separate branch. The lookup behind
+    this is a dict, so adding never scans the group. The compiled documents are
+    shared between nodes and must not be modified by callers.
+    """
+    def __init__(self):
+        self.root = GroupNode('$and')
+        self.lookup = {}  # (group, field, operator) -> {value: ConditionNode}
+        self.condition_count = 0
+    
+    def __len__(self):
+        return self.condition_count
+    
+    def add_condition(self, group, field, operator, value):
+        """Add a condition to group; return (node, True if a new node was created)"""
+        entries = self.lookup.setdefault((group, field, operator), {})
+        node = entries.get(value)
+        if node is not None:
+            return node, False
+        if entries and group.operator == '$and':
+            old_value, node = next(iter(entries.items()))
+            del entries[old_value]
+            entries[value] = node
+            node.set_value(value)
+            return node, False
+        node = ConditionNode(field, operator, value)
+        entries[value] = node
+        group.append(node)
+        self.condition_count += 1
+        return node, True
+    
+    def add_group(self, parent, operator):
+        """Add an empty subgroup to parent and return it"""
+        group = GroupNode(operator)
+        parent.append(group)
+        return group
+    
+    def remove(self, node):
+        """Remove a condition, or a group with everything in it"""
+        removed = [node]
+        if isinstance(node, GroupNode):
+            removed.extend(node.walk())
+        for child in removed:
+            if isinstance(child, ConditionNode):
+                key = (child.parent, child.field, child.operator)
+                entries = self.lookup[key]
+                del entries[child.value]
+                if not entries:
+                    del self.lookup[key]
+                self.condition_count -= 1
+        node.parent.remove(node)
+    
+    def clear(self):
+        """Remove every condition"""
+        self.root = GroupNode('$and')
+        self.lookup = {}
+        self.condition_count = 0
+    
+    def compile(self):
+        """Return the filter document, recompiling only what changed"""
+        self.root.refresh()
+        self.root.render()
+        return self.root.compiled
+    
+    def to_json(self):
+        """Return the filter as indented JSON, recompiling only what changed"""
+        self.compile()
+        return self.root.text
@@ -0,0 +1,345 @@
+"""
+Local query evaluation for MongoDB Query Generator
+Compiles a filter document into a Python predicate that follows the server's matching
+rules (dotted paths through arrays, type brackets for comparisons, null matching a
+missing field) and runs it over the imported sample in a background thread, so the
+builder can preview how many documents a query would touch.
+"""
+
+import json
+import queue
+import re
+import threading
+from schema_import import numeric_value, value_type, MONGO_NUMBER_TYPES
+
+# Matching documents returned with a preview
+PREVIEW_SAMPLE_MATCHES = 5
+
+# Type brackets whose values can be ordered by $gt/$gte/$lt/$lte
+ORDERED_BRACKETS = ('number', 'string', 'date', 'objectId', 'bool')
+
+# $type aliases and numeric codes
+TYPE_CODES = {1: 'double', 2: 'string', 3: 'object', 4: 'array', 5: 'binData', 7: 'objectId', 8: 'bool',
+              9: 'date', 10: 'null', 11: 'regex', 13: 'javascript', 16: 'int', 17: 'timestamp',
+              18: 'long', 19: 'decimal', -1: 'minKey', 127: 'maxKey'}
+NUMBER_TYPES = ('double', 'int', 'long', 'decimal')
+
+# $regex options that map onto Python flags ('x' is handled as re.VERBOSE)
+REGEX_FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}
+
+# Reached in place of a field missing from an array element, which an equality with null matches
+MISSING = object()
+
+class UnsupportedQuery(ValueError):
+    """Raised for filter constructs the local evaluator cannot run"""
+
+def canonical(value):
+    """Comparable key for documents and arrays"""
+    return json.dumps(value, sort_keys=True, default=str)
+
+def typed(value):
+    """Return (type bracket, comparable key) of a document or filter value"""
+    if value is None:
+        return ('null', None)
+    if isinstance(value, bool):
+        return ('bool', value)
+    if isinstance(value, (int, float)):
+        return ('number', value)
+    if isinstance(value, str):
+        return ('string', value)
+    if isinstance(value, dict) and len(value) == 1:
+        key, inner = next(iter(value.items()))
+        if key in ('$numberInt', '$numberLong'):
+            # Kept as an int, as 64-bit values above 2**53 do not survive a float
+            try:
+                return ('number', int(str(inner)))
+            except ValueError:
+                pass
+        if key in MONGO_NUMBER_TYPES or key == '$date':
+            number = numeric_value(value)
+            if number is not None:
+                return number
+        elif key == '$oid' and isinstance(inner, str):
+            return ('objectId', inner.lower())
+    if isinstance(value, list):
+        return ('array', canonical(value))
+    return ('object', canonical(value))
+
+def resolve(value, parts, index, found, in_array=False):
+    """Append the values reached by following a dotted path, descending through arrays.
+    
+    An array element that is a document without the next field contributes MISSING.
+    """
+    if index == len(parts):
+        found.append(value)
+        return
+    part = parts[index]
+    if isinstance(value, dict):
+        if part in value:
+            resolve(value[part], parts, index + 1, found, in_array)
+        elif in_array and not part.isdigit():
+            found.append(MISSING)
+    elif isinstance(value, list):
+        if part.isdigit() and int(part) < len(value):
+            resolve(value[int(part)], parts, index + 1, found, in_array)
+        for element in value:
+            if isinstance(element, dict):
+                resolve(element, parts, index, found, True)
+
+def present(values):
+    """The reached values without MISSING markers"""
+    return [value for value in values if value is not MISSING]
+
+def candidates(values):
+    """The reached values plus the elements of any arrays among them"""
+    for value in present(values):
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+def is_operator_document(value):
+    """Return True if value is a {'$op': ...} document rather than an equality value"""
+    return isinstance(value, dict) and bool(value) and all(key.startswith('$') for key in value) \
+        and typed(value)[0] not in ('number', 'date', 'objectId')
+
+def compile_filter(query):
+    """Return a function doc -> bool implementing a filter document"""
+    if not isinstance(query, dict):
+        raise UnsupportedQuery("A filter must be a document")
+    tests = []
+    for key, value in query.items():
+        if key in ('$and', '$or', '$nor'):
+            if not isinstance(value, list) or not value:
+                raise UnsupportedQuery(f"{key} needs a non-empty array")
+            branches = [compile_filter(branch) for branch in value]
+            if key == '$and':
+                tests.append(lambda doc, branches=branches: all(test(doc) for test in branches))
+            elif key == '$or':
+                tests.append(lambda doc, branches=branches: any(test(doc) for test in branches))
+            else:
+                tests.append(lambda doc, branches=branches: not any(test(doc) for test in branches))
+        elif key.startswith('$'):
+            raise UnsupportedQuery(f"{key} is not supported in the local preview")
+        else:
+            tests.append(compile_field(key, value))
+    if len(tests) == 1:
+        return tests[0]
+    return lambda doc: all(test(doc) for test in tests)
+
+def compile_field(path, condition):
+    """Return a test for one field's condition"""
+    parts = path.split('.')
+    value_test = compile_value_test(condition)
+    
+    def test(doc):
+        found = []
+        resolve(doc, parts, 0, found)
+        return value_test(found)
+    return test
+
+def compile_value_test(condition):
+    """Return a function (reached values) -> bool for an equality value or operator document"""
+    if not is_operator_document(condition):
+        return compile_operator('$eq', condition, {})
+    tests = [compile_operator(operator, operand, condition)
+             for operator, operand in condition.items() if operator != '$options']
+    if len(tests) == 1:
+        return tests[0]
+    return lambda values: all(test(values) for test in tests)
+
+def compile_operator(operator, operand, siblings):
+    """Return a function (reached values) -> bool for one query operator"""
+    if operator == '$eq':
+        expected = typed(operand)
+        if operand is None:
+            # Null matches a missing field, also one missing from an array element
+            return lambda values: not values or any(value is MISSING for value in values) \
+                or any(value is None for value in candidates(values))
+        return lambda values: any(typed(value) == expected for value in candidates(values))
+    if operator == '$ne':
+        equal = compile_operator('$eq', operand, siblings)
+        return lambda values: not equal(values)
+    if operator in ('$in', '$nin'):
+        if not isinstance(operand, list):
+            raise UnsupportedQuery(f"{operator} needs an array")
+        tests = [compile_regex(item, '') if isinstance(item, re.Pattern) else compile_operator('$eq', item, siblings)
+                 for item in operand]
+        if operator == '$in':
+            return lambda values: any(test(values) for test in tests)
+        return lambda values: not any(test(values) for test in tests)
+    if operator in ('$gt', '$gte', '$lt', '$lte'):
+        bracket, bound = typed(operand)
+        if bracket not in ORDERED_BRACKETS:
+            raise UnsupportedQuery(f"{operator} on a {bracket} value is not supported in the local preview")
+        compare = {'$gt': lambda key: key > bound, '$gte': lambda key: key >= bound,
+                   '$lt': lambda key: key < bound, '$lte': lambda key: key <= bound}[operator]
+        
+        def in_range(values):
+            for value in candidates(values):
+                if isinstance(value, list):
+                    continue
+                value_bracket, key = typed(value)
+                if value_bracket == bracket and compare(key):
+                    return True
+            return False
+        return in_range
+    if operator == '$exists':
+        required = operand if isinstance(operand, bool) else str(operand).lower() not in ('false', '0')
+        return lambda values: bool(present(values)) == required
+    if operator == '$type':
+        return compile_type(operand)
+    if operator == '$size':
+        if isinstance(operand, bool) or not isinstance(operand, int):
+            raise UnsupportedQuery("$size needs a whole number")
+        return lambda values: any(isinstance(value, list) and len(value) == operand for value in values)
+    if operator == '$all':
+        if not isinstance(operand, list):
+            raise UnsupportedQuery("$all needs an array")
+        tests = [compile_operator('$eq', item, siblings) for item in operand]
+        return lambda values: bool(tests) and all(test(values) for test in tests)
+    if operator == '$regex':
+        return compile_regex(operand, siblings.get('$options', ''))
+    if operator == '$elemMatch':
+        return compile_elem_match(operand)
+    if operator == '$not':
+        if isinstance(operand, str):
+            inner = compile_regex(operand, '')
+        elif is_operator_document(operand):
+            inner = compile_value_test(operand)
+        else:
+            raise UnsupportedQuery("$not needs an operator document or a regular expression")
+        return lambda values: not inner(values)
+    raise UnsupportedQuery(f"{operator} is not supported in the local preview")
+
+def compile_type(operand):
+    """Return a test for $type with a type name, alias or numeric code (or a list of them)"""
+    names = set()
+    for item in operand if isinstance(operand, list) else [operand]:
+        name = TYPE_CODES.get(item) if isinstance(item, int) else str(item)
+        if name is None:
+            raise UnsupportedQuery(f"Unknown $type: {item}")
+        names.update(NUMBER_TYPES if name == 'number' else [name])
+    
+    def has_type(values):
+        for value in present(values):
+            if isinstance(value, list):
+                if 'array' in names or any(value_type(element) in names for element in value):
+                    return True
+            elif value_type(value) in names:
+                return True
+        return False
+    return has_type
+
+def compile_regex(pattern, options):
+    """Return a test matching string values against a regular expression"""
+    if isinstance(pattern, re.Pattern):
+        regex = pattern
+    else:
+        flags = 0
+        for option in options or '':
+            flags |= REGEX_FLAGS.get(option, 0)
+        try:
+            regex = re.compile(str(pattern), flags)
+        except re.error as e:
+            raise UnsupportedQuery(f"Invalid regular expression {pattern!r}: {e}")
+    return lambda values: any(isinstance(value, str) and regex.search(value) for value in candidates(values))
+
+def compile_elem_match(operand):
+    """Return a test for $elemMatch with a sub-filter or operator document"""
+    if isinstance(operand, str):
+        # Typed into the value box as JSON text
+        try:
+            operand = json.loads(operand)
+        except ValueError:
+            raise UnsupportedQuery("$elemMatch needs a document, e.g. {\"qty\": {\"$gt\": 5}}")
+    if not isinstance(operand, dict):
+        raise UnsupportedQuery("$elemMatch needs a document")
+    if is_operator_document(operand):
+        element_test = compile_value_test(operand)
+        return lambda values: any(isinstance(value, list) and any(element_test([element]) for element in value)
+                                  for value in values)
+    document_test = compile_filter(operand)
+    return lambda values: any(isinstance(value, list) and
+                              any(isinstance(element, dict) and document_test(element) for element in value)
+                              for value in values)
+
+def referenced_fields(query):
+    """Return the top-level field names a filter reads"""
+    fields = set()
+    if isinstance(query, dict):
+        for key, value in query.items():
+            if key in ('$and', '$or', '$nor') and isinstance(value, list):
+                for branch in value:
+                    fields.update(referenced_fields(branch))
+            elif not key.startswith('$'):
+                fields.add(key.split('.')[0])
+    return fields
+
+class PreviewResult:
+    """Match count of a filter over the sample, scaled to the imported documents"""
+    def __init__(self, matched, evaluated, document_count, samples):
+        self.matched = matched
+        self.evaluated = evaluated
+        self.document_count = document_count  # Documents the sample was drawn from
+        self.samples = samples  # A few matching documents
+    
+    def exact(self):
+        """Return True if the sample holds every imported document"""
+        return self.evaluated >= self.document_count
+    
+    def estimated_matches(self):
+        """Estimated number of matching documents among all imported ones"""
+        if not self.evaluated:
+            return 0
+        if self.exact():
+            return self.matched
+        return round(self.matched / self.evaluated * self.document_count)
+
+class QueryPreviewJob:
+    """Evaluate a filter over the sample store in a worker thread.
+    
+    Posts ('done', PreviewResult), ('cancelled', None) or ('error', exception) to
+    ``messages``. A ColumnarSampleStore counts with array masks when it can;
+    otherwise only the columns the filter reads are decoded while counting. The
+    first matching documents are decoded in full.
+    """
+    def __init__(self, query, store, document_count, sample_limit=PREVIEW_SAMPLE_MATCHES):
+        self.query = query
+        self.store = store
+        self.document_count = max(document_count, store.row_count)
+        self.sample_limit = sample_limit
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+    
+    def start(self):
+        """Start evaluating in a background thread"""
+        threading.Thread(target=self.run, daemon=True).start()
+    
+    def cancel(self):
+        """Ask the worker to stop; a superseded preview is simply dropped"""
+        self.cancel_event.set()
+    
+    def run(self):
+        """Worker thread entry point"""
+        try:
+            predicate = compile_filter(self.query)
+            # A columnar store answers most filters with array masks
+            count_matches = getattr(self.store, 'count_matches', None)
+            counted = count_matches(self.query, self.sample_limit) if count_matches else None
+            if counted is not None:
+                matched, rows = counted
+            else:
+                matched = 0
+                rows = []
+                for row, doc in enumerate(self.store.documents(referenced_fields(self.query))):
+                    if self.cancel_event.is_set():
+                        self.messages.put(('cancelled', None))
+                        return
+                    if predicate(doc):
+                        matched += 1
+                        if len(rows) < self.sample_limit:
+                            rows.append(row)
+            samples = [self.store.document(row) for row in rows]
+            self.messages.put(('done', PreviewResult(matched, self.store.row_count, self.document_count, samples)))
+        except Exception as e:
+            self.messages.put(('error', e))
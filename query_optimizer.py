@@ -0,0 +1,342 @@
+"""
+Query optimizer for MongoDB Query Generator
+Rewrites a compiled filter into a simpler equivalent before it is serialized: nested
+$and/$or are flattened, range conditions on a field are merged into one document,
+an $or of equality conditions on one field becomes $in, duplicates are dropped and
+branches that can never match are removed. Every rewrite also holds for array
+fields, where each condition may be satisfied by a different element.
+"""
+
+import json
+
+# Operators that are merged and checked for contradictions; anything else is kept as written
+LOWER_BOUNDS = ('$gt', '$gte')
+UPPER_BOUNDS = ('$lt', '$lte')
+MERGED_OPERATORS = {'$eq', '$ne', '$in', '$nin', '$exists'} | set(LOWER_BOUNDS) | set(UPPER_BOUNDS)
+
+# Field-level query operators, used to tell an operator document from an embedded document
+QUERY_OPERATORS = MERGED_OPERATORS | {'$all', '$elemMatch', '$size', '$type', '$regex', '$options',
+                                      '$not', '$mod', '$bitsAllSet', '$bitsAnySet', '$bitsAllClear',
+                                      '$bitsAnyClear', '$geoWithin', '$geoIntersects', '$near', '$nearSphere'}
+
+# Returned in place of conditions that can never match any document
+NEVER = object()
+
+def canonical(value):
+    """Hashable key identifying equal filter values and documents"""
+    return json.dumps(value, sort_keys=True, default=str)
+
+def is_operator_document(value):
+    """Return True if value is a {'$op': ...} document rather than an equality value"""
+    return isinstance(value, dict) and bool(value) and all(key in QUERY_OPERATORS for key in value)
+
+def bound_kind(value):
+    """Comparison bracket of a bound, or None if bounds on it are not merged"""
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    return None
+
+def unique(values):
+    """Drop repeated values, keeping the first occurrence of each"""
+    seen = set()
+    result = []
+    for value in values:
+        key = canonical(value)
+        if key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result
+
+class FieldPredicates:
+    """Everything required of one field within an $and"""
+    def __init__(self, field):
+        self.field = field
+        self.count = 0  # Conditions folded in, for reporting merges
+        self.equals = []
+        self.not_equals = []
+        self.in_lists = []
+        self.not_in = []
+        self.exists = set()
+        self.lower = {}  # Bound kind -> (operator, value); the tightest lower bound per kind
+        self.upper = {}
+        self.unmerged_bounds = []  # (operator, value) bounds of kinds that are not compared
+        self.others = []  # Operator documents kept as written, e.g. $regex with $options
+    
+    def add(self, value):
+        """Fold in the value of one {field: value} condition"""
+        self.count += 1
+        if not is_operator_document(value):
+            self.equals.append(value)
+            return
+        other = {}
+        for operator, operand in value.items():
+            if operator not in MERGED_OPERATORS:
+                other[operator] = operand
+            elif operator == '$eq':
+                self.equals.append(operand)
+            elif operator == '$ne':
+                self.not_equals.append(operand)
+            elif operator == '$in':
+                self.in_lists.append(list(operand) if isinstance(operand, list) else [operand])
+            elif operator == '$nin':
+                self.not_in.extend(operand if isinstance(operand, list) else [operand])
+            elif operator == '$exists':
+                self.exists.add(bool(operand))
+            else:
+                self.add_bound(operator, operand)
+        if other:
+            self.others.append(other)
+    
+    def add_bound(self, operator, operand):
+        """Keep the tighter of two bounds in the same direction and comparison bracket"""
+        kind = bound_kind(operand)
+        if kind is None:
+            self.unmerged_bounds.append((operator, operand))
+            return
+        lower = operator in LOWER_BOUNDS
+        bounds = self.lower if lower else self.upper
+        current = bounds.get(kind)
+        if current is None:
+            bounds[kind] = (operator, operand)
+            return
+        current_operator, current_operand = current
+        if operand == current_operand:
+            # The exclusive bound implies the inclusive one
+            if operator in ('$gt', '$lt'):
+                bounds[kind] = (operator, operand)
+        elif (operand > current_operand) == lower:
+            bounds[kind] = (operator, operand)
+    
+    def never_matches(self):
+        """Return True if no document, with or without arrays, can satisfy every condition"""
+        if self.exists == {True, False}:
+            return True
+        if any(not values for values in self.in_lists):
+            return True
+        excluded = {canonical(value) for value in self.not_equals + self.not_in}
+        if any(canonical(value) in excluded for value in self.equals):
+            return True
+        if any(all(canonical(value) in excluded for value in values) for values in self.in_lists):
+            return True
+        if self.exists == {False}:
+            # Only null can match a missing field
+            if any(value is not None for value in self.equals):
+                return True
+            if self.lower or self.upper or self.unmerged_bounds:
+                return True
+            if any(None not in values for values in self.in_lists):
+                return True
+        return False
+    
+    def conditions(self):
+        """Return the field's conditions as {field: value} documents, as few as possible"""
+        equals = unique(self.equals)
+        equal_keys = {canonical(value) for value in equals}
+        # An $in that includes a required value adds nothing
+        in_lists = [unique(values) for values in self.in_lists
+                    if not any(canonical(value) in equal_keys for value in values)]
+        excluded = unique(self.not_in + self.not_equals)
+        
+        pending = []
+        pending.extend(('$eq', value) for value in equals)
+        if len(excluded) == 1 and not self.not_in:
+            pending.append(('$ne', excluded[0]))
+        elif excluded:
+            pending.append(('$nin', excluded))
+        pending.extend(('$in', values) for values in in_lists)
+        pending.extend(self.lower.values())
+        pending.extend(self.upper.values())
+        pending.extend(self.unmerged_bounds)
+        if len(self.exists) == 1:
+            pending.append(('$exists', next(iter(self.exists))))
+        
+        documents = []
+        for operator, operand in pending:
+            for document in documents:
+                if operator not in document:
+                    document[operator] = operand
+                    break
+            else:
+                documents.append({operator: operand})
+        for other in unique(self.others):
+            for document in documents:
+                if not set(other) & set(document):
+                    document.update(other)
+                    break
+            else:
+                documents.append(dict(other))
+        
+        conditions = []
+        for document in documents:
+            if list(document) == ['$eq'] and not is_operator_document(document['$eq']):
+                conditions.append({self.field: document['$eq']})
+            else:
+                conditions.append({self.field: document})
+        return conditions
+
+class QueryOptimizer:
+    """Rewrite filters into simpler equivalents, recording what was changed"""
+    def __init__(self):
+        self.notes = []
+    
+    def optimize(self, query):
+        """Return (optimized filter, list of rewrites applied); the input is not modified"""
+        self.notes = []
+        conditions = self.optimize_and([{key: value} for key, value in query.items()])
+        if conditions is NEVER:
+            self.notes.append("The filter can never match any document; it was left as written")
+            return query, self.notes
+        return self.to_document(conditions), self.notes
+    
+    def note(self, text):
+        """Record a rewrite once"""
+        if text not in self.notes:
+            self.notes.append(text)
+    
+    def optimize_and(self, conditions):
+        """Simplify a list of conditions that must all hold; NEVER if they cannot"""
+        fields = {}  # Field name -> FieldPredicates, in first-seen order
+        logical = []  # $or/$nor documents and other top-level operators
+        pending = list(reversed(conditions))
+        while pending:
+            condition = pending.pop()
+            for key, value in condition.items():
+                if key == '$and':
+                    self.note("Flattened nested $and")
+                    pending.extend(reversed(value))
+                elif key == '$or':
+                    branches = self.optimize_or(value)
+                    if branches is NEVER:
+                        return NEVER
+                    if len(branches) == 1:
+                        # A single remaining branch is required outright
+                        pending.append(branches[0])
+                    elif branches:
+                        logical.append({'$or': branches})
+                elif key == '$nor':
+                    branches = self.optimize_nor(value)
+                    if branches is NEVER:
+                        return NEVER
+                    if branches:
+                        logical.append({'$nor': branches})
+                elif key.startswith('$'):
+                    logical.append({key: value})
+                else:
+                    if key not in fields:
+                        fields[key] = FieldPredicates(key)
+                    fields[key].add(value)
+        
+        result = []
+        for predicates in fields.values():
+            if predicates.never_matches():
+                self.note(f"Conditions on '{predicates.field}' contradict each other")
+                return NEVER
+            field_conditions = predicates.conditions()
+            if not field_conditions:
+                self.note(f"Removed conditions on '{predicates.field}' that always match")
+            elif len(field_conditions) < predicates.count:
+                self.note(f"Merged {predicates.count} conditions on '{predicates.field}'")
+            result.extend(field_conditions)
+        unique_logical = unique(logical)
+        if len(unique_logical) < len(logical):
+            self.note("Removed duplicate logical groups")
+        return result + unique_logical
+    
+    def optimize_branches(self, branches, operator):
+        """Optimize each branch of an $or or $nor, flattening nested ones of the same operator"""
+        optimized = []
+        pending = list(reversed(branches))
+        while pending:
+            branch = pending.pop()
+            if operator == '$or' and list(branch) == ['$or']:
+                self.note("Flattened nested $or")
+                pending.extend(reversed(branch['$or']))
+                continue
+            conditions = self.optimize_and([{key: value} for key, value in branch.items()])
+            if conditions is NEVER:
+                self.note(f"Removed an {operator} branch that can never match")
+                continue
+            document = self.to_document(conditions)
+            if operator == '$or' and list(document) == ['$or']:
+                pending.extend(reversed(document['$or']))
+                continue
+            optimized.append(document)
+        result = unique(optimized)
+        if len(result) < len(optimized):
+            self.note(f"Removed duplicate {operator} branches")
+        return result
+    
+    def optimize_or(self, branches):
+        """Return the simplified branches ([] if one always matches), or NEVER if none can"""
+        branches = self.optimize_branches(branches, '$or')
+        if not branches:
+            return NEVER
+        if any(not branch for branch in branches):
+            self.note("Removed an $or that always matches")
+            return []
+        
+        # Equality and $in branches on the same field collapse into one $in
+        by_field = {}
+        for branch in branches:
+            if len(branch) == 1:
+                field, value = next(iter(branch.items()))
+                if not field.startswith('$'):
+                    if not is_operator_document(value):
+                        by_field.setdefault(field, []).append((branch, [value]))
+                    elif list(value) == ['$eq']:
+                        by_field.setdefault(field, []).append((branch, [value['$eq']]))
+                    elif list(value) == ['$in'] and isinstance(value['$in'], list):
+                        by_field.setdefault(field, []).append((branch, value['$in']))
+        collapsed = {}
+        for field, entries in by_field.items():
+            if len(entries) > 1:
+                values = unique([value for _, values in entries for value in values])
+                collapsed[field] = ({field: {'$in': values}}, {id(branch) for branch, _ in entries})
+                self.note(f"Collapsed {len(entries)} $or branches on '{field}' into $in")
+        if collapsed:
+            rewritten = []
+            for branch in branches:
+                for field, (replacement, members) in collapsed.items():
+                    if id(branch) in members:
+                        if replacement is not None:
+                            rewritten.append(replacement)
+                            collapsed[field] = (None, members)
+                        break
+                else:
+                    rewritten.append(branch)
+            branches = rewritten
+        return branches
+    
+    def optimize_nor(self, branches):
+        """Return the simplified branches ([] if nothing is excluded), or NEVER if one always matches"""
+        branches = self.optimize_branches(branches, '$nor')
+        if any(not branch for branch in branches):
+            return NEVER
+        return branches
+    
+    @staticmethod
+    def to_document(conditions):
+        """Combine conditions into one document, using $and only for keys that repeat"""
+        document = {}
+        repeated = []
+        for condition in conditions:
+            key, value = next(iter(condition.items()))
+            if key in document:
+                repeated.append(condition)
+            else:
+                document[key] = value
+        if repeated:
+            first = [{key: value} for key, value in document.items()
+                     if any(key in condition for condition in repeated)]
+            document = {key: value for key, value in document.items()
+                        if not any(key in condition for condition in repeated)}
+            document['$and'] = first + repeated
+        return document
+
+def optimize_query(query):
+    """Return (optimized filter, list of rewrites applied) for a filter document"""
+    return QueryOptimizer().optimize(query)
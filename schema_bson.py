@@ -0,0 +1,226 @@
+"""
+BSON reader for MongoDB Query Generator
+Decodes mongodump .bson files (a plain sequence of length-prefixed BSON documents)
+straight into the same extended JSON structures a JSON export would contain, so
+ObjectId, Date, Int64 and Decimal128 values keep their MongoDB types.
+"""
+
+import base64
+import decimal
+import struct
+from datetime import datetime, timedelta, timezone
+
+INT32 = struct.Struct('<i')
+INT64 = struct.Struct('<q')
+UINT64 = struct.Struct('<Q')
+DOUBLE = struct.Struct('<d')
+
+# Smallest valid document: int32 length + terminating zero byte
+MIN_DOCUMENT_SIZE = 5
+
+# mongod refuses documents above 16 MB; allow some slack for dumps of older servers
+MAX_DOCUMENT_SIZE = 48 << 20
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Decoded field names by raw bytes - collections repeat the same names in every document
+FIELD_NAME_CACHE_SIZE = 4096
+field_names = {}
+
+class BSONError(ValueError):
+    """Raised for malformed BSON input"""
+
+def decode_decimal128(data):
+    """Decode the 16 bytes of a Decimal128 value to its canonical string"""
+    low, high = struct.unpack('<QQ', data)
+    sign = high >> 63
+    combination = (high >> 58) & 0x1F
+    if combination == 0x1F:
+        return 'NaN'
+    if combination == 0x1E:
+        return '-Infinity' if sign else 'Infinity'
+    
+    if (high >> 61) & 0x3 == 0x3:
+        # Significand would exceed 34 digits - non-canonical, treated as zero
+        exponent = ((high >> 47) & 0x3FFF) - 6176
+        significand = 0
+    else:
+        exponent = ((high >> 49) & 0x3FFF) - 6176
+        significand = ((high & 0x1FFFFFFFFFFFF) << 64) | low
+    # Parsing the exact digits avoids any rounding by the decimal context
+    return str(decimal.Decimal(f"{'-' if sign else ''}{significand}E{exponent}"))
+
+def format_datetime(millis):
+    """Extended JSON for a BSON date: ISO text in 1970-9999, otherwise $numberLong"""
+    if 0 <= millis < 253402300800000:
+        moment = EPOCH + timedelta(milliseconds=millis)
+        return {'$date': moment.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'}
+    return {'$date': {'$numberLong': str(millis)}}
+
+def read_cstring(data, pos):
+    """Return (text, position after the terminating zero) of a C string at pos"""
+    end = data.index(b'\x00', pos)
+    return data[pos:end].decode('utf-8', 'replace'), end + 1
+
+def read_string(data, pos):
+    """Return (text, next position) of a length-prefixed BSON string at pos"""
+    length = INT32.unpack_from(data, pos)[0]
+    start = pos + 4
+    if length < 1 or start + length > len(data):
+        raise BSONError(f"Invalid string length {length} at byte {pos}")
+    return data[start:start + length - 1].decode('utf-8', 'replace'), start + length
+
+def decode_document(data, pos=0, is_array=False):
+    """Decode the document (or array) starting at pos; returns (value, end position)"""
+    length = INT32.unpack_from(data, pos)[0]
+    end = pos + length
+    if length < MIN_DOCUMENT_SIZE or end > len(data) or data[end - 1] != 0:
+        raise BSONError(f"Invalid document length {length} at byte {pos}")
+    
+    result = [] if is_array else {}
+    pos += 4
+    while pos < end - 1:
+        element_type = data[pos]
+        name_end = data.index(0, pos + 1)
+        if not is_array:
+            # Array keys are just "0", "1", ... and are not decoded
+            raw_name = data[pos + 1:name_end]
+            name = field_names.get(raw_name)
+            if name is None:
+                if len(field_names) >= FIELD_NAME_CACHE_SIZE:
+                    field_names.clear()
+                name = field_names[raw_name] = raw_name.decode('utf-8', 'replace')
+        pos = name_end + 1
+        
+        # Most common types first
+        if element_type == 0x02:
+            value, pos = read_string(data, pos)
+        elif element_type == 0x10:
+            value = INT32.unpack_from(data, pos)[0]
+            pos += 4
+        elif element_type == 0x01:
+            value = DOUBLE.unpack_from(data, pos)[0]
+            pos += 8
+        elif element_type == 0x03:
+            value, pos = decode_document(data, pos)
+        elif element_type == 0x07:
+            value = {'$oid': data[pos:pos + 12].hex()}
+            pos += 12
+        elif element_type == 0x09:
+            value = format_datetime(INT64.unpack_from(data, pos)[0])
+            pos += 8
+        elif element_type == 0x04:
+            value, pos = decode_document(data, pos, is_array=True)
+        elif element_type == 0x08:
+            value = data[pos] != 0
+            pos += 1
+        elif element_type == 0x0A:
+            value = None
+        elif element_type == 0x12:
+            value = {'$numberLong': str(INT64.unpack_from(data, pos)[0])}
+            pos += 8
+        elif element_type == 0x13:
+            value = {'$numberDecimal': decode_decimal128(data[pos:pos + 16])}
+            pos += 16
+        elif element_type == 0x05:
+            size = INT32.unpack_from(data, pos)[0]
+            subtype = data[pos + 4]
+            payload = data[pos + 5:pos + 5 + size]
+            value = {'$binary': {'base64': base64.b64encode(payload).decode('ascii'),
+                                 'subType': f"{subtype:02x}"}}
+            pos += 5 + size
+        elif element_type == 0x11:
+            timestamp = UINT64.unpack_from(data, pos)[0]
+            value = {'$timestamp': {'t': timestamp >> 32, 'i': timestamp & 0xFFFFFFFF}}
+            pos += 8
+        elif element_type == 0x0B:
+            pattern, pos = read_cstring(data, pos)
+            options, pos = read_cstring(data, pos)
+            value = {'$regularExpression': {'pattern': pattern, 'options': options}}
+        elif element_type == 0x0D:
+            code, pos = read_string(data, pos)
+            value = {'$code': code}
+        elif element_type == 0x0F:
+            code, scope_pos = read_string(data, pos + 4)
+            scope, _ = decode_document(data, scope_pos)
+            value = {'$code': code, '$scope': scope}
+            pos += INT32.unpack_from(data, pos)[0]
+        elif element_type == 0x0E:
+            symbol, pos = read_string(data, pos)
+            value = {'$symbol': symbol}
+        elif element_type == 0x0C:
+            namespace, pos = read_string(data, pos)
+            value = {'$dbPointer': {'$ref': namespace, '$id': {'$oid': data[pos:pos + 12].hex()}}}
+            pos += 12
+        elif element_type == 0x06:
+            value = {'$undefined': True}
+        elif element_type == 0xFF:
+            value = {'$minKey': 1}
+        elif element_type == 0x7F:
+            value = {'$maxKey': 1}
+        else:
+            raise BSONError(f"Unknown BSON type 0x{element_type:02x} at byte {pos}")
+        
+        if pos > end - 1:
+            raise BSONError(f"Element overruns its document at byte {pos}")
+        if is_array:
+            result.append(value)
+        else:
+            result[name] = value
+    return result, end
+
+def document_length(data, pos):
+    """Validate and return the length of the top-level document starting at pos"""
+    if pos + 4 > len(data):
+        raise BSONError(f"Truncated document at byte {pos}")
+    length = INT32.unpack_from(data, pos)[0]
+    if length < MIN_DOCUMENT_SIZE or length > MAX_DOCUMENT_SIZE or pos + length > len(data):
+        raise BSONError(f"Invalid document length {length} at byte {pos}")
+    return length
+
+def iter_bson_documents(f):
+    """Yield documents from a binary stream of concatenated BSON documents"""
+    while True:
+        header = f.read(4)
+        if not header:
+            return
+        if len(header) < 4:
+            raise BSONError("Truncated document at end of file")
+        length = INT32.unpack(header)[0]
+        if length < MIN_DOCUMENT_SIZE or length > MAX_DOCUMENT_SIZE:
+            raise BSONError(f"Invalid document length {length}")
+        body = f.read(length - 4)
+        if len(body) < length - 4:
+            raise BSONError("Truncated document at end of file")
+        try:
+            document = decode_document(header + body)[0]
+        except (struct.error, IndexError, ValueError) as e:
+            raise BSONError(f"{e} (document ending at byte {f.tell()})")
+        yield document
+
+def split_document_ranges(data, chunk_size, start=0):
+    """Split a mapped BSON file from start on into (start, end) ranges on document boundaries"""
+    ranges = []
+    pos = start
+    total = len(data)
+    while pos < total:
+        pos += document_length(data, pos)
+        if pos - start >= chunk_size:
+            ranges.append((start, pos))
+            start = pos
+    if start < total:
+        ranges.append((start, total))
+    return ranges
+
+def iter_document_range(data, start, end):
+    """Yield the documents in data[start:end], which must hold whole documents"""
+    pos = start
+    while pos < end:
+        length = document_length(data, pos)
+        # Decode from a bytes copy of one document - indexing bytes is much faster than a mapping
+        try:
+            document = decode_document(data[pos:pos + length])[0]
+        except (struct.error, IndexError, ValueError) as e:
+            raise BSONError(f"{e} (document at byte {pos})")
+        yield document
+        pos += length
@@ -0,0 +1,177 @@
+"""
+Persistent schema cache for MongoDB Query Generator
+Stores the result of a schema import in a small SQLite database under the user profile,
+keyed by a fingerprint of the source file, so re-importing an unchanged export is instant.
+A checkpoint per file records how far it was imported, so a file that has only grown
+by appending can be re-imported by parsing just the new tail.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import time
+import zlib
+
+# Bump whenever the pickled extractor layout or extraction rules change; older entries are discarded
+CACHE_VERSION = 3
+
+# Total size of cached payloads before least recently used entries are evicted
+MAX_CACHE_BYTES = 256 << 20
+
+# Sampled blocks used for the content fingerprint
+FINGERPRINT_BLOCK_SIZE = 64 << 10
+FINGERPRINT_BLOCKS = 16
+
+def default_cache_dir():
+    """Return the per-user cache directory"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'MongoDB Query Generator', 'cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'mongodb-query-generator')
+
+def hash_blocks(f, length, digest):
+    """Feed the first length bytes of f to digest, or evenly spaced blocks of them if longer"""
+    if length <= FINGERPRINT_BLOCK_SIZE * FINGERPRINT_BLOCKS:
+        f.seek(0)
+        digest.update(f.read(length))
+        return
+    # First and last block plus evenly spaced blocks in between
+    step = (length - FINGERPRINT_BLOCK_SIZE) // (FINGERPRINT_BLOCKS - 1)
+    for i in range(FINGERPRINT_BLOCKS):
+        f.seek(i * step)
+        digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+
+def file_fingerprint(filename):
+    """Fingerprint a file from its size, mtime and a hash of evenly spaced blocks"""
+    stat = os.stat(filename)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(filename, 'rb') as f:
+        hash_blocks(f, stat.st_size, digest)
+    return digest.hexdigest()
+
+def prefix_fingerprint(filename, length):
+    """Fingerprint the first length bytes of a file; unaffected by data appended after them"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{length}".encode())
+    with open(filename, 'rb') as f:
+        hash_blocks(f, length, digest)
+    return digest.hexdigest()
+
+class SchemaCache:
+    """LRU cache of import results stored in SQLite"""
+    def __init__(self, cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.db_path = os.path.join(self.cache_dir, 'schema_cache.db')
+        self.max_bytes = max_bytes
+    
+    def _connect(self):
+        """Open the cache database, creating it on first use"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                            key TEXT PRIMARY KEY,
+                            path TEXT,
+                            version INTEGER,
+                            payload BLOB,
+                            payload_size INTEGER,
+                            last_access REAL)''')
+        # Where the last import of a file stopped, for parsing only what was appended since
+        conn.execute('''CREATE TABLE IF NOT EXISTS checkpoints (
+                            path TEXT PRIMARY KEY,
+                            byte_offset INTEGER,
+                            checksum TEXT,
+                            key TEXT)''')
+        return conn
+    
+    def load(self, key):
+        """Return the cached object for key, or None"""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT payload, version FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            payload, version = row
+            if version != CACHE_VERSION:
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                conn.commit()
+                return None
+            try:
+                value = pickle.loads(zlib.decompress(payload))
+            except Exception:
+                # Corrupt or incompatible entry
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                conn.commit()
+                return None
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            conn.commit()
+            return value
+        finally:
+            conn.close()
+    
+    def store(self, key, path, value):
+        """Store an object under key and evict old entries beyond the size cap"""
+        payload = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        if len(payload) > self.max_bytes // 4:
+            # Too large to be worth caching
+            return
+        conn = self._connect()
+        try:
+            conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                         (key, os.path.abspath(path), CACHE_VERSION, payload, len(payload), time.time()))
+            self._evict(conn)
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def load_checkpoint(self, path):
+        """Return (byte offset, prefix checksum, entry key) of the last import of path, or None"""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT byte_offset, checksum, key FROM checkpoints WHERE path = ?',
+                                (os.path.abspath(path),)).fetchone()
+        finally:
+            conn.close()
+    
+    def store_checkpoint(self, path, byte_offset, checksum, key):
+        """Record that the entry under key holds the import of the first byte_offset bytes of path"""
+        conn = self._connect()
+        try:
+            conn.execute('INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)',
+                         (os.path.abspath(path), byte_offset, checksum, key))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _evict(self, conn):
+        """Delete least recently used entries until the cache fits the size cap"""
+        total = conn.execute('SELECT COALESCE(SUM(payload_size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute('SELECT key, payload_size FROM entries ORDER BY last_access').fetchall():
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+    
+    def clear(self):
+        """Remove every cached entry"""
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM entries')
+            conn.execute('DELETE FROM checkpoints')
+            conn.commit()
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+    
+    def size(self):
+        """Return (number of entries, total payload bytes)"""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*), COALESCE(SUM(payload_size), 0) FROM entries').fetchone()
+        finally:
+            conn.close()
@@ -0,0 +1,67 @@
+"""
+Compressed input support for MongoDB Query Generator
+Recognises gzip, bzip2 and zstd files by their magic bytes and decompresses them as
+a stream, so compressed exports are imported without unpacking them to disk first.
+"""
+
+import bz2
+import gzip
+
+# zstd ships with Python 3.14+; older versions can use the zstandard package
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Leading bytes of each supported format (gzip includes its only compression method, deflate)
+MAGIC_NUMBERS = [
+    ('gzip', b'\x1f\x8b\x08'),
+    ('bz2', b'BZh'),
+    ('zstd', b'\x28\xb5\x2f\xfd'),
+]
+
+# Extensions dropped from a compressed file's name to find the format inside it
+COMPRESSED_EXTENSIONS = ('.gz', '.gzip', '.bz2', '.zst', '.zstd')
+
+def detect_compression(filename):
+    """Return 'gzip', 'bz2' or 'zstd' from the file's magic bytes, or None if uncompressed"""
+    with open(filename, 'rb') as f:
+        head = f.read(4)
+    for compression, magic in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return compression
+    return None
+
+def strip_compression_extension(filename):
+    """Return the file name without a trailing compression extension"""
+    lower = filename.lower()
+    for extension in COMPRESSED_EXTENSIONS:
+        if lower.endswith(extension):
+            return filename[:-len(extension)]
+    return filename
+
+def open_decompressed(raw, compression):
+    """Wrap an open binary file in a streaming decompressor; raw itself when uncompressed.
+
+    The returned reader's tell() is the position in the decompressed data, while
+    raw.tell() keeps tracking how much of the compressed file has been consumed.
+    """
+    if compression is None:
+        return raw
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(raw)
+    if compression == 'zstd':
+        if zstd is not None:
+            return zstd.ZstdFile(raw)
+        if zstandard is not None:
+            return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+        raise RuntimeError("Reading zstd-compressed files requires Python 3.14 or the "
+                           "'zstandard' package (pip install zstandard)")
+    raise ValueError(f"Unsupported compression: {compression}")
@@ -0,0 +1,152 @@
+"""
+CSV reader for MongoDB Query Generator
+Turns MongoDB Compass CSV exports back into documents. Dotted headers such as
+"address.city" or "items[0].price" become nested fields, and each column's type is
+inferred from the first chunk of rows so values are stored typed instead of as text.
+"""
+
+import csv
+import itertools
+import re
+from datetime import datetime
+
+# Rows read and converted at a time; the first chunk is also the type inference sample
+CSV_CHUNK_ROWS = 10000
+
+# Candidate column types, narrowest first; a column gets the first type every sampled value fits
+COLUMN_TYPES = ('int', 'double', 'bool', 'objectId', 'date')
+
+# Leading zeros (zip codes, account numbers) keep a value textual
+INT_PATTERN = re.compile(r'[-+]?(0|[1-9]\d*)')
+DOUBLE_PATTERN = re.compile(r'[-+]?(0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?')
+OBJECT_ID_PATTERN = re.compile(r'[0-9a-fA-F]{24}')
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[-+]\d{2}:?\d{2})?')
+ARRAY_INDEX_PATTERN = re.compile(r'\[(\d+)\]')
+
+# Larger than a mongod document, so no real cell is rejected by the csv module
+CSV_FIELD_SIZE_LIMIT = 16 << 20
+
+def parse_header(name):
+    """Split a Compass CSV header such as 'items[0].price' into ['items', 0, 'price']"""
+    parts = []
+    for segment in name.split('.'):
+        bracket = segment.find('[')
+        key = segment if bracket < 0 else segment[:bracket]
+        if key:
+            parts.append(key)
+        if bracket >= 0:
+            parts.extend(int(index) for index in ARRAY_INDEX_PATTERN.findall(segment[bracket:]))
+    return parts
+
+def matches_type(column_type, text):
+    """Return True if the cell text can be stored as column_type"""
+    if column_type == 'int':
+        return INT_PATTERN.fullmatch(text) is not None
+    if column_type == 'double':
+        return DOUBLE_PATTERN.fullmatch(text) is not None
+    if column_type == 'bool':
+        return text in ('true', 'false')
+    if column_type == 'objectId':
+        return OBJECT_ID_PATTERN.fullmatch(text) is not None
+    if column_type == 'date':
+        if DATE_PATTERN.fullmatch(text) is None:
+            return False
+        try:
+            datetime.fromisoformat(text)
+        except ValueError:
+            return False
+        return True
+    return False
+
+def infer_column_type(values):
+    """Return the narrowest type that fits every non-empty value, or 'string'"""
+    candidates = list(COLUMN_TYPES)
+    seen_value = False
+    for text in values:
+        if not text:
+            continue
+        seen_value = True
+        candidates = [column_type for column_type in candidates if matches_type(column_type, text)]
+        if not candidates:
+            return 'string'
+    return candidates[0] if seen_value else 'string'
+
+def convert_value(column_type, text):
+    """Convert cell text to its inferred type (extended JSON for ObjectId and Date).
+    
+    Values that do not fit the column's type, e.g. a stray word in a numeric column
+    beyond the inference sample, are kept as strings.
+    """
+    if column_type == 'string' or not matches_type(column_type, text):
+        return text
+    if column_type == 'int':
+        return int(text)
+    if column_type == 'double':
+        return float(text)
+    if column_type == 'bool':
+        return text == 'true'
+    if column_type == 'objectId':
+        return {'$oid': text.lower()}
+    return {'$date': text}
+
+def set_path(doc, parts, value):
+    """Store value at the nested path parts, creating sub-documents and arrays as needed.
+    
+    Array elements before an index whose cells were empty are padded with None, so
+    every value keeps the position given in its header.
+    """
+    container = doc
+    for part, next_part in zip(parts, parts[1:]):
+        expected = list if isinstance(next_part, int) else dict
+        if isinstance(part, int):
+            if not isinstance(container, list):
+                return
+            container.extend([None] * (part + 1 - len(container)))
+            if container[part] is None:
+                container[part] = expected()
+            child = container[part]
+        elif isinstance(container, dict):
+            child = container.setdefault(part, expected())
+        else:
+            return
+        if not isinstance(child, expected):
+            # Conflicting headers, e.g. both "a" and "a.b" - keep the first value
+            return
+        container = child
+    last = parts[-1]
+    if isinstance(last, int):
+        if isinstance(container, list):
+            container.extend([None] * (last + 1 - len(container)))
+            if container[last] is None:
+                container[last] = value
+    elif isinstance(container, dict):
+        container[last] = value
+
+def iter_csv_documents(f, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield documents from a CSV text stream, reading chunk_rows rows at a time.
+    
+    The stream should be opened with newline=''. Empty cells are left out of the
+    document, matching how Compass writes missing fields.
+    """
+    csv.field_size_limit(max(csv.field_size_limit(), CSV_FIELD_SIZE_LIMIT))
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    paths = [parse_header(name.strip()) for name in header]
+    column_types = None
+    
+    while True:
+        chunk = list(itertools.islice(reader, chunk_rows))
+        if not chunk:
+            return
+        if column_types is None:
+            column_types = [infer_column_type(row[i] for row in chunk if i < len(row))
+                            for i in range(len(paths))]
+        columns = list(zip(paths, column_types))
+        for row in chunk:
+            doc = {}
+            for (parts, column_type), text in zip(columns, row):
+                if text and parts:
+                    set_path(doc, parts, convert_value(column_type, text))
+            yield doc
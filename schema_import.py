@@ -0,0 +1,1064 @@
+"""
+Schema import helpers for MongoDB Query Generator
+Streams documents out of exported collections and extracts field paths and values
+without keeping the whole export in memory. Every document contributes its field
+paths and value statistics, and a fixed-size uniform sample of documents is kept.
+"""
+
+import codecs
+import io
+import json
+import math
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from schema_bson import iter_bson_documents, iter_document_range, split_document_ranges
+from schema_cache import file_fingerprint, prefix_fingerprint
+from schema_csv import iter_csv_documents
+from schema_compression import detect_compression, open_decompressed, strip_compression_extension
+from schema_sketches import SpaceSaving, HyperLogLog, TDigest
+from search_index import FieldSearchIndex
+
+# MongoDB extended JSON type indicators
+MONGO_TYPES = {'$numberLong', '$numberInt', '$numberDouble', '$numberDecimal',
+               '$date', '$oid', '$binary', '$regex', '$timestamp', '$minKey', '$maxKey',
+               '$regularExpression', '$dbPointer', '$code', '$scope', '$symbol', '$undefined'}
+
+# Number of documents kept in the uniform sample used for value suggestions
+SAMPLE_SIZE = 1000
+
+# Sample sizes offered in the Import menu; larger samples make match previews more precise
+SAMPLE_SIZES = (1000, 10000, 100000)
+
+# Array elements visited per array; longer arrays are randomly sampled
+MAX_ARRAY_ELEMENTS = 50
+
+# Most frequent values tracked per field (Space-Saving sketch capacity)
+TOP_VALUES_PER_FIELD = 256
+
+# Characters read from the file per chunk while streaming
+READ_CHUNK_SIZE = 1 << 20
+
+JSON_WHITESPACE = ' \t\n\r'
+
+# Seconds between progress reports sent from an import job
+PROGRESS_INTERVAL = 0.2
+
+# Line-delimited exports (mongoexport) by file extension
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl', '.ldjson')
+
+# Binary dumps (mongodump) by file extension
+BSON_EXTENSIONS = ('.bson',)
+
+# Compass CSV exports by file extension
+CSV_EXTENSIONS = ('.csv',)
+
+# Formats that grow by appending whole documents, so a re-import can parse just the new tail
+APPENDABLE_FORMATS = ('ndjson', 'bson')
+
+# Files picked up when a whole directory is imported (optionally compressed)
+IMPORT_EXTENSIONS = ('.json',) + NDJSON_EXTENSIONS + BSON_EXTENSIONS + CSV_EXTENSIONS
+
+# NDJSON and BSON files smaller than this are parsed in the import thread
+PARALLEL_MIN_BYTES = 8 << 20
+
+# Byte range handed to one NDJSON or BSON worker process
+MIN_CHUNK_BYTES = 4 << 20
+MAX_CHUNK_BYTES = 64 << 20
+
+# Longest first line read when sniffing for NDJSON
+SNIFF_LINE_LIMIT = 4 << 20
+
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# Files at least this large are memory-mapped instead of read through a text stream
+MMAP_MIN_BYTES = 16 << 20
+
+def unwrap_mongo_type(value):
+    """Unwrap MongoDB extended JSON types to get actual value"""
+    # Canonical extended JSON may nest wrappers, e.g. {"$date": {"$numberLong": "..."}}
+    while isinstance(value, dict) and len(value) == 1:
+        key = next(iter(value))
+        if key not in MONGO_TYPES:
+            break
+        value = value[key]
+    return value
+
+class DocumentReservoir:
+    """Fixed-size uniform random sample of a document stream (reservoir sampling)"""
+    def __init__(self, size=SAMPLE_SIZE):
+        self.size = size
+        self.seen = 0
+        self.documents = []
+        self.random = random.Random()
+    
+    def offer(self, doc):
+        """Consider one document from the stream for the sample"""
+        self.seen += 1
+        if len(self.documents) < self.size:
+            self.documents.append(doc)
+        else:
+            slot = self.random.randrange(self.seen)
+            if slot < self.size:
+                self.documents[slot] = doc
+    
+    def merge(self, other):
+        """Merge another reservoir so the result is a uniform sample of both streams"""
+        size = min(self.size, other.size)
+        remaining_self, remaining_other = self.seen, other.seen
+        take_self = 0
+        # Draw the sample slots without replacement from the combined stream
+        for _ in range(min(size, remaining_self + remaining_other)):
+            if self.random.randrange(remaining_self + remaining_other) < remaining_self:
+                take_self += 1
+                remaining_self -= 1
+            else:
+                remaining_other -= 1
+        take_other = min(size, self.seen + other.seen) - take_self
+        self.documents = (self.random.sample(self.documents, take_self) +
+                          self.random.sample(other.documents, take_other))
+        self.size = size
+        self.seen += other.seen
+    
+    def resize(self, size):
+        """Change the sample size; returns False if growing it would need documents already dropped"""
+        if size > self.size and self.seen > self.size:
+            return False
+        if len(self.documents) > size:
+            self.documents = self.random.sample(self.documents, size)
+        self.size = size
+        return True
+
+# Extended JSON number wrappers
+MONGO_NUMBER_TYPES = ('$numberLong', '$numberInt', '$numberDouble', '$numberDecimal')
+
+# $type names of extended JSON wrappers
+MONGO_TYPE_NAMES = {'$oid': 'objectId', '$date': 'date', '$numberLong': 'long', '$numberInt': 'int',
+                    '$numberDouble': 'double', '$numberDecimal': 'decimal', '$binary': 'binData',
+                    '$timestamp': 'timestamp', '$regex': 'regex', '$regularExpression': 'regex',
+                    '$minKey': 'minKey', '$maxKey': 'maxKey', '$code': 'javascript', '$symbol': 'symbol',
+                    '$dbPointer': 'dbPointer', '$undefined': 'undefined'}
+
+# Quantiles suggested for range operators ($gt, $gte, $lt, $lte)
+RANGE_QUANTILES = [('min', 0.0), ('p10', 0.1), ('median', 0.5), ('p90', 0.9), ('max', 1.0)]
+
+def parse_iso_date(text):
+    """Parse an ISO-8601 date string to epoch milliseconds, or None"""
+    try:
+        parsed = datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp() * 1000
+
+def numeric_value(value):
+    """Return ('number' | 'date', float) for numeric and $date values, otherwise None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+        return ('number', number) if math.isfinite(number) else None
+    if isinstance(value, dict) and len(value) == 1:
+        key, inner = next(iter(value.items()))
+        if key in MONGO_NUMBER_TYPES:
+            try:
+                number = float(inner)
+            except (TypeError, ValueError):
+                return None
+            return ('number', number) if math.isfinite(number) else None
+        if key == '$date':
+            # Relaxed ({"$date": "2024-01-01T00:00:00Z"}) or canonical ({"$date": {"$numberLong": "..."}})
+            if isinstance(inner, str):
+                millis = parse_iso_date(inner)
+            else:
+                number = numeric_value(inner)
+                millis = number[1] if number else None
+            return ('date', millis) if millis is not None else None
+    return None
+
+def value_type(value):
+    """Return the MongoDB $type name of a primitive or extended JSON value"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'double'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, dict) and value:
+        return MONGO_TYPE_NAMES.get(next(iter(value)), 'object')
+    return 'array' if isinstance(value, list) else 'object'
+
+def format_numeric(kind, number):
+    """Format a number or epoch-millisecond date for the value box"""
+    if kind == 'date':
+        moment = datetime.fromtimestamp(number / 1000, tz=timezone.utc)
+        return moment.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+    if float(number).is_integer() and abs(number) < 1e15:
+        return str(int(number))
+    return f"{number:.4f}".rstrip('0').rstrip('.')
+
+def parse_numeric(kind, text):
+    """Parse text typed in the value box back to a number of the given kind, or None"""
+    text = text.strip().strip('"\'')
+    if kind == 'date':
+        return parse_iso_date(text)
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+class FieldStats:
+    """Mergeable value statistics for one field path with a fixed memory footprint"""
+    def __init__(self):
+        self.count = 0
+        self.types = {}  # Values seen per $type name
+        self.top_values = SpaceSaving(TOP_VALUES_PER_FIELD)
+        self.distinct = HyperLogLog()
+        self.numeric_kind = None  # 'number' or 'date' once a typed value is seen
+        self.quantiles = None  # Quantile sketch of the typed values
+    
+    def add(self, value, raw_value=None):
+        """Record one primitive value (raw_value keeps the extended JSON wrapper)"""
+        text = str(value)
+        self.count += 1
+        type_name = value_type(value if raw_value is None else raw_value)
+        self.types[type_name] = self.types.get(type_name, 0) + 1
+        self.top_values.add(text)
+        self.distinct.add(text)
+        
+        typed = numeric_value(value if raw_value is None else raw_value)
+        if typed is not None:
+            kind, number = typed
+            if self.quantiles is None:
+                self.numeric_kind = kind
+                self.quantiles = TDigest()
+            # A field that mixes numbers and dates keeps the first kind it saw
+            if kind == self.numeric_kind:
+                self.quantiles.add(number)
+    
+    def merge(self, other):
+        """Combine the statistics of the same field from another extractor"""
+        self.count += other.count
+        for type_name, count in other.types.items():
+            self.types[type_name] = self.types.get(type_name, 0) + count
+        self.top_values.merge(other.top_values)
+        self.distinct.merge(other.distinct)
+        if other.quantiles is not None:
+            if self.quantiles is None:
+                self.numeric_kind = other.numeric_kind
+                self.quantiles = other.quantiles
+            elif other.numeric_kind == self.numeric_kind:
+                self.quantiles.merge(other.quantiles)
+    
+    def distinct_estimate(self):
+        """Estimated number of distinct values (exact while every value is tracked)"""
+        if not self.top_values.is_full():
+            return len(self.top_values.counts)
+        return max(self.distinct.estimate(), len(self.top_values.counts))
+    
+    def compact(self):
+        """Release working buffers that are only needed while values are being added"""
+        self.top_values.compact()
+        if self.quantiles is not None:
+            self.quantiles.quantile(0.5)  # Folds buffered points into centroids
+    
+    def value_counts(self):
+        """Return (value, count) pairs, most frequent first"""
+        return self.top_values.most_common()
+    
+    def range_suggestions(self):
+        """Return (label, formatted value) pairs for min/p10/median/p90/max"""
+        if self.quantiles is None or not self.quantiles.count:
+            return []
+        return [(label, format_numeric(self.numeric_kind, self.quantiles.quantile(q)))
+                for label, q in RANGE_QUANTILES]
+    
+    def range_fraction(self, operator, text):
+        """Estimated fraction of this field's typed values selected by a range condition"""
+        if self.quantiles is None or not self.quantiles.count:
+            return None
+        bound = parse_numeric(self.numeric_kind, text)
+        if bound is None:
+            return None
+        below_or_equal = self.quantiles.cdf(bound)
+        # The digest cannot tell < from <=; exact hits only matter for the extremes
+        if operator in ('$lt', '$gte') and bound <= self.quantiles.min:
+            below_or_equal = 0.0
+        if operator in ('$lt', '$lte'):
+            return below_or_equal
+        return 1.0 - below_or_equal
+
+class SchemaExtractor:
+    """Collect field paths and value statistics from every document, plus a uniform sample"""
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.fields = set()
+        self.field_stats = {}  # Value statistics per field
+        self.reservoir = DocumentReservoir(sample_size)
+        self.document_count = 0
+    
+    def add_document(self, doc):
+        """Extract fields and values from a single document and offer it to the sample"""
+        self.extract_fields(doc)
+        self.reservoir.offer(doc)
+        self.document_count += 1
+    
+    def extract_fields(self, obj, prefix=""):
+        """Recursively extract all field names and values from JSON object"""
+        if isinstance(obj, dict):
+            # Skip if this is a MongoDB type wrapper (single key from MONGO_TYPES)
+            if len(obj) == 1 and next(iter(obj)) in MONGO_TYPES:
+                return
+            
+            for key, value in obj.items():
+                # Skip MongoDB type keys
+                if key in MONGO_TYPES:
+                    continue
+                
+                field_path = f"{prefix}.{key}" if prefix else key
+                self.fields.add(field_path)
+                self.extract_value(value, field_path)
+        
+        elif isinstance(obj, list):
+            for element in self.sample_array(obj):
+                self.extract_fields(element, prefix)
+    
+    def extract_value(self, value, field_path):
+        """Record a field's value, descending into sub-documents and array elements"""
+        # Store field values (unwrap MongoDB types)
+        unwrapped_value = unwrap_mongo_type(value)
+        
+        if not isinstance(unwrapped_value, (dict, list)):
+            stats = self.field_stats.get(field_path)
+            if stats is None:
+                stats = self.field_stats[field_path] = FieldStats()
+            stats.add(unwrapped_value, value)
+        elif isinstance(value, list):
+            # Array elements share the array's path; their fields and values are merged
+            for element in self.sample_array(value):
+                self.extract_value(element, field_path)
+        else:
+            self.extract_fields(value, field_path)
+    
+    def sample_array(self, values):
+        """Return the array elements to visit, at most MAX_ARRAY_ELEMENTS of them"""
+        if len(values) <= MAX_ARRAY_ELEMENTS:
+            return values
+        # Long arrays contribute a random subset so per-document cost stays bounded
+        return [values[i] for i in sorted(self.reservoir.random.sample(range(len(values)), MAX_ARRAY_ELEMENTS))]
+    
+    def merge(self, other):
+        """Merge the fields, statistics and sample collected by another extractor into this one"""
+        self.fields.update(other.fields)
+        for field_path, other_stats in other.field_stats.items():
+            stats = self.field_stats.get(field_path)
+            if stats is None:
+                self.field_stats[field_path] = other_stats
+            else:
+                stats.merge(other_stats)
+        self.reservoir.merge(other.reservoir)
+        self.document_count += other.document_count
+    
+    def sorted_fields(self):
+        """Return the collected field paths in sorted order"""
+        return sorted(self.fields)
+    
+    def suggested_values(self):
+        """Return the most frequent values per field, most frequent first"""
+        return {k: [value for value, _ in stats.value_counts()] for k, stats in self.field_stats.items()}
+
+class SampleStore:
+    """Compact columnar copy of the sampled documents.
+    
+    Every top-level field is a column of compact JSON-encoded values (None when the
+    document lacks the field), so the sample costs about its serialized size and only
+    the columns a filter touches have to be decoded again.
+    """
+    def __init__(self, documents):
+        self.row_count = len(documents)
+        self.columns = {}
+        for row, doc in enumerate(documents):
+            if not isinstance(doc, dict):
+                continue
+            for key, value in doc.items():
+                column = self.columns.get(key)
+                if column is None:
+                    column = self.columns[key] = [None] * self.row_count
+                column[row] = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    
+    def documents(self, fields=None):
+        """Yield the sampled documents, decoding only the columns needed for fields"""
+        if fields is None:
+            names = list(self.columns)
+        else:
+            names = list(dict.fromkeys(f.split('.')[0] for f in fields if f.split('.')[0] in self.columns))
+        columns = [(name, self.columns[name]) for name in names]
+        for row in range(self.row_count):
+            doc = {}
+            for name, column in columns:
+                encoded = column[row]
+                if encoded is not None:
+                    doc[name] = json.loads(encoded)
+            yield doc
+    
+    def document(self, row):
+        """Decode every column of one sampled document"""
+        return {name: json.loads(column[row]) for name, column in self.columns.items() if column[row] is not None}
+    
+    def memory_usage(self):
+        """Approximate bytes held by the store"""
+        total = sys.getsizeof(self.columns)
+        for name, column in self.columns.items():
+            total += sys.getsizeof(name) + sys.getsizeof(column)
+            total += sum(sys.getsizeof(encoded) for encoded in column if encoded is not None)
+        return total
+
+def estimate_memory(obj, seen=None):
+    """Approximate deep size in bytes of a structure of containers and plain objects"""
+    if seen is None:
+        seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__') and not isinstance(item, type):
+            stack.append(item.__dict__)
+    return total
+
+def iter_json_documents(f, chunk_size=READ_CHUNK_SIZE):
+    """Yield documents from a JSON text stream one at a time.
+    
+    A top-level array (MongoDB Compass export) is tokenized element by element, so
+    peak memory is bound by the largest document rather than the whole file. Any
+    other input is read as one or more whitespace separated JSON values.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    read_size = chunk_size
+    
+    def fill():
+        """Drop consumed text and append the next chunk; returns False at EOF"""
+        nonlocal buf, pos, eof
+        chunk = f.read(read_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+    
+    def skip(chars):
+        """Advance past the given characters, reading more text when needed"""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+    
+    def decode_next():
+        """Decode the value starting at pos, growing the buffer until it is complete"""
+        nonlocal pos, read_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # A value that ends exactly at the buffer edge may be a truncated number
+                if end < len(buf) or eof:
+                    pos = end
+                    read_size = chunk_size
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            # Grow the read size so very large documents are not re-scanned too often
+            if fill():
+                read_size = min(read_size * 2, 64 * chunk_size)
+    
+    skip(JSON_WHITESPACE)
+    if pos >= len(buf):
+        return
+    
+    if buf[pos] == '[':
+        # Array of documents - stream each element
+        pos += 1
+        skip(JSON_WHITESPACE)
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        while True:
+            yield decode_next()
+            skip(JSON_WHITESPACE)
+            if pos >= len(buf):
+                raise json.JSONDecodeError("Unterminated array", buf, pos)
+            if buf[pos] == ']':
+                return
+            if buf[pos] != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+            pos += 1
+            skip(JSON_WHITESPACE)
+    else:
+        # Single document (or several documents separated by whitespace)
+        while pos < len(buf):
+            yield decode_next()
+            skip(JSON_WHITESPACE)
+
+def map_file(f):
+    """Memory-map an open binary file read-only, hinting sequential access"""
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
+
+class MappedTextReader:
+    """Read-only text view of a memory-mapped UTF-8 file.
+    
+    Text is decoded straight from the mapping one window at a time, so the file is
+    served from the OS page cache without a second buffered copy, and tell() gives
+    the exact byte offset reached.
+    """
+    def __init__(self, mm, start=0):
+        self.mm = mm
+        self.pos = start
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.closed = False
+    
+    def read(self, size):
+        """Decode up to size bytes from the mapping; returns '' at the end"""
+        end = min(self.pos + size, len(self.mm))
+        if self.pos >= end:
+            return ''
+        text = self.decoder.decode(self.mm[self.pos:end], final=end == len(self.mm))
+        self.pos = end
+        return text
+    
+    def tell(self):
+        """Byte offset of the next unread byte"""
+        return self.pos
+
+def detect_input_compression(filename):
+    """Return the compression of an input file ('gzip', 'bz2', 'zstd') or None"""
+    # A BSON document of 559,903 bytes (length prefix 1f 8b 08 00) starts with the gzip
+    # magic bytes, so plain .bson files are never sniffed; mongodump --gzip writes .bson.gz
+    if filename.lower().endswith(BSON_EXTENSIONS):
+        return None
+    return detect_compression(filename)
+
+def detect_file_format(filename):
+    """Return the export format: 'bson' (mongodump), 'csv', 'ndjson' (line-delimited) or 'json'.
+    
+    Compressed files are judged by their name without the compression extension
+    and by the start of their decompressed content.
+    """
+    name = strip_compression_extension(filename).lower()
+    if name.endswith(BSON_EXTENSIONS):
+        return 'bson'
+    if name.endswith(CSV_EXTENSIONS):
+        return 'csv'
+    if name.endswith(NDJSON_EXTENSIONS):
+        return 'ndjson'
+    
+    with open(filename, 'rb') as raw, open_decompressed(raw, detect_input_compression(filename)) as f:
+        first_line = f.readline(SNIFF_LINE_LIMIT)
+        if first_line.startswith(UTF8_BOM):
+            first_line = first_line[len(UTF8_BOM):]
+        stripped = first_line.strip()
+        # mongoexport writes one complete document per line
+        if not stripped.startswith(b'{') or not first_line.endswith(b'\n'):
+            return 'json'
+        try:
+            json.loads(stripped)
+        except ValueError:
+            return 'json'
+        # A single document on one line is still plain JSON
+        for line in f:
+            if line.strip():
+                return 'ndjson'
+    return 'json'
+
+def list_import_files(directory):
+    """Return the importable exports directly inside a directory, sorted by name"""
+    filenames = []
+    for entry in os.scandir(directory):
+        name = strip_compression_extension(entry.name).lower()
+        # mongodump writes <collection>.metadata.json next to each .bson file
+        if not entry.is_file() or name.endswith('.metadata.json'):
+            continue
+        if name.endswith(IMPORT_EXTENSIONS):
+            filenames.append(entry.path)
+    return sorted(filenames)
+
+def split_line_ranges(filename, chunk_size, start=0):
+    """Split a file from start on into (start, end) byte ranges that begin and end on line boundaries"""
+    total = os.path.getsize(filename)
+    ranges = []
+    with open(filename, 'rb') as f:
+        while start < total:
+            f.seek(min(start + chunk_size, total))
+            # Move the cut to the start of the next line
+            f.readline()
+            end = min(f.tell(), total)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def _parse_ndjson_range(filename, start, end, sample_size=SAMPLE_SIZE):
+    """Worker process: build a partial schema from the lines in [start, end)"""
+    extractor = SchemaExtractor(sample_size)
+    # Every worker maps the same file, so they all read from the shared page cache
+    with open(filename, 'rb') as f, map_file(f) as mm:
+        offset = start
+        if offset == 0 and mm[:len(UTF8_BOM)] == UTF8_BOM:
+            offset = len(UTF8_BOM)
+        while offset < end:
+            line_end = mm.find(b'\n', offset, end)
+            if line_end < 0:
+                line_end = end
+            line_start = offset
+            offset = line_end + 1
+            line = mm[line_start:line_end]
+            if not line.strip():
+                continue
+            try:
+                doc = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise json.JSONDecodeError(f"{e.msg} (document at byte {line_start})", e.doc, e.pos)
+            extractor.add_document(doc)
+    return extractor
+
+def _parse_bson_range(filename, start, end, sample_size=SAMPLE_SIZE):
+    """Worker process: build a partial schema from the BSON documents in [start, end)"""
+    extractor = SchemaExtractor(sample_size)
+    with open(filename, 'rb') as f, map_file(f) as mm:
+        for doc in iter_document_range(mm, start, end):
+            extractor.add_document(doc)
+    return extractor
+
+def _import_file(filename, sample_size=SAMPLE_SIZE):
+    """Worker process: import one whole file on its own and return its extractor"""
+    job = SchemaImportJob(filename, parallel=False, sample_size=sample_size)
+    job.start_time = time.monotonic()
+    job.read_documents()
+    return job.extractor
+
+class ImportCancelled(Exception):
+    """Raised inside an import job when the user cancels it"""
+
+class SchemaImportJob:
+    """Run a schema import in a worker thread and report progress through a queue.
+    
+    Messages posted to ``messages`` are ``(kind, payload)`` tuples where kind is
+    'progress' (payload: progress dict), 'done' (payload: SchemaExtractor),
+    'cancelled' (payload: None) or 'error' (payload: the exception). Before 'done'
+    the sorted field paths are indexed for search in ``field_index``.
+    
+    When a SchemaCache is given, an unchanged file is loaded from the cache instead
+    of being parsed again, and fresh results are stored for next time; a cached
+    result whose sample is smaller than sample_size is parsed again. With
+    parallel=False large files are still parsed in this process only.
+    """
+    def __init__(self, filename, cache=None, parallel=True, sample_size=SAMPLE_SIZE):
+        self.filename = filename
+        self.filenames = [filename]
+        self.cache = cache
+        self.parallel = parallel
+        self.sample_size = sample_size
+        self.cache_key = None
+        self.from_cache = False
+        self.total_bytes = os.path.getsize(filename)
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.extractor = SchemaExtractor(sample_size)
+        self.bytes_read = 0
+        self.resumed_offset = 0  # Bytes taken from the previous import when only the tail is parsed
+        self.resumed_documents = 0
+        self.file_summaries = {}  # Filled by multi-file imports only
+        self.field_index = None
+        self.compression = None
+        self.uncompressed_bytes = 0
+        self.start_time = None
+        self.last_report = 0.0
+        self._source = None
+        self._stream = None
+    
+    def start(self):
+        """Start the import in a background thread"""
+        threading.Thread(target=self.run, daemon=True).start()
+    
+    def cancel(self):
+        """Ask the worker to stop at the next document"""
+        self.cancel_event.set()
+    
+    def run(self):
+        """Worker thread entry point"""
+        self.start_time = time.monotonic()
+        try:
+            if not self.load_from_cache():
+                if not self.resume_from_checkpoint():
+                    self.read_documents()
+                self.save_to_cache()
+        except ImportCancelled:
+            self.messages.put(('cancelled', None))
+        except Exception as e:
+            self.messages.put(('error', e))
+        else:
+            self.report_progress()
+            # Built here so the UI thread does not pause to index a large schema
+            self.field_index = FieldSearchIndex(self.extractor.sorted_fields())
+            self.messages.put(('done', self.extractor))
+    
+    def load_from_cache(self):
+        """Use a cached result for this file if it has not changed; returns True on a hit"""
+        if self.cache is None:
+            return False
+        try:
+            self.cache_key = file_fingerprint(self.filename)
+            cached = self.cache.load(self.cache_key)
+        except Exception:
+            # The cache is only an accelerator - fall back to parsing
+            return False
+        if cached is None or not cached.reservoir.resize(self.sample_size):
+            return False
+        self.extractor = cached
+        self.from_cache = True
+        self.bytes_read = self.total_bytes
+        return True
+    
+    def save_to_cache(self):
+        """Store the finished import in the cache, with a checkpoint for appendable files"""
+        if self.cache is None or self.cache_key is None:
+            return
+        try:
+            self.cache.store(self.cache_key, self.filename, self.extractor)
+            if self.appendable_format() is not None and self.ends_on_boundary():
+                checksum = prefix_fingerprint(self.filename, self.bytes_read)
+                self.cache.store_checkpoint(self.filename, self.bytes_read, checksum, self.cache_key)
+        except Exception:
+            pass
+    
+    def appendable_format(self):
+        """Return the file format if new documents can be appended to it, otherwise None"""
+        file_format = detect_file_format(self.filename)
+        if file_format not in APPENDABLE_FORMATS or detect_input_compression(self.filename) is not None:
+            return None
+        return file_format
+    
+    def ends_on_boundary(self):
+        """True if the bytes read so far end on a document boundary where appended data can start"""
+        if detect_file_format(self.filename) == 'bson':
+            return True
+        # A last NDJSON line without its newline may still be in the middle of being written
+        with open(self.filename, 'rb') as f:
+            f.seek(max(self.bytes_read - 1, 0))
+            return f.read(1) == b'\n'
+    
+    def resume_from_checkpoint(self):
+        """Parse only the documents appended since the last import; returns True if resumed.
+        
+        The previous result is reused when the file still starts with exactly the
+        bytes that were imported last time, checked with a fingerprint of that prefix.
+        """
+        if self.cache is None:
+            return False
+        try:
+            file_format = self.appendable_format()
+            checkpoint = self.cache.load_checkpoint(self.filename) if file_format else None
+            if checkpoint is None:
+                return False
+            offset, checksum, key = checkpoint
+            if offset > self.total_bytes or prefix_fingerprint(self.filename, offset) != checksum:
+                return False
+            previous = self.cache.load(key)
+        except Exception:
+            # The cache is only an accelerator - fall back to parsing
+            return False
+        if previous is None or not previous.reservoir.resize(self.sample_size):
+            return False
+        
+        self.extractor = previous
+        self.resumed_offset = self.bytes_read = offset
+        self.resumed_documents = previous.document_count
+        if file_format == 'bson':
+            with open(self.filename, 'rb') as f, map_file(f) as mm:
+                ranges = split_document_ranges(mm, self.parallel_chunk_size(), start=offset)
+            worker = _parse_bson_range
+        else:
+            ranges = split_line_ranges(self.filename, self.parallel_chunk_size(), start=offset)
+            worker = _parse_ndjson_range
+        tasks = [((self.filename, start, end, self.sample_size), end - start) for start, end in ranges]
+        
+        if self.parallel and self.total_bytes - offset >= PARALLEL_MIN_BYTES:
+            self.read_parallel(worker, tasks)
+        else:
+            for args, size in tasks:
+                if self.cancel_event.is_set():
+                    raise ImportCancelled()
+                self.extractor.merge(worker(*args))
+                self.bytes_read += size
+                self.report_progress()
+        return True
+    
+    def read_documents(self):
+        """Read the file with the reader that fits its format"""
+        file_format = detect_file_format(self.filename)
+        self.compression = detect_input_compression(self.filename)
+        if self.compression is not None:
+            # Compressed input can only be read front to back, so it is decoded in this thread
+            self.read_compressed(file_format)
+        elif file_format == 'bson':
+            if self.parallel and self.total_bytes >= PARALLEL_MIN_BYTES:
+                self.read_bson_parallel()
+            else:
+                self.read_bson_stream()
+        elif file_format == 'csv':
+            self.read_csv_stream()
+        elif file_format == 'ndjson' and self.parallel and self.total_bytes >= PARALLEL_MIN_BYTES:
+            self.read_ndjson_parallel()
+        elif self.total_bytes >= MMAP_MIN_BYTES:
+            self.read_json_mapped()
+        else:
+            self.read_json_stream()
+    
+    def read_json_stream(self):
+        """Stream documents from the file into the extractor"""
+        with open(self.filename, 'rb') as raw:
+            self._source = raw
+            # Use utf-8-sig to handle BOM (Byte Order Mark) from MongoDB Compass exports
+            with io.TextIOWrapper(raw, encoding='utf-8-sig') as f:
+                # The whole file is scanned so late fields are not missed
+                for doc in iter_json_documents(f):
+                    self.add_document(doc)
+                self.bytes_read = raw.tell()
+    
+    def read_json_mapped(self):
+        """Stream documents from a memory-mapped file into the extractor"""
+        with open(self.filename, 'rb') as f, map_file(f) as mm:
+            start = len(UTF8_BOM) if mm[:len(UTF8_BOM)] == UTF8_BOM else 0
+            reader = MappedTextReader(mm, start)
+            self._source = reader
+            try:
+                for doc in iter_json_documents(reader):
+                    self.add_document(doc)
+            finally:
+                reader.closed = True
+            self.bytes_read = reader.tell()
+    
+    def read_compressed(self, file_format):
+        """Stream documents through a decompressor into the extractor, without temporary files"""
+        with open(self.filename, 'rb') as raw, open_decompressed(raw, self.compression) as stream:
+            self._source = raw
+            self._stream = stream
+            if file_format == 'bson':
+                documents = iter_bson_documents(stream)
+            elif file_format == 'csv':
+                text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+                documents = iter_csv_documents(text)
+            else:
+                # NDJSON is a sequence of whitespace separated documents, which the JSON reader accepts.
+                # Keep a reference: a collected wrapper would close the stream before tell() below
+                text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+                documents = iter_json_documents(text)
+            for doc in documents:
+                self.add_document(doc)
+            self.bytes_read = raw.tell()
+            self.uncompressed_bytes = stream.tell()
+    
+    def read_csv_stream(self):
+        """Stream rows of a CSV export into the extractor as typed documents"""
+        with open(self.filename, 'rb') as raw:
+            self._source = raw
+            with io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as f:
+                for doc in iter_csv_documents(f):
+                    self.add_document(doc)
+                self.bytes_read = raw.tell()
+    
+    def read_bson_stream(self):
+        """Stream documents from a mongodump BSON file into the extractor"""
+        with open(self.filename, 'rb') as f:
+            self._source = f
+            for doc in iter_bson_documents(f):
+                self.add_document(doc)
+            self.bytes_read = f.tell()
+    
+    def read_bson_parallel(self):
+        """Parse document ranges of a BSON file in worker processes and merge the results"""
+        with open(self.filename, 'rb') as f, map_file(f) as mm:
+            ranges = split_document_ranges(mm, self.parallel_chunk_size())
+        self.read_parallel(_parse_bson_range, [((self.filename, start, end, self.sample_size), end - start)
+                                               for start, end in ranges])
+    
+    def read_ndjson_parallel(self):
+        """Parse line ranges of an NDJSON file in worker processes and merge the results"""
+        ranges = split_line_ranges(self.filename, self.parallel_chunk_size())
+        self.read_parallel(_parse_ndjson_range, [((self.filename, start, end, self.sample_size), end - start)
+                                                 for start, end in ranges])
+    
+    def parallel_chunk_size(self):
+        """Bytes per worker task: about four tasks per CPU within fixed bounds"""
+        workers = os.cpu_count() or 1
+        return min(max(self.total_bytes // (workers * 4), MIN_CHUNK_BYTES), MAX_CHUNK_BYTES)
+    
+    def read_parallel(self, worker, tasks, on_result=None):
+        """Run worker(*args) for every (args, size in bytes) task in worker processes.
+        
+        Results are merged into the extractor as they finish; on_result(args, extractor)
+        is called first, while the result is still unmerged.
+        """
+        workers = os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+        try:
+            pending = {pool.submit(worker, *args): (args, size) for args, size in tasks}
+            while pending:
+                done, _ = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                if self.cancel_event.is_set():
+                    raise ImportCancelled()
+                for future in done:
+                    args, size = pending.pop(future)
+                    result = future.result()
+                    if on_result is not None:
+                        on_result(args, result)
+                    self.bytes_read += size
+                    self.extractor.merge(result)
+                self.report_progress()
+        finally:
+            # Drop queued chunks; running workers finish their current chunk in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def add_document(self, doc):
+        """Feed one document to the extractor, honouring cancel and reporting progress"""
+        if self.cancel_event.is_set():
+            raise ImportCancelled()
+        self.extractor.add_document(doc)
+        now = time.monotonic()
+        if now - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = now
+            if self._source is not None and not self._source.closed:
+                self.bytes_read = self._source.tell()
+            if self._stream is not None and not self._stream.closed:
+                self.uncompressed_bytes = self._stream.tell()
+            self.report_progress()
+    
+    def report_progress(self):
+        """Post a progress snapshot to the UI queue"""
+        self.messages.put(('progress', self.progress()))
+    
+    def progress(self):
+        """Return a snapshot of the import progress"""
+        elapsed = max(time.monotonic() - self.start_time, 1e-6)
+        # bytes_read counts the file on disk; for compressed input that is the compressed size
+        uncompressed_bytes = self.uncompressed_bytes if self.compression is not None else self.bytes_read
+        # Rates only count what this import parsed, not a resumed previous import
+        parsed_bytes = self.bytes_read - self.resumed_offset
+        parsed_documents = self.extractor.document_count - self.resumed_documents
+        return {
+            'bytes_read': self.bytes_read,
+            'total_bytes': self.total_bytes,
+            'compression': self.compression,
+            'uncompressed_bytes': uncompressed_bytes,
+            'bytes_per_sec': parsed_bytes / elapsed,
+            'uncompressed_bytes_per_sec': (uncompressed_bytes - self.resumed_offset) / elapsed,
+            'resumed_offset': self.resumed_offset,
+            'documents': self.extractor.document_count,
+            'docs_per_sec': parsed_documents / elapsed,
+            'fields': len(self.extractor.fields),
+            'from_cache': self.from_cache,
+            'elapsed': elapsed
+        }
+
+class FileSummary:
+    """What one file of a multi-file import contributed to the merged schema"""
+    def __init__(self, filename, extractor, from_cache=False):
+        self.filename = filename
+        self.document_count = extractor.document_count
+        self.fields = set(extractor.fields)
+        self.field_types = {path: dict(stats.types) for path, stats in extractor.field_stats.items()}
+        self.from_cache = from_cache
+
+class MultiFileImportJob(SchemaImportJob):
+    """Import several files in worker processes and merge them into one schema.
+    
+    Each file is parsed whole by one worker process; finished files are merged in
+    the import thread as they arrive. Unchanged files are taken from the cache.
+    ``file_summaries`` maps every file name to its FileSummary, in input order.
+    """
+    def __init__(self, filenames, cache=None, sample_size=SAMPLE_SIZE):
+        super().__init__(filenames[0], cache, sample_size=sample_size)
+        self.filenames = list(filenames)
+        self.total_bytes = sum(os.path.getsize(filename) for filename in self.filenames)
+        self.cache_keys = {}
+    
+    def load_from_cache(self):
+        """Files are looked up in the cache one by one in read_documents"""
+        return False
+    
+    def resume_from_checkpoint(self):
+        """Every file is imported whole; grown files are parsed again"""
+        return False
+    
+    def save_to_cache(self):
+        """Files are stored in the cache one by one as their workers finish"""
+    
+    def read_documents(self):
+        """Merge cached files, then parse the others in worker processes"""
+        summaries = {}
+        tasks = []
+        for filename in self.filenames:
+            cached = self.load_file_from_cache(filename)
+            if cached is None:
+                tasks.append(((filename, self.sample_size), os.path.getsize(filename)))
+                continue
+            summaries[filename] = FileSummary(filename, cached, from_cache=True)
+            self.bytes_read += os.path.getsize(filename)
+            self.extractor.merge(cached)
+        
+        def file_done(args, extractor):
+            filename = args[0]
+            summaries[filename] = FileSummary(filename, extractor)
+            # Stored before merging, which may take over the extractor's statistics
+            self.save_file_to_cache(filename, extractor)
+        
+        if tasks:
+            self.read_parallel(_import_file, tasks, on_result=file_done)
+        self.file_summaries = {filename: summaries[filename] for filename in self.filenames}
+        self.from_cache = all(summary.from_cache for summary in summaries.values())
+    
+    def load_file_from_cache(self, filename):
+        """Return the cached extractor of an unchanged file, or None"""
+        if self.cache is None:
+            return None
+        try:
+            self.cache_keys[filename] = file_fingerprint(filename)
+            cached = self.cache.load(self.cache_keys[filename])
+        except Exception:
+            return None
+        if cached is None or not cached.reservoir.resize(self.sample_size):
+            return None
+        return cached
+    
+    def save_file_to_cache(self, filename, extractor):
+        """Store one file's import result in the cache"""
+        if self.cache is None or filename not in self.cache_keys:
+            return
+        try:
+            self.cache.store(self.cache_keys[filename], filename, extractor)
+        except Exception:
+            pass
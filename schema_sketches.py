@@ -0,0 +1,287 @@
+"""
+Streaming sketches used by the schema importer
+Fixed-size, mergeable summaries of the values seen for a field, so huge exports can be
+summarised in one pass and partial results from worker processes can be combined.
+"""
+
+import hashlib
+import heapq
+import math
+
+def stable_hash(text):
+    """64-bit hash of a string that is identical across processes (unlike hash())"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'big')
+
+class SpaceSaving:
+    """Space-Saving top-k frequency sketch (Metwally et al.)
+    
+    Tracks at most ``capacity`` items. Counts are exact until the sketch is full; after
+    that every count is an upper bound that overestimates by at most ``errors[item]``.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # Min-heap of (count, item); entries may be stale because counts only grow
+        self._heap = []
+    
+    def add(self, item, count=1):
+        """Count one occurrence of item"""
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (count, item))
+            return
+        
+        # Replace the item with the smallest count
+        heap = self._heap
+        if not heap:
+            # Heap was dropped by compact()
+            heap.extend((c, i) for i, c in counts.items())
+            heapq.heapify(heap)
+        while True:
+            min_count, min_item = heap[0]
+            current = counts[min_item]
+            if current == min_count:
+                break
+            # Stale entry - refresh it with the current count
+            heapq.heapreplace(heap, (current, min_item))
+        
+        del counts[min_item]
+        del self.errors[min_item]
+        counts[item] = min_count + count
+        self.errors[item] = min_count
+        heapq.heapreplace(heap, (min_count + count, item))
+    
+    def is_full(self):
+        """True once items have started to be evicted (counts become estimates)"""
+        return len(self.counts) >= self.capacity
+    
+    def min_count(self):
+        """Upper bound on the count of any item that is not tracked"""
+        if not self.is_full():
+            return 0
+        return min(self.counts.values())
+    
+    def compact(self):
+        """Drop the eviction heap to save memory; it is rebuilt on the next eviction"""
+        self._heap = []
+    
+    def most_common(self, n=None):
+        """Return (item, count) pairs ordered by descending count"""
+        items = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))
+        return items if n is None else items[:n]
+    
+    def merge(self, other):
+        """Combine another sketch into this one"""
+        missing_self = self.min_count()
+        missing_other = other.min_count()
+        merged = {}
+        errors = {}
+        for item in set(self.counts) | set(other.counts):
+            if item in self.counts:
+                count, error = self.counts[item], self.errors[item]
+            else:
+                count, error = missing_self, missing_self
+            if item in other.counts:
+                count += other.counts[item]
+                error += other.errors[item]
+            else:
+                count += missing_other
+                error += missing_other
+            merged[item] = count
+            errors[item] = error
+        
+        capacity = min(self.capacity, other.capacity)
+        if len(merged) > capacity:
+            keep = heapq.nlargest(capacity, merged.items(), key=lambda kv: kv[1])
+            merged = dict(keep)
+            errors = {item: errors[item] for item in merged}
+        
+        self.capacity = capacity
+        self.counts = merged
+        self.errors = errors
+        self.total += other.total
+        self._heap = [(count, item) for item, count in merged.items()]
+        heapq.heapify(self._heap)
+
+class HyperLogLog:
+    """HyperLogLog distinct-count estimator (Flajolet et al.)
+    
+    Small sets are kept as exact hashes; once they grow past a few dozen entries the
+    sketch switches to 2**precision one-byte registers.
+    """
+    SPARSE_LIMIT = 64
+    
+    def __init__(self, precision=11):
+        self.precision = precision
+        self.registers = None
+        self.sparse = set()
+    
+    def add(self, text):
+        """Add a string value to the sketch"""
+        self.add_hash(stable_hash(text))
+    
+    def add_hash(self, value_hash):
+        """Add a 64-bit hash to the sketch"""
+        if self.registers is None:
+            self.sparse.add(value_hash)
+            if len(self.sparse) > self.SPARSE_LIMIT:
+                self._densify()
+            return
+        
+        index = value_hash >> (64 - self.precision)
+        remaining = value_hash & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def _densify(self):
+        """Switch from exact hashes to registers"""
+        hashes = self.sparse
+        self.sparse = set()
+        self.registers = bytearray(1 << self.precision)
+        for value_hash in hashes:
+            self.add_hash(value_hash)
+    
+    def merge(self, other):
+        """Combine another sketch (same precision) into this one"""
+        for value_hash in other.sparse:
+            self.add_hash(value_hash)
+        if other.registers is not None:
+            if self.registers is None:
+                self._densify()
+            self.registers = bytearray(map(max, self.registers, other.registers))
+    
+    def estimate(self):
+        """Estimated number of distinct values"""
+        if self.registers is None:
+            return len(self.sparse)
+        
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+class TDigest:
+    """Merging t-digest quantile sketch (Dunning)
+    
+    Keeps roughly ``compression`` centroids, with more resolution near the tails, so
+    min/percentiles/max and CDF estimates come from a single pass in fixed memory.
+    """
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.centroids = []  # Sorted [mean, weight] pairs
+        self._buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def add(self, value, weight=1):
+        """Add one numeric value"""
+        self._buffer.append((value, weight))
+        self.count += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self._buffer) >= self.compression * 10:
+            self._compress()
+    
+    def merge(self, other):
+        """Combine another digest into this one"""
+        other._compress()
+        self._buffer.extend((mean, weight) for mean, weight in other.centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+    
+    def _compress(self):
+        """Fold buffered points into the centroid list"""
+        if not self._buffer:
+            return
+        points = sorted([(mean, weight) for mean, weight in self.centroids] + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+        
+        merged = []
+        cumulative = 0
+        mean, weight = points[0]
+        for next_mean, next_weight in points[1:]:
+            proposed = weight + next_weight
+            q = (cumulative + proposed / 2) / total
+            # Centroids near the median may hold more points than those at the tails
+            if proposed <= max(1, 4 * total * q * (1 - q) / self.compression):
+                mean += (next_mean - mean) * next_weight / proposed
+                weight = proposed
+            else:
+                merged.append([mean, weight])
+                cumulative += weight
+                mean, weight = next_mean, next_weight
+        merged.append([mean, weight])
+        self.centroids = merged
+    
+    def quantile(self, q):
+        """Estimate the value at quantile q (0..1)"""
+        self._compress()
+        if not self.centroids:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        
+        target = q * self.count
+        cumulative = 0
+        previous_mean, previous_center = self.min, 0
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                if span <= 0:
+                    return mean
+                return previous_mean + (mean - previous_mean) * (target - previous_center) / span
+            cumulative += weight
+            previous_mean, previous_center = mean, center
+        span = self.count - previous_center
+        if span <= 0:
+            return self.max
+        return previous_mean + (self.max - previous_mean) * (target - previous_center) / span
+    
+    def cdf(self, value):
+        """Estimate the fraction of values that are <= value"""
+        self._compress()
+        if not self.centroids:
+            return 0.0
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        
+        cumulative = 0
+        previous_mean, previous_center = self.min, 0
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if value < mean:
+                span = mean - previous_mean
+                if span <= 0:
+                    return previous_center / self.count
+                return (previous_center + (center - previous_center) * (value - previous_mean) / span) / self.count
+            cumulative += weight
+            previous_mean, previous_center = mean, center
+        span = self.max - previous_mean
+        if span <= 0:
+            return 1.0
+        return (previous_center + (self.count - previous_center) * (value - previous_mean) / span) / self.count
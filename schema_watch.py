@@ -0,0 +1,142 @@
+"""
+File watcher for MongoDB Query Generator
+Notices when imported export files change so the schema can be refreshed. Uses inotify
+on Linux and falls back to polling each file's size and modification time elsewhere.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+
+# Seconds between checks when polling (and the longest wait between checks with inotify)
+POLL_INTERVAL = 2.0
+
+# Seconds a changed file must stay unchanged before the change is reported
+SETTLE_TIME = 1.0
+
+# inotify flags (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Directory events that can mean a watched file was written, replaced or removed
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+def load_inotify():
+    """Return the C library if it provides inotify, otherwise None"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+def file_signature(path):
+    """Return (size, mtime, inode) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+class FileWatcher:
+    """Watch files in a background thread and report changes once they have settled.
+    
+    changed() returns True once after any watched file was modified, replaced or
+    removed and then stayed the same for settle_time seconds, so an export that is
+    still being written is not reported half-way through.
+    """
+    def __init__(self, paths, poll_interval=POLL_INTERVAL, settle_time=SETTLE_TIME):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.signatures = self.current_signatures()
+        self.change_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.uses_inotify = False
+    
+    def start(self):
+        """Start watching in a daemon thread"""
+        threading.Thread(target=self.run, daemon=True).start()
+    
+    def stop(self):
+        """Stop watching; the thread exits within one poll interval"""
+        self.stop_event.set()
+    
+    def changed(self):
+        """Return True if a settled change happened since the last call"""
+        if self.change_event.is_set():
+            self.change_event.clear()
+            return True
+        return False
+    
+    def current_signatures(self):
+        """Return the signature of every watched file"""
+        return [file_signature(path) for path in self.paths]
+    
+    def open_inotify(self):
+        """Return an inotify descriptor watching the files' directories, or None to poll"""
+        libc = load_inotify()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        # Watch directories rather than files so atomic replacements (rename over) are seen too
+        for directory in set(os.path.dirname(path) for path in self.paths):
+            if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                os.close(fd)
+                return None
+        return fd
+    
+    def wait(self, fd, timeout):
+        """Sleep until a directory event arrives (inotify) or the timeout passes"""
+        if fd is None:
+            self.stop_event.wait(timeout)
+            return
+        readable, _, _ = select.select([fd], [], [], timeout)
+        if readable:
+            try:
+                # Events only wake the loop; the files are compared by signature below
+                while os.read(fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+    
+    def run(self):
+        """Watcher thread entry point"""
+        fd = self.open_inotify()
+        self.uses_inotify = fd is not None
+        pending = None  # (signatures, time first seen) of a change that has not settled yet
+        try:
+            while not self.stop_event.is_set():
+                if pending is None:
+                    self.wait(fd, self.poll_interval)
+                else:
+                    # A file is still being written - recheck on a timer instead of on every write
+                    self.wait(None, self.settle_time / 2)
+                current = self.current_signatures()
+                if current == self.signatures:
+                    pending = None
+                    continue
+                now = time.monotonic()
+                if pending is None or pending[0] != current:
+                    pending = (current, now)
+                elif now - pending[1] >= self.settle_time:
+                    self.signatures = current
+                    pending = None
+                    self.change_event.set()
+        finally:
+            if fd is not None:
+                os.close(fd)
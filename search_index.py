@@ -0,0 +1,309 @@
+"""
+Search index for MongoDB Query Generator
+Answers the case-insensitive filtering of the searchable comboboxes from a trigram
+index built once per value list, instead of lowercasing and scanning every value on
+each keystroke. Also holds the bitset that keeps checklist selections compact.
+"""
+
+from bisect import bisect_left
+from itertools import filterfalse
+
+# Length of the substrings indexed per value
+GRAM_SIZE = 3
+
+# Candidate count below which further posting lists are not intersected
+MIN_INTERSECT_CANDIDATES = 32
+
+class SubstringIndex:
+    """Case-insensitive substring search over a fixed list of values.
+    
+    Every lowercase trigram maps to the ascending positions of the values that
+    contain it. A query of three or more characters is answered from the posting
+    lists of its trigrams, shorter queries scan the pre-lowered values, and a query
+    that extends the previous one only narrows the previous matches.
+    """
+    def __init__(self, values):
+        self.values = values
+        self.lowered = [str(value).lower() for value in values]
+        self.postings = {}
+        for position, text in enumerate(self.lowered):
+            for gram in {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    self.postings[gram] = [position]
+                else:
+                    posting.append(position)
+        self.last_query = None
+        self.last_matches = None
+    
+    def search(self, query):
+        """Return the positions of the values containing query, in list order"""
+        query = query.lower()
+        if self.last_query is not None and self.last_query in query:
+            # Typing only ever removes matches, so the previous result is a superset
+            candidates = self.last_matches
+        elif len(query) >= GRAM_SIZE:
+            candidates = self.gram_candidates(query)
+        else:
+            candidates = None
+        lowered = self.lowered
+        if candidates is None:
+            matches = [position for position, text in enumerate(lowered) if query in text]
+        else:
+            matches = [position for position in candidates if query in lowered[position]]
+        self.last_query = query
+        self.last_matches = matches
+        return matches
+    
+    def gram_candidates(self, query):
+        """Positions of the values holding every trigram of query (a superset of the matches)"""
+        postings = []
+        for gram in {query[i:i + GRAM_SIZE] for i in range(len(query) - GRAM_SIZE + 1)}:
+            posting = self.postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        if len(postings) == 1 or len(postings[0]) <= MIN_INTERSECT_CANDIDATES:
+            return postings[0]
+        # Intersect from the rarest trigram up; once few candidates are left the
+        # substring check in search() is cheaper than another intersection
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(candidates) <= MIN_INTERSECT_CANDIDATES:
+                break
+            candidates.intersection_update(posting)
+        return sorted(candidates)
+    
+    def filter(self, query):
+        """Return the values containing query (case-insensitive), in list order"""
+        return [self.values[position] for position in self.search(query)]
+
+# Query parts shorter than this are never matched with typos
+FUZZY_MIN_LENGTH = 4
+
+# Ranked substring matches below which typo-tolerant matches are appended
+FUZZY_RESULT_THRESHOLD = 20
+
+# Matches ranked by match quality; any further matches follow in list order
+RANK_LIMIT = 1000
+
+# Sorts after every character a field name can contain, for prefix ranges
+PREFIX_END = '\U0010ffff'
+
+def max_typos(length):
+    """Edits tolerated in a query part of the given length"""
+    if length < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if length < 8 else 2
+
+def deletions(word):
+    """The word and every string made by deleting one of its characters"""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def edit_distance(a, b, limit):
+    """Edit distance counting a swap of neighbours as one edit; limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before_previous[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+def prefix_slice(sorted_keys, prefix):
+    """Return (start, end) of the keys starting with prefix in a sorted list"""
+    return bisect_left(sorted_keys, prefix), bisect_left(sorted_keys, prefix + PREFIX_END)
+
+class FieldSearchIndex(SubstringIndex):
+    """Ranked, typo-tolerant search over dotted field paths.
+    
+    Substring matches come first, ranked as: the exact path, paths starting with
+    the query, paths with a segment equal to it, paths with a segment starting
+    with it, then any other match; shallower paths first within each rank. When
+    that finds few paths, paths whose segments match the dot-separated query parts
+    in order follow, fewest typos first. Each part may be one or two edits away
+    from a segment (found through a one-deletion index of the segment names) or
+    the start of a segment, so "ordr.sku" and "ship.cit" find
+    "payload.order.lines.sku" and "shipping.address.city".
+    """
+    def __init__(self, values):
+        super().__init__(values)
+        self.depths = [text.count('.') for text in self.lowered]
+        self.positions = {}  # First position of each lowercase path
+        self.segment_postings = {}  # Positions of the paths containing each segment
+        for position, text in enumerate(self.lowered):
+            self.positions.setdefault(text, position)
+            for segment in set(text.split('.')):
+                posting = self.segment_postings.get(segment)
+                if posting is None:
+                    self.segment_postings[segment] = [position]
+                else:
+                    posting.append(position)
+        self.sorted_segments = sorted(self.segment_postings)
+        self.path_order = sorted(range(len(self.lowered)), key=self.lowered.__getitem__)
+        self.sorted_paths = [self.lowered[position] for position in self.path_order]
+        # Segments sharing a one-deletion variant with a query part are within two edits of it
+        self.segment_deletions = {}
+        for segment in self.sorted_segments:
+            if len(segment) >= FUZZY_MIN_LENGTH - 1:
+                for variant in deletions(segment):
+                    self.segment_deletions.setdefault(variant, []).append(segment)
+    
+    def search(self, query):
+        """Return the positions of the matching paths, best match first"""
+        query = query.lower()
+        matches = super().search(query)
+        ranked = self.rank(self.match_tiers(query), matches)
+        if len(ranked) < FUZZY_RESULT_THRESHOLD:
+            seen = set(ranked)
+            ranked += [position for position in self.fuzzy_search(query) if position not in seen]
+        return ranked
+    
+    def match_tiers(self, query):
+        """Yield groups of matching positions, best kind of match first (built on demand)"""
+        exact = self.positions.get(query)
+        if exact is not None:
+            yield [exact]
+        start, end = prefix_slice(self.sorted_paths, query)
+        yield self.path_order[start:end]
+        if '.' in query:
+            return
+        yield self.segment_postings.get(query, [])
+        start, end = prefix_slice(self.sorted_segments, query)
+        for segment in self.sorted_segments[start:end]:
+            yield self.segment_postings[segment]
+    
+    def rank(self, tiers, rest=()):
+        """Concatenate tiers without repeats, shallowest paths first within each tier.
+        
+        Once RANK_LIMIT positions are ranked the remaining tiers are not built and
+        the unseen positions of rest follow in list order.
+        """
+        ranked = []
+        seen = set()
+        depth = self.depths.__getitem__
+        for tier in tiers:
+            if len(ranked) >= RANK_LIMIT:
+                break
+            new = list(filterfalse(seen.__contains__, tier))
+            new.sort(key=depth)
+            seen.update(new)
+            ranked.extend(new)
+        if len(ranked) < len(rest):
+            ranked.extend(filterfalse(seen.__contains__, rest))
+        return ranked
+    
+    def similar_segments(self, part):
+        """Return {segment: edits} for the segment names within the typo limit of part"""
+        limit = max_typos(len(part))
+        found = {}
+        if limit == 0:
+            return found
+        for variant in deletions(part):
+            for segment in self.segment_deletions.get(variant, ()):
+                if segment not in found:
+                    distance = edit_distance(part, segment, limit)
+                    if distance <= limit:
+                        found[segment] = distance
+        return found
+    
+    def fuzzy_search(self, query):
+        """Positions of the paths whose segments match the query parts in order, fewest typos first"""
+        parts = [part for part in query.split('.') if part]
+        if not parts:
+            return []
+        allowed = []
+        for part in parts:
+            matches = self.similar_segments(part)
+            # Abbreviated or unfinished parts match the start of a segment
+            start, end = prefix_slice(self.sorted_segments, part)
+            for segment in self.sorted_segments[start:end]:
+                matches[segment] = 0
+            if not matches:
+                return []
+            allowed.append(matches)
+        
+        if len(allowed) == 1:
+            # A single part: every path holding a matching segment, grouped by typos
+            by_typos = sorted(allowed[0].items(), key=lambda item: item[1])
+            return self.rank(self.segment_postings[segment] for segment, _ in by_typos)
+        
+        # Only paths holding a match for every part can match; their order is checked below
+        holders = [set().union(*(self.segment_postings[segment] for segment in matches)) for matches in allowed]
+        holders.sort(key=len)
+        candidates = holders[0].intersection(*holders[1:])
+        scored = []
+        for position in candidates:
+            segments = self.lowered[position].split('.')
+            typos = skipped = index = 0
+            for matches in allowed:
+                while index < len(segments) and segments[index] not in matches:
+                    index += 1
+                    skipped += 1
+                if index == len(segments):
+                    break
+                typos += matches[segments[index]]
+                index += 1
+            else:
+                scored.append((typos, skipped, self.depths[position], position))
+        scored.sort()
+        return [entry[-1] for entry in scored]
+
+class Bitset:
+    """Fixed-size set of positions stored as one bit per position"""
+    def __init__(self, size):
+        self.size = size
+        self.bits = bytearray((size + 7) >> 3)
+    
+    def __contains__(self, position):
+        return self.bits[position >> 3] >> (position & 7) & 1 == 1
+    
+    def __len__(self):
+        return int.from_bytes(self.bits, 'little').bit_count()
+    
+    def __iter__(self):
+        """Yield the positions in the set in ascending order"""
+        for byte_index, byte in enumerate(self.bits):
+            while byte:
+                low = byte & -byte
+                yield (byte_index << 3) + low.bit_length() - 1
+                byte ^= low
+    
+    def add(self, position):
+        """Add one position"""
+        self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def discard(self, position):
+        """Remove one position if present"""
+        self.bits[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+    
+    def update(self, positions):
+        """Add every position in an iterable"""
+        bits = self.bits
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+    
+    def difference_update(self, positions):
+        """Remove every position in an iterable"""
+        bits = self.bits
+        for position in positions:
+            bits[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+    
+    def fill(self):
+        """Add every position below size"""
+        self.bits[:] = b'\xff' * len(self.bits)
+        if self.size & 7:
+            self.bits[-1] = (1 << (self.size & 7)) - 1
+    
+    def clear(self):
+        """Remove every position"""
+        self.bits[:] = bytes(len(self.bits))
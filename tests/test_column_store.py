@@ -0,0 +1,79 @@
+"""
+Tests for the columnar sample store: its array masks must count what the row evaluator counts
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from column_store import ColumnarSampleStore, numpy_available
+from query_eval import QueryPreviewJob, compile_filter
+
+DOCUMENTS = [
+    {'n': 9007199254740993, 'name': 'a', 'created': {'$date': '2024-03-01T00:00:00Z'}},
+    {'n': 9007199254740992, 'name': 'b', 'created': {'$date': '2023-06-01T00:00:00Z'}},
+    {'n': {'$numberLong': '9007199254740993'}, 'name': 'c'},
+    {'n': 5, 'name': None, 'tags': ['x']},
+    {'name': 'B'},
+]
+
+def row_count(query, documents=DOCUMENTS):
+    """Matches counted document by document"""
+    test = compile_filter(query)
+    return sum(1 for doc in documents if test(doc))
+
+def preview_count(query, store):
+    """Matches counted by a preview job over the store"""
+    job = QueryPreviewJob(query, store, store.row_count)
+    job.run()
+    kind, result = job.messages.get()
+    if kind == 'error':
+        raise result
+    return result.matched
+
+@unittest.skipUnless(numpy_available(), "NumPy is not installed")
+class ColumnarStoreTest(unittest.TestCase):
+    """Counts from the columnar store equal the row evaluator's"""
+    def setUp(self):
+        self.store = ColumnarSampleStore(DOCUMENTS)
+    
+    def test_integers_above_float_precision(self):
+        for query in ({'n': 9007199254740992}, {'n': 9007199254740993},
+                      {'n': {'$gt': 9007199254740992}}, {'n': {'$in': [9007199254740993]}}):
+            self.assertEqual(preview_count(query, self.store), row_count(query), query)
+        self.assertEqual(row_count({'n': 9007199254740992}), 1)
+        self.assertEqual(row_count({'n': 9007199254740993}), 2)
+    
+    def test_large_int_column_uses_row_evaluator(self):
+        self.assertIsNone(self.store.column('n'))
+        self.assertIsNone(self.store.count_matches({'n': 5}, 5))
+    
+    def test_large_operand_uses_row_evaluator(self):
+        store = ColumnarSampleStore([{'n': 1}, {'n': 2 ** 53}])
+        self.assertIsNone(store.count_matches({'n': 2 ** 53 + 1}, 5))
+        self.assertEqual(preview_count({'n': 2 ** 53 + 1}, store), 0)
+    
+    def test_masks_match_row_evaluator(self):
+        queries = [
+            {'name': 'b'},
+            {'name': {'$gte': 'b'}},
+            {'name': {'$regex': '^b', '$options': 'i'}},
+            {'name': None},
+            {'name': {'$exists': False}},
+            {'name': {'$type': 'string'}},
+            {'created': {'$gte': {'$date': '2024-01-01'}}},
+            {'$or': [{'name': 'a'}, {'created': {'$lt': {'$date': '2024-01-01'}}}]},
+        ]
+        for query in queries:
+            counted = self.store.count_matches(query, 5)
+            self.assertIsNotNone(counted, query)
+            self.assertEqual(counted[0], row_count(query), query)
+    
+    def test_array_field_uses_row_evaluator(self):
+        self.assertIsNone(self.store.count_matches({'tags': 'x'}, 5))
+        self.assertEqual(preview_count({'tags': 'x'}, self.store), 1)
+
+if __name__ == '__main__':
+    unittest.main()
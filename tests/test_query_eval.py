@@ -0,0 +1,74 @@
+"""
+Tests for the local query evaluation behind the match preview
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_ast import QueryTree, to_shell
+from query_eval import compile_filter
+
+class DateConditionTest(unittest.TestCase):
+    """The preview evaluates the same typed filter the generated script sends"""
+    def setUp(self):
+        self.tree = QueryTree()
+        self.tree.add_condition(self.tree.root, 'created', '$gte', 'ISODate("2024-01-01")')
+        self.documents = [
+            {'created': {'$date': '2024-03-01T00:00:00Z'}},
+            {'created': {'$date': '2023-06-01T00:00:00Z'}},
+            {'created': '2024-03-01'},
+            {},
+        ]
+    
+    def test_filter_holds_typed_date(self):
+        self.assertEqual(json.loads(self.tree.to_json()), {'created': {'$gte': {'$date': '2024-01-01'}}})
+    
+    def test_preview_matches_emitted_filter(self):
+        emitted = json.loads(self.tree.to_json())
+        test = compile_filter(emitted)
+        self.assertEqual([test(doc) for doc in self.documents], [True, False, False, False])
+    
+    def test_script_uses_shell_helper(self):
+        script = to_shell(self.tree.to_json())
+        self.assertIn('"$gte": ISODate("2024-01-01")', script)
+        self.assertNotIn('$date', script)
+
+class ObjectIdConditionTest(unittest.TestCase):
+    """ObjectId values are typed in the filter and in $in lists"""
+    def test_in_list(self):
+        tree = QueryTree()
+        tree.add_condition(tree.root, '_id', '$in', 'ObjectId("65a1b2c3d4e5f60718293a4b"), abc')
+        emitted = json.loads(tree.to_json())
+        self.assertEqual(emitted, {'_id': {'$in': [{'$oid': '65a1b2c3d4e5f60718293a4b'}, 'abc']}})
+        test = compile_filter(emitted)
+        self.assertTrue(test({'_id': {'$oid': '65A1B2C3D4E5F60718293A4B'}}))
+        self.assertFalse(test({'_id': '65a1b2c3d4e5f60718293a4b'}))
+        self.assertIn('ObjectId("65a1b2c3d4e5f60718293a4b")', to_shell(tree.to_json()))
+
+class NullInArrayTest(unittest.TestCase):
+    """A field missing from an array element counts as null"""
+    def test_equals_null(self):
+        test = compile_filter({'items.x': None})
+        self.assertTrue(test({'items': [{'x': 1}, {'y': 2}]}))
+        self.assertTrue(test({'items': [{'x': None}]}))
+        self.assertTrue(test({}))
+        self.assertFalse(test({'items': [{'x': 1}, {'x': 2}]}))
+    
+    def test_not_equals_null(self):
+        test = compile_filter({'items.x': {'$ne': None}})
+        self.assertFalse(test({'items': [{'x': 1}, {'y': 2}]}))
+        self.assertTrue(test({'items': [{'x': 1}, {'x': 2}]}))
+    
+    def test_missing_is_not_a_value(self):
+        document = {'items': [{'y': 2}]}
+        self.assertFalse(compile_filter({'items.x': {'$exists': True}})(document))
+        self.assertTrue(compile_filter({'items.x': {'$exists': False}})(document))
+        self.assertFalse(compile_filter({'items.x': {'$type': 'null'}})(document))
+        self.assertFalse(compile_filter({'items.0': None})({'items': [5]}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for the mongodump BSON reader
+"""
+
+import io
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema_bson import BSONError, decode_document, iter_bson_documents, iter_document_range, split_document_ranges
+
+def element(type_code, name, payload):
+    """One encoded BSON element"""
+    return bytes([type_code]) + name.encode('utf-8') + b'\x00' + payload
+
+def document(*elements):
+    """A BSON document holding the encoded elements"""
+    body = b''.join(elements) + b'\x00'
+    return struct.pack('<i', len(body) + 4) + body
+
+def string(text):
+    """Payload of a BSON string"""
+    encoded = text.encode('utf-8') + b'\x00'
+    return struct.pack('<i', len(encoded)) + encoded
+
+SAMPLE = document(
+    element(0x07, '_id', bytes.fromhex('65a1b2c3d4e5f60718293a4b')),
+    element(0x02, 'name', string('café')),
+    element(0x10, 'qty', struct.pack('<i', -3)),
+    element(0x12, 'big', struct.pack('<q', 2 ** 53 + 1)),
+    element(0x01, 'price', struct.pack('<d', 2.5)),
+    element(0x08, 'active', b'\x01'),
+    element(0x0A, 'note', b''),
+    element(0x09, 'created', struct.pack('<q', 1704067200000)),
+    element(0x09, 'ancient', struct.pack('<q', -1000)),
+    element(0x13, 'amount', struct.pack('<QQ', 12345, 0x3040000000000000 - (2 << 49))),
+    element(0x04, 'tags', document(element(0x02, '0', string('a')), element(0x10, '1', struct.pack('<i', 7)))),
+    element(0x03, 'address', document(element(0x02, 'city', string('Paris')))),
+)
+
+class DecodeTest(unittest.TestCase):
+    """BSON values decode to the extended JSON a JSON export would hold"""
+    def test_typed_values(self):
+        value, end = decode_document(SAMPLE)
+        self.assertEqual(end, len(SAMPLE))
+        self.assertEqual(value, {
+            '_id': {'$oid': '65a1b2c3d4e5f60718293a4b'},
+            'name': 'café',
+            'qty': -3,
+            'big': {'$numberLong': '9007199254740993'},
+            'price': 2.5,
+            'active': True,
+            'note': None,
+            'created': {'$date': '2024-01-01T00:00:00.000Z'},
+            'ancient': {'$date': {'$numberLong': '-1000'}},
+            'amount': {'$numberDecimal': '123.45'},
+            'tags': ['a', 7],
+            'address': {'city': 'Paris'},
+        })
+    
+    def test_stream(self):
+        documents = list(iter_bson_documents(io.BytesIO(SAMPLE * 3)))
+        self.assertEqual(len(documents), 3)
+        self.assertEqual(documents[2]['address'], {'city': 'Paris'})
+    
+    def test_ranges(self):
+        data = SAMPLE * 5
+        ranges = split_document_ranges(data, len(SAMPLE) * 2)
+        self.assertEqual(ranges, [(0, len(SAMPLE) * 2), (len(SAMPLE) * 2, len(SAMPLE) * 4),
+                                  (len(SAMPLE) * 4, len(SAMPLE) * 5)])
+        documents = [doc for start, end in ranges for doc in iter_document_range(data, start, end)]
+        self.assertEqual(len(documents), 5)
+
+class MalformedInputTest(unittest.TestCase):
+    """Malformed input raises BSONError"""
+    def test_truncated_stream(self):
+        with self.assertRaises(BSONError):
+            list(iter_bson_documents(io.BytesIO(SAMPLE + SAMPLE[:-3])))
+    
+    def test_invalid_length(self):
+        with self.assertRaises(BSONError):
+            list(iter_bson_documents(io.BytesIO(struct.pack('<i', 2) + b'\x00')))
+    
+    def test_unknown_type(self):
+        with self.assertRaises(BSONError):
+            list(iter_bson_documents(io.BytesIO(document(element(0x42, 'x', b'')))))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests for the Compass CSV reader
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema_csv import iter_csv_documents, parse_header, infer_column_type, convert_value
+from schema_import import SchemaImportJob
+
+def read_csv(text, **kwargs):
+    """Documents of a CSV export given as text"""
+    return list(iter_csv_documents(io.StringIO(text, newline=''), **kwargs))
+
+class ArrayPathTest(unittest.TestCase):
+    """Array elements keep the index given in their header"""
+    def test_missing_lower_index(self):
+        documents = read_csv('_id,items[0].p,items[1].p\n1,,5\n2,3,4\n')
+        self.assertEqual(documents[0], {'_id': 1, 'items': [None, {'p': 5}]})
+        self.assertEqual(documents[1], {'_id': 2, 'items': [{'p': 3}, {'p': 4}]})
+    
+    def test_missing_lower_scalar_index(self):
+        documents = read_csv('tags[0],tags[1],tags[2]\n,,c\n')
+        self.assertEqual(documents[0], {'tags': [None, None, 'c']})
+
+class HeaderTest(unittest.TestCase):
+    """Compass headers become field paths"""
+    def test_paths(self):
+        self.assertEqual(parse_header('name'), ['name'])
+        self.assertEqual(parse_header('address.city'), ['address', 'city'])
+        self.assertEqual(parse_header('items[0].price'), ['items', 0, 'price'])
+        self.assertEqual(parse_header('matrix[1][2]'), ['matrix', 1, 2])
+    
+    def test_nested_document(self):
+        documents = read_csv('address.city,address.zip\nParis,75001\n')
+        self.assertEqual(documents, [{'address': {'city': 'Paris', 'zip': 75001}}])
+
+class TypeInferenceTest(unittest.TestCase):
+    """Column types come from the first chunk of rows"""
+    def test_narrowest_type(self):
+        self.assertEqual(infer_column_type(['1', '', '-2']), 'int')
+        self.assertEqual(infer_column_type(['1', '2.5', '1e3']), 'double')
+        self.assertEqual(infer_column_type(['true', 'false']), 'bool')
+        self.assertEqual(infer_column_type(['65a1b2c3d4e5f60718293a4b']), 'objectId')
+        self.assertEqual(infer_column_type(['2024-01-01', '2024-01-01T10:00:00Z']), 'date')
+        self.assertEqual(infer_column_type(['1', 'x']), 'string')
+        self.assertEqual(infer_column_type(['', '']), 'string')
+    
+    def test_leading_zeros_stay_text(self):
+        self.assertEqual(infer_column_type(['00501', '02134']), 'string')
+    
+    def test_only_first_chunk_is_sampled(self):
+        text = 'n\n' + '1\n' * 10000 + 'x\n'
+        documents = read_csv(text)
+        self.assertEqual(documents[0], {'n': 1})
+        # A value that does not fit the inferred type is kept as text
+        self.assertEqual(documents[-1], {'n': 'x'})
+    
+    def test_mixed_first_chunk_is_text(self):
+        documents = read_csv('n\n1\nx\n2\n', chunk_rows=2)
+        self.assertEqual(documents, [{'n': '1'}, {'n': 'x'}, {'n': '2'}])
+
+class TypedValueTest(unittest.TestCase):
+    """Cells are stored as typed values, with extended JSON for ObjectId and Date"""
+    def test_convert(self):
+        self.assertEqual(convert_value('objectId', '65A1B2C3D4E5F60718293A4B'), {'$oid': '65a1b2c3d4e5f60718293a4b'})
+        self.assertEqual(convert_value('date', '2024-01-01T10:00:00Z'), {'$date': '2024-01-01T10:00:00Z'})
+        self.assertIs(convert_value('bool', 'false'), False)
+        self.assertEqual(convert_value('double', '2.5'), 2.5)
+        self.assertEqual(convert_value('int', '2.5'), '2.5')
+    
+    def test_document(self):
+        documents = read_csv('_id,active,created,score,note\n'
+                             '65a1b2c3d4e5f60718293a4b,true,2024-01-01,3,\n')
+        self.assertEqual(documents, [{'_id': {'$oid': '65a1b2c3d4e5f60718293a4b'}, 'active': True,
+                                      'created': {'$date': '2024-01-01'}, 'score': 3}])
+    
+    def test_conflicting_headers_keep_first_value(self):
+        documents = read_csv('a,a.b\n1,2\n')
+        self.assertEqual(documents, [{'a': 1}])
+    
+    def test_empty_file(self):
+        self.assertEqual(read_csv(''), [])
+
+class CsvImportTest(unittest.TestCase):
+    """A .csv file is imported with typed field statistics"""
+    def test_import(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'export.csv')
+            with open(filename, 'w', encoding='utf-8', newline='') as f:
+                f.write('_id,items[1].qty,created\n65a1b2c3d4e5f60718293a4b,2,2024-01-01\n')
+            job = SchemaImportJob(filename, parallel=False)
+            job.run()
+            kinds = [job.messages.get() for _ in range(job.messages.qsize())]
+        kind, extractor = kinds[-1]
+        self.assertEqual(kind, 'done')
+        self.assertEqual(set(extractor.field_stats['_id'].types), {'objectId'})
+        self.assertEqual(set(extractor.field_stats['created'].types), {'date'})
+        self.assertIn('items.qty', extractor.fields)
+
+if __name__ == '__main__':
+    unittest.main()